@@ -0,0 +1,138 @@
+""" Time the statistics queries on a synthetic events table, without and with
+the indexes declared in :mod:`lamon.models`.
+
+Usage::
+
+    python benchmarks/events.py --events 10000000 --database sqlite:///bench.db
+
+Generating 10M events takes a while. The database file is reused when it
+already contains enough events.
+"""
+import random
+import time
+
+from datetime import datetime, timedelta
+
+import click
+
+from sqlalchemy import create_engine, func, select, distinct
+
+from lamon import db
+from lamon.models import Event, EventType, Nickname
+
+
+GAMES = 20
+WATCHERS = 40
+USERS = 2000
+CHUNK = 100000
+
+events = Event.__table__
+nicknames = Nickname.__table__
+
+
+def _populate(engine, count):
+    db.Model.metadata.create_all(engine, tables=[events, nicknames])
+
+    existing = engine.execute(select([func.count()]).
+                              select_from(events)).scalar()
+    if existing >= count:
+        return
+
+    click.echo(f'Generating {count - existing} events')
+    types = [int(EventType.USER_SCORE)] * 8 + \
+        [int(EventType.USER_JOIN), int(EventType.USER_LEAVE)]
+    start = datetime(2019, 1, 1)
+
+    for offset in range(existing, count, CHUNK):
+        rows = []
+        for i in range(offset, min(offset + CHUNK, count)):
+            watcher = random.randrange(WATCHERS)
+            type = random.choice(types)
+            score = random.randrange(100)
+            rows.append({'type': type,
+                         'time': start + timedelta(seconds=i),
+                         'info': str(score),
+                         'score': score if type == EventType.USER_SCORE
+                         else None,
+                         'watcherID': watcher,
+                         'gameID': watcher % GAMES,
+                         'userID': random.randrange(USERS)})
+        engine.execute(events.insert(), rows)
+
+    if not existing:
+        engine.execute(nicknames.insert(), [
+            {'nick': f'player{u}', 'gameID': g, 'userID': u}
+            for u in range(USERS) for g in range(GAMES) if u % GAMES == g])
+
+
+def _queries():
+    game = random.randrange(GAMES)
+    user = random.randrange(USERS)
+    watcher = random.randrange(WATCHERS)
+
+    return {
+        'players of a game': select([func.count(distinct(events.c.userID))]).
+            where(events.c.gameID == game),
+        'score timeline': select([events.c.time, events.c.score]).
+            where(events.c.gameID == game).
+            where(events.c.userID == user).
+            where(events.c.type == int(EventType.USER_SCORE)).
+            order_by(events.c.time),
+        'latest watcher events': select([events]).
+            where(events.c.watcherID == watcher).
+            order_by(events.c.time.desc()).limit(50),
+        'nickname lookup': select([nicknames.c.userID]).
+            where(nicknames.c.nick == f'player{user}').
+            where(nicknames.c.gameID == user % GAMES),
+    }
+
+
+def _run(engine, repeat):
+    results = {}
+    for _ in range(repeat):
+        for name, query in _queries().items():
+            start = time.perf_counter()
+            engine.execute(query).fetchall()
+            results.setdefault(name, []).append(time.perf_counter() - start)
+
+    return {name: min(times) for name, times in results.items()}
+
+
+def _set_indexes(engine, create):
+    for table in [events, nicknames]:
+        for index in table.indexes:
+            try:
+                if create:
+                    index.create(engine)
+                else:
+                    index.drop(engine)
+            except Exception:  # Already exists / doesn't exist
+                pass
+
+
+@click.command()
+@click.option('--events', 'count', default=10000000,
+              help='Number of events to generate')
+@click.option('--database', default='sqlite:///benchmark.db',
+              help='Database URI')
+@click.option('--repeat', default=5, help='Runs per query (best is shown)')
+def main(count, database, repeat):
+    engine = create_engine(database)
+    _populate(engine, count)
+
+    _set_indexes(engine, create=False)
+    without = _run(engine, repeat)
+
+    start = time.perf_counter()
+    _set_indexes(engine, create=True)
+    click.echo(f'Created indexes in {time.perf_counter() - start:.1f}s')
+    indexed = _run(engine, repeat)
+
+    click.echo(f'{"query":<24}{"no index":>12}{"indexed":>12}')
+    for name in without:
+        click.echo(f'{name:<24}{without[name] * 1000:>10.1f}ms'
+                   f'{indexed[name] * 1000:>10.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+""" Compare the throughput of the combined :class:`LogParser` with matching
+every pattern of a :class:`TTTWatcher` against every log line, as
+:class:`LogMixin` used to.
+
+Usage::
+
+    python benchmarks/logs.py --megabytes 300 --file ttt.log
+
+Without an existing log file, a synthetic one of the given size is
+generated. Most lines of real TTT logs are neither kills, joins nor leaves,
+so are most generated lines.
+"""
+import random
+import re
+import time
+
+from collections import Counter
+
+import click
+
+from lamon.watcher.log_mixin import LogParser
+from lamon.watcher.plugin.source_engine import TTTWatcher
+
+
+_LINES = [
+    (5, 'L {date}: {round} - KILL:\t {a} [traitor] killed {b} [innocent]'),
+    (2, 'L {date}: "{a}<3><STEAM_0:1:219712654><>" entered the game'),
+    (2, 'L {date}: "{a}<3><STEAM_0:1:219712654><>" disconnected '
+        '(reason "Disconnect by user.")'),
+    (30, 'L {date}: {round} - DMG:\t {a} [traitor] damaged {b} [innocent] '
+         'for 25 dmg'),
+    (20, 'L {date}: "{a}<3><STEAM_0:1:219712654><Unassigned>" say "gg"'),
+    (10, 'L {date}: Lua Error: [ERROR] addons/ulx/lua/ulx/log.lua:245'),
+]
+
+
+def _generate(path, megabytes):
+    click.echo(f'Generating {megabytes}MB of log lines')
+    weights, templates = zip(*_LINES)
+    size = megabytes * 1024 * 1024
+
+    with open(path, 'w') as log:
+        while log.tell() < size:
+            lines = []
+            for template in random.choices(templates, weights, k=10000):
+                lines.append(template.format(
+                    date='07/28/2019 - 21:53:40', round='00:43.100',
+                    a=f'player{random.randrange(100)}',
+                    b=f'player{random.randrange(100)}'))
+            log.write('\n'.join(lines) + '\n')
+
+
+def _patterns(counter):
+    return {TTTWatcher.log_kill_message: lambda e: counter.update(['kill']),
+            TTTWatcher.log_join_message: lambda e: counter.update(['join']),
+            TTTWatcher.log_leave_message: lambda e: counter.update(['leave'])}
+
+
+def _loop(path):
+    """ Every pattern (including the header) against every line """
+    counter = Counter()
+    parsers = {re.compile('^' + TTTWatcher.log_prefix + expr): call
+               for expr, call in _patterns(counter).items()}
+
+    with open(path) as log:
+        for line in log:
+            for expr, call in parsers.items():
+                match = expr.match(line)
+                if match is not None:
+                    call(match)
+
+    return counter
+
+
+def _combined(path):
+    """ One scan per line with the combined expression """
+    counter = Counter()
+    parser = LogParser(_patterns(counter), TTTWatcher.log_prefix)
+
+    with open(path) as log:
+        for line in log:
+            parser.parse(line)
+
+    return counter
+
+
+def _time(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+@click.command()
+@click.option('--megabytes', default=300, help='Size of the generated log')
+@click.option('--file', 'path', default='ttt.log', help='TTT log file')
+def main(megabytes, path):
+    try:
+        open(path).close()
+    except FileNotFoundError:
+        _generate(path, megabytes)
+
+    loop_time, loop_result = _time(_loop, path)
+    combined_time, combined_result = _time(_combined, path)
+    assert loop_result == combined_result
+
+    lines = sum(loop_result.values())
+    click.echo(f'{lines} matching lines')
+    click.echo(f'Pattern loop:        {loop_time:>8.2f}s')
+    click.echo(f'Combined expression: {combined_time:>8.2f}s')
+
+
+if __name__ == '__main__':
+    main()
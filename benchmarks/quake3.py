@@ -0,0 +1,121 @@
+""" Compare the poll latency of the :class:`Quake3` client with sending one
+rcon ``status`` and reading its first packet, as the client used to.
+
+Usage::
+
+    python benchmarks/quake3.py --players 64 --latency 20 --polls 200
+
+A fake server on localhost answers after *latency* milliseconds. Like
+ioquake3, it splits rcon output into packets of about 1000 bytes, so the
+old client only sees the players of the first packet.
+"""
+import asyncio
+import time
+
+import click
+
+from lamon.watcher.plugin.quake3 import Quake3
+from lamon.watcher.udp import UDPClient
+
+
+HEADER = b'\xFF\xFF\xFF\xFF'
+PASSWORD = 'secret'
+
+
+class FakeServer(asyncio.DatagramProtocol):
+    def __init__(self, players, latency):
+        self.players = [f'Player{i}' for i in range(players)]
+        self.latency = latency
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        cmd = data[len(HEADER):].decode()
+
+        if cmd.startswith('getstatus'):
+            challenge = cmd[len('getstatus '):]
+            body = f'\\mapname\\q3dm17\\challenge\\{challenge}\n' + \
+                ''.join(f'{i} 50 "{name}"\n'
+                        for i, name in enumerate(self.players))
+            packets = [b'statusResponse\n' + body.encode()]
+        elif cmd.startswith(f'rcon "{PASSWORD}" status'):
+            body = ('map: q3dm17\n'
+                    'num score ping name            lastmsg address      '
+                    '         qport rate\n'
+                    '--- ----- ---- --------------- ------- -------------'
+                    '-------- ----- -----\n' +
+                    ''.join(f'{i:3} {i:5} {50:4} {name}^7{0:10} '
+                            f'127.0.0.1:27960{i:12} 25000\n'
+                            for i, name in enumerate(self.players))).encode()
+            packets = [b'print\n' + body[i:i + 1000]
+                       for i in range(0, len(body), 1000)]
+        else:
+            return
+
+        loop = asyncio.get_event_loop()
+        for packet in packets:
+            loop.call_later(self.latency, self.transport.sendto,
+                            HEADER + packet, addr)
+
+
+async def _old_poll(client):
+    """ One packet of rcon status """
+    data = await client.request(HEADER + f'rcon "{PASSWORD}" status'.encode())
+    return data.decode(errors='replace').count('^7')
+
+
+async def _rcon_poll(client):
+    return len((await client.get_info())['players'])
+
+
+async def _status_poll(client):
+    return len((await client.get_status())['players'])
+
+
+async def _measure(poll, client, polls, concurrency):
+    start = time.perf_counter()
+    players = set()
+
+    for _ in range(0, polls, concurrency):
+        players.update(await asyncio.gather(
+            *(poll(client) for _ in range(concurrency))))
+
+    return (time.perf_counter() - start) / polls * 1000, players
+
+
+async def _benchmark(players, latency, polls, concurrency):
+    loop = asyncio.get_event_loop()
+    transport, _ = await loop.create_datagram_endpoint(
+        lambda: FakeServer(players, latency / 1000),
+        local_addr=('127.0.0.1', 0))
+    addr = transport.get_extra_info('sockname')
+
+    runs = [('old rcon status', _old_poll, UDPClient(addr, 5), 1),
+            ('rcon status', _rcon_poll, Quake3(addr, 5, PASSWORD), 1),
+            ('getstatus', _status_poll, Quake3(addr, 5), 1),
+            (f'getstatus x{concurrency}', _status_poll, Quake3(addr, 5),
+             concurrency)]
+
+    click.echo(f'{players} players, {latency}ms latency, {polls} polls')
+    for name, poll, client, parallel in runs:
+        ms, seen = await _measure(poll, client, polls, parallel)
+        click.echo(f'{name:>20}: {ms:7.2f}ms per poll, '
+                   f'{"/".join(map(str, sorted(seen)))} players seen')
+        client.close()
+
+    transport.close()
+
+
+@click.command()
+@click.option('--players', default=64, help='Players on the server')
+@click.option('--latency', default=20, help='Response delay in milliseconds')
+@click.option('--polls', default=200, help='Polls per client')
+@click.option('--concurrency', default=8, help='Concurrent status polls')
+def main(players, latency, polls, concurrency):
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(_benchmark(players, latency, polls, concurrency))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+""" Compare aggregating scores in SQL on the typed :attr:`Event.score` column
+with parsing :attr:`Event.info` in Python, as the statistics used to.
+
+Usage::
+
+    python benchmarks/scores.py --events 1000000 --database sqlite:///bench.db
+
+Uses (and if necessary generates) the same synthetic table as
+``benchmarks/events.py``.
+"""
+import time
+
+import click
+
+from sqlalchemy import create_engine, func, select
+
+from lamon.models import EventType
+
+from events import events, _populate, GAMES
+
+
+def _python(engine, game):
+    """ Highest score per user, parsed from info """
+    query = select([events.c.userID, events.c.info]).\
+        where(events.c.gameID == game).\
+        where(events.c.type == int(EventType.USER_SCORE))
+
+    result = {}
+    for user, info in engine.execute(query):
+        score = float(info)
+        result[user] = max(result.get(user, score), score)
+    return result
+
+
+def _sql(engine, game):
+    """ Highest score per user, aggregated by the database """
+    query = select([events.c.userID, func.max(events.c.score)]).\
+        where(events.c.gameID == game).\
+        where(events.c.type == int(EventType.USER_SCORE)).\
+        group_by(events.c.userID)
+
+    return dict(engine.execute(query).fetchall())
+
+
+def _time(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+@click.command()
+@click.option('--events', 'count', default=1000000,
+              help='Number of events to generate')
+@click.option('--database', default='sqlite:///benchmark.db',
+              help='Database URI')
+def main(count, database):
+    engine = create_engine(database)
+    _populate(engine, count)
+
+    python_total = sql_total = 0
+    for game in range(GAMES):
+        python_time, python_result = _time(_python, engine, game)
+        sql_time, sql_result = _time(_sql, engine, game)
+        assert python_result == sql_result
+
+        python_total += python_time
+        sql_total += sql_time
+
+    click.echo(f'Max score per user of {GAMES} games')
+    click.echo(f'Python loop over info: {python_total * 1000:>10.1f}ms')
+    click.echo(f'SQL MAX(score):        {sql_total * 1000:>10.1f}ms')
+
+
+if __name__ == '__main__':
+    main()
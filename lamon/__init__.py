@@ -30,12 +30,70 @@ def dictDefault(d, default):
     return d
 
 
+def engine_options(database_config):
+    """ Connection pool options for :func:`sqlalchemy.create_engine` from the
+    database section of the config. SQLite doesn't use a queue pool, so only
+    the options supported by all pools are passed for it.
+    """
+    options = ['pool_recycle', 'pool_pre_ping']
+    if not database_config['database_uri'].startswith('sqlite'):
+        options += ['pool_size', 'max_overflow', 'pool_timeout']
+
+    return {key: database_config[key] for key in options
+            if key in database_config}
+
+
 def load_config_file(config_file):
     """ Load a configuration file """
     default_config = {
         'app': {
             'secret_key': ''
         },
+        'database': {
+            'pool_size': 5,
+            'max_overflow': 10,
+            'pool_timeout': 30,
+            'pool_recycle': 3600,
+            'pool_pre_ping': True
+        },
+        'watcher': {
+            'writer': {
+                'queue_size': 10000,
+                'batch_size': 500,
+                'flush_interval': 0.5
+            },
+            'runtime': {
+                'max_workers': 8
+            },
+            'scheduler': {
+                'max_in_flight': 16,
+                'jitter': 0.1,
+                'max_backoff': 300
+            },
+            'retention': {
+                'raw_days': 0,
+                'minute_bucket_days': 0,
+                'interval': 3600,
+                'batch_size': 10000
+            },
+            'logs': {
+                'host': '0.0.0.0',
+                'port': 0,
+                'queue_size': 10000
+            }
+        },
+        'stats': {
+            'cache': {
+                'backend': 'lamon.cache.TTLCache',
+                'maxsize': 4096,
+                'ttl': 60
+            },
+            'live': {
+                'buffer_size': 256,
+                'poll_interval': 1,
+                'heartbeat': 15
+            }
+        },
         'logging': {
             'version': 1,
             'root': {
@@ -76,10 +134,15 @@ def load_config_file(config_file):
 
     config['flask'] = {}
     config['flask']['SQLALCHEMY_DATABASE_URI'] = config['database']['database_uri']
+    config['flask']['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(
+        config['database'])
 
     for key, value in config['app'].items():
         config['flask'][key.upper()] = value
 
+    config['flask']['WATCHER'] = config['watcher']
+    config['flask']['STATS'] = config['stats']
+
     if config['flask']['SECRET_KEY'] == '':
         logging.getLogger('flask.app').warning(
             """No secret key in config file. Generating one now. Users will have
@@ -90,7 +153,8 @@ def load_config_file(config_file):
 
 
 def init_db(app):
-    from .models import User, Role, UserRoles
+    from .models import User, Role, UserRoles, Event, EventType, ScoreRollup
+    from .rollups import rebuild_rollups
 
     with app.app_context() as ctx:
         role = None
@@ -110,6 +174,13 @@ def init_db(app):
             db.session.add(user)
             db.session.commit()
 
+        scores = db.session.query(Event.id).\
+            filter(Event.type == int(EventType.USER_SCORE))
+
+        if ScoreRollup.query.first() is None and scores.first() is not None:
+            app.logger.info('Building score rollups from existing events')
+            rebuild_rollups(db.session)
+
 
 def create_app(config_file='config.toml'):
     # Load config
@@ -156,10 +227,14 @@ def create_app(config_file='config.toml'):
 
     # Database
     from .models import User, Event, Game, Watcher, Role, UserRoles, Nickname, \
-        WatcherConfig
+        WatcherConfig, ScoreRollup, ScoreBucket
     db.init_app(app)
     db.create_all(app=app)
 
+    from .migrations import migrate
+    with app.app_context():
+        migrate(db.engine)
+
     # User Manager
     db_adapter = SQLAlchemyAdapter(db, User)
     user_manager = UserManager(db_adapter, app)
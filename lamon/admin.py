@@ -27,7 +27,7 @@ class UserView(AuthModelView):
     can_view_details = True
 
     column_list = ('username', 'roles', 'nicknames')
-    column_details_list = ('username', 'roles', 'nicknames', 'events')
+    column_details_list = ('username', 'roles', 'nicknames')
     column_searchable_list = ('username',)
 
     form_excluded_columns = ['events']
@@ -41,7 +41,7 @@ class GameView(AuthModelView):
     can_view_details = True
 
     column_list = ('name', 'nicknames', 'watchers')
-    column_details_list = ('name', 'nicknames', 'watchers', 'events')
+    column_details_list = ('name', 'nicknames', 'watchers')
     form_excluded_columns = ['scores', 'watchers', 'events']
     inline_models = [Nickname]
 
@@ -50,7 +50,7 @@ class WatcherView(AuthModelView):
     can_view_details = True
 
     column_list = ('game', 'info', 'config')
-    column_details_list = ('game', 'info', 'config', 'events')
+    column_details_list = ('game', 'info', 'config')
     form_excluded_columns = ['events']
     inline_models = [WatcherConfig]
 
@@ -81,6 +81,13 @@ class WatcherView(AuthModelView):
         EndpointLinkRowAction('glyphicon glyphicon-refresh', 'watchers.restart')
     ]
 
+    def after_model_change(self, form, model, is_created):
+        if current_app.watcher_manager.is_running(model=model):
+            try:
+                current_app.watcher_manager.refresh(model=model)
+            except KeyError as e:  # Restarted with an incomplete config
+                flash(str(e), 'error')
+
 
 def register_admin(app):
     admin = Admin(app, name='lamon', template_mode='bootstrap3',
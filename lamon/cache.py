@@ -0,0 +1,226 @@
+""" Small in-process caches """
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from functools import wraps
+from importlib import import_module
+from threading import Lock
+from time import monotonic
+
+
+class TTLCache():
+    """ Thread-safe LRU cache whose entries expire.
+
+    Stored values may be anything, including None. Use ``key in cache`` or
+    catch :class:`KeyError` to tell a cached None from a missing entry.
+
+    :type maxsize: int
+    :param maxsize: Maximum number of entries. The least recently used entry
+        is evicted when a new one doesn't fit
+
+    :type ttl: float
+    :param ttl: Default lifetime of an entry in seconds. None means entries
+        only expire through eviction
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        """ Get a value, or *default* when it is missing or expired """
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def set(self, key, value, ttl=None):
+        """ Store a value
+
+        :param ttl: Lifetime of this entry. Overrides the default ttl
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else monotonic() + ttl
+
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """ Remove an entry and return its value """
+        with self._lock:
+            value, expires = self._data.pop(key, (default, None))
+            return value
+
+    def clear(self):
+        """ Remove all entries """
+        with self._lock:
+            self._data.clear()
+
+    def __getitem__(self, key):
+        with self._lock:
+            value, expires = self._data[key]
+
+            if expires is not None and expires <= monotonic():
+                del self._data[key]
+                raise KeyError(key)
+
+            self._data.move_to_end(key)
+            return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MappingBackend():
+    """ Adapt a :class:`~collections.abc.MutableMapping` (like a dict or the
+    caches of cachetools) to the ``get``, ``set`` and ``clear`` methods
+    :class:`StatsCache` uses.
+
+    :type mapping: :class:`~collections.abc.MutableMapping`
+    :param mapping: Stores the entries
+    """
+
+    def __init__(self, mapping):
+        self.mapping = mapping
+
+    def get(self, key, default=None):
+        return self.mapping.get(key, default)
+
+    def set(self, key, value):
+        self.mapping[key] = value
+
+    def clear(self):
+        self.mapping.clear()
+
+
+_MISSING = object()
+
+
+class StatsCache():
+    """ Cache for the results of statistics functions, see :meth:`cached`.
+
+    Results are only invalidated when something they depend on changes.
+    Every entry is tagged with the games, users and watchers its arguments
+    refer to (or with "any", if it has none of these arguments).
+    Invalidating a tag changes the version that is part of the keys of all
+    its entries, so they are never read again and eventually evicted. The
+    cache doesn't have to be scanned.
+
+    Versions are kept per process. The results are stored in *backend*.
+
+    :param backend: Any object with the ``get``, ``set`` and ``clear`` methods
+        of :class:`TTLCache`, or a :class:`~collections.abc.MutableMapping`
+        (see :class:`MappingBackend`). Default: A :class:`TTLCache` with a
+        ttl of 60 seconds
+    """
+
+    _TAGS = {'game_id': 'game', 'user_id': 'user', 'watcher_id': 'watcher'}
+
+    def __init__(self, backend=None):
+        self.backend = TTLCache(4096, 60) if backend is None else \
+            _adapt(backend)
+
+        self._versions = {}
+        self._epoch = 0
+        self._lock = Lock()
+
+    def configure(self, backend='lamon.cache.TTLCache', **options):
+        """ Replace the backend
+
+        :type backend: str
+        :param backend: Import path of the backend class. It may also be a
+            :class:`~collections.abc.MutableMapping`
+
+        :param options: Arguments of the backend class
+        """
+        module, name = backend.rsplit('.', 1)
+        self.backend = _adapt(getattr(import_module(module), name)(**options))
+
+    def cached(self, func):
+        """ Decorator caching the results of *func*. The ``game_id``,
+        ``user_id`` and ``watcher_id`` arguments have to be passed by
+        keyword. The undecorated function is available as ``uncached``
+        """
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = self._key(func, args, kwargs)
+            value = self.backend.get(key, _MISSING)
+
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                self.backend.set(key, value)
+
+            return value
+
+        wrapper.uncached = func
+        return wrapper
+
+    def invalidate(self, game_id=None, user_id=None, watcher_id=None):
+        """ Invalidate the results depending on a game, user or watcher """
+        self._bump({('game', game_id), ('user', user_id),
+                    ('watcher', watcher_id)})
+
+    def invalidate_events(self, events):
+        """ Invalidate the results depending on written events
+
+        :type events: list
+        :param events: Event mappings (dicts with the
+            :class:`~lamon.models.Event` column keys)
+        """
+        tags = set()
+        for event in events:
+            tags.add(('game', event.get('gameID')))
+            tags.add(('user', event.get('userID')))
+            tags.add(('watcher', event.get('watcherID')))
+
+        self._bump(tags)
+
+    def clear(self):
+        """ Invalidate everything """
+        with self._lock:
+            self._epoch += 1
+            self._versions.clear()
+        self.backend.clear()
+
+    def _bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                if tag[1] is not None:
+                    self._versions[tag] = self._versions.get(tag, 0) + 1
+            self._versions['any'] = self._versions.get('any', 0) + 1
+
+    def _key(self, func, args, kwargs):
+        tags = [(tag, kwargs[arg]) for arg, tag in self._TAGS.items()
+                if kwargs.get(arg) is not None] or ['any']
+
+        with self._lock:
+            versions = tuple(self._versions.get(tag, 0) for tag in tags)
+
+        return (func.__module__, func.__qualname__, args,
+                tuple(sorted(kwargs.items())), self._epoch, versions)
+
+
+def _adapt(backend):
+    if not hasattr(backend, 'set') and isinstance(backend, MutableMapping):
+        return MappingBackend(backend)
+    return backend
+
+
+stats_cache = StatsCache()
+""" Cache of the functions in :mod:`lamon.stats` """
@@ -1,13 +1,59 @@
 import click
 
-@click.command()
+
+@click.group(invoke_without_command=True)
 @click.option('--host', default='127.0.0.1', help='Host to bind to')
 @click.option('--port', default=5000, help='Webinterface port')
 @click.option('--config', default='config.toml', help='Configuration file')
-def main(host, port, config):
-    from gevent.pywsgi import WSGIServer
+@click.pass_context
+def main(ctx, host, port, config):
+    ctx.obj = config
+
+    if ctx.invoked_subcommand is None:
+        from gevent.pywsgi import WSGIServer
+        from lamon import create_app
+        http_server = WSGIServer((host, port), create_app(config_file=config))
+        http_server.serve_forever()
 
+
+@main.command('import-logs')
+@click.option('--watcher', 'watcher_id', required=True, type=int,
+              help='ID of the watcher the logs belong to')
+@click.option('--processes', default=None, type=int,
+              help='Parser processes (Default: number of CPUs)')
+@click.option('--batch-size', default=10000, help='Events per transaction')
+@click.argument('paths', nargs=-1, required=True,
+                type=click.Path(exists=True))
+@click.pass_obj
+def import_logs(config, watcher_id, processes, batch_size, paths):
+    """ Import the events in archived log files or directories of them """
     from lamon import create_app
+    from lamon.importer import import_logs
+    from lamon.models import Watcher, db
+    from lamon.watcher import load_watcher_class
+    from lamon.watcher.log_mixin import LogMixin
+
+    app = create_app(config_file=config)
+
+    with app.app_context():
+        watcher = db.session.query(Watcher).get(watcher_id)
+        if watcher is None:
+            raise click.BadParameter(f'No watcher with id {watcher_id}',
+                                     param_hint='--watcher')
+
+        if not issubclass(load_watcher_class(watcher.threadClass), LogMixin):
+            raise click.BadParameter(
+                f'{watcher.threadClass} does not parse logs',
+                param_hint='--watcher')
+
+        def progress(stats):
+            click.echo(f'\r{stats["lines"]} lines, {stats["events"]} events',
+                       nl=False, err=True)
+
+        stats = import_logs(db.session, watcher, paths, processes=processes,
+                            batch_size=batch_size, progress=progress)
 
-    http_server = WSGIServer((host, port), create_app(config_file=config))
-    http_server.serve_forever()
+    rate = stats['lines'] / stats['seconds'] if stats['seconds'] else 0
+    click.echo(f'\rImported {stats["events"]} events from {stats["lines"]} '
+               f'lines in {stats["seconds"]:.1f}s ({rate:.0f} lines/s). '
+               f'Skipped {stats["skipped"]} events of unknown players')
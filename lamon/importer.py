@@ -0,0 +1,212 @@
+""" Import events from archived log files.
+
+Log files are split into chunks, which are parsed in a process pool with the
+:attr:`~lamon.watcher.log_mixin.LogMixin.log_events` of a watcher class.
+Nicknames are resolved with one query per batch and events are written in
+large transactions, like the :class:`~lamon.watcher.writer.EventWriter`
+writes them.
+"""
+import os
+
+from multiprocessing import Pool
+from time import monotonic
+
+from .cache import stats_cache
+from .models import Event, Nickname
+from .rollups import update_rollups
+from .watcher import load_watcher_class
+from .watcher.log_mixin import LogMixin, LogParser
+
+
+def log_chunks(paths, chunk_size=16 << 20):
+    """ Split log files into byte ranges of about *chunk_size*
+
+    :type paths: iterable
+    :param paths: Files and directories. Directories are searched
+        recursively for ``*.log`` files
+
+    :returns: list of (path, start, end) tuples
+    """
+    chunks = []
+
+    for path in _log_files(paths):
+        size = os.path.getsize(path)
+        for start in range(0, size, chunk_size):
+            chunks.append((path, start, min(start + chunk_size, size)))
+
+    return chunks
+
+
+def parse_chunk(watcher_class, chunk):
+    """ Parse the lines starting in a byte range of a log file. Runs in the
+    worker processes.
+
+    :type watcher_class: str
+    :param watcher_class: Import path of a watcher using
+        :class:`~lamon.watcher.log_mixin.LogMixin`
+
+    :type chunk: tuple
+    :param chunk: (path, start, end) from :func:`log_chunks`
+
+    :returns: (number of lines, list of (type, nickname, event arguments))
+    """
+    cls = load_watcher_class(watcher_class)
+    records = []
+    parser = LogParser(
+        {expr: _recorder(cls, type, records)
+         for expr, type in cls.log_events.items()}, cls.log_prefix)
+
+    path, start, end = chunk
+    lines = 0
+
+    with open(path, 'rb') as log:
+        if start:
+            # The line crossing the start belongs to the previous chunk
+            log.seek(start - 1)
+            log.readline()
+
+        while log.tell() < end:
+            line = log.readline()
+            if not line:
+                break
+
+            lines += 1
+            parser.parse(line.decode('utf-8', 'replace').rstrip('\r\n'))
+
+    return lines, records
+
+
+def import_logs(session, watcher, paths, processes=None, batch_size=10000,
+                progress=None):
+    """ Import the events in log files of a watcher
+
+    :type session: :class:`sqlalchemy.orm.session.Session`
+    :param session: Session to write with
+
+    :type watcher: :class:`~lamon.models.Watcher`
+    :param watcher: Watcher the logs belong to. Its class has to use
+        :class:`~lamon.watcher.log_mixin.LogMixin`
+
+    :type paths: iterable
+    :param paths: Files and directories (see :func:`log_chunks`)
+
+    :type processes: int
+    :param processes: Size of the process pool (Default: number of CPUs)
+
+    :type batch_size: int
+    :param batch_size: Events written per transaction
+
+    :type progress: callable
+    :param progress: Called with the statistics after each chunk
+
+    :raises TypeError: When the watcher class doesn't parse logs
+
+    :returns: dict with the number of ``lines``, imported ``events``,
+        ``skipped`` events of unknown players and the ``seconds`` it took
+    """
+    if not issubclass(load_watcher_class(watcher.threadClass), LogMixin):
+        raise TypeError(f'{watcher.threadClass} does not parse logs')
+
+    stats = {'lines': 0, 'events': 0, 'skipped': 0, 'seconds': 0}
+    started = monotonic()
+    writer = _BatchWriter(session, watcher, batch_size)
+
+    with Pool(processes) as pool:
+        chunks = [(watcher.threadClass, chunk) for chunk in log_chunks(paths)]
+
+        for lines, records in pool.imap_unordered(_parse_chunk_args, chunks):
+            stats['lines'] += lines
+            stats['skipped'] += writer.add(records)
+            stats['events'] = writer.written + len(writer.batch)
+            stats['seconds'] = monotonic() - started
+
+            if progress is not None:
+                progress(stats)
+
+    writer.flush()
+    stats['seconds'] = monotonic() - started
+    return stats
+
+
+class _BatchWriter():
+    """ Resolve nicknames and insert events in batches """
+
+    def __init__(self, session, watcher, batch_size):
+        self.session = session
+        self.watcher = watcher
+        self.batch_size = batch_size
+
+        self.batch = []
+        self.written = 0
+        self._user_ids = {}
+
+    def add(self, records):
+        """ Queue parsed records. Returns the number of skipped records """
+        self._resolve({nickname for _, nickname, _ in records})
+        skipped = 0
+
+        for type, nickname, kwargs in records:
+            user_id = self._user_ids[nickname]
+            if user_id is None:
+                skipped += 1
+                continue
+
+            self.batch.append({'type': int(type), 'time': kwargs.get('time'),
+                               'info': None, 'score': kwargs.get('score'),
+                               'payload': kwargs.get('payload'),
+                               'watcherID': self.watcher.id,
+                               'gameID': self.watcher.gameID,
+                               'userID': user_id})
+
+            if len(self.batch) >= self.batch_size:
+                self.flush()
+
+        return skipped
+
+    def flush(self):
+        if not self.batch:
+            return
+
+        self.session.bulk_insert_mappings(Event, self.batch)
+        update_rollups(self.session, self.batch)
+        self.session.commit()
+        stats_cache.invalidate_events(self.batch)
+
+        self.written += len(self.batch)
+        self.batch = []
+
+    def _resolve(self, nicknames):
+        """ Look up unknown nicknames, 500 per query """
+        unknown = [n for n in nicknames if n not in self._user_ids]
+
+        for i in range(0, len(unknown), 500):
+            part = unknown[i:i + 500]
+            query = self.session.query(Nickname.nick, Nickname.userID).\
+                filter(Nickname.gameID == self.watcher.gameID).\
+                filter(Nickname.nick.in_(part))
+
+            self._user_ids.update(dict.fromkeys(part))
+            self._user_ids.update((nick, user_id) for nick, user_id in query)
+
+
+def _parse_chunk_args(args):
+    return parse_chunk(*args)
+
+
+def _recorder(cls, type, records):
+    def record(match):
+        event = cls.log_event(type, match)
+        if event is not None:
+            records.append((type,) + tuple(event))
+    return record
+
+
+def _log_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.endswith('.log'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
@@ -0,0 +1,197 @@
+""" Schema migrations for databases created by older versions of lamon.
+
+New databases get the latest schema from
+:meth:`~flask_sqlalchemy.SQLAlchemy.create_all`. It only creates missing
+tables though, so changes to existing tables (like new indexes) are made by
+the functions in :data:`MIGRATIONS`. The number of applied migrations is
+stored in the ``schema_version`` table.
+
+Migrations run after create_all, on new databases too. So every migration
+has to check whether its change already exists.
+"""
+from logging import getLogger
+from math import isfinite
+
+from sqlalchemy import Table, Column, Integer, MetaData, inspect, select, \
+    func, bindparam
+
+from .models import Event, EventType, Nickname
+
+
+logger = getLogger(__name__)
+
+_metadata = MetaData()
+
+schema_version = Table('schema_version', _metadata,
+                       Column('version', Integer, nullable=False))
+
+
+class MigrationError(Exception):
+    """ Raised by a migration which can't be applied to the database. The
+    migration is retried on the next start
+    """
+    pass
+
+
+def migrate(engine):
+    """ Apply all pending migrations. Stops at the first migration raising
+    :class:`MigrationError`
+
+    :type engine: :class:`sqlalchemy.engine.Engine`
+    :param engine: Engine of the database to migrate
+
+    :returns: Schema version of the database
+    """
+    schema_version.create(engine, checkfirst=True)
+
+    with engine.begin() as connection:
+        version = connection.execute(
+            select([schema_version.c.version])).scalar() or 0
+
+    for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+        logger.info(f'Applying migration {number}: {migration.__doc__}')
+
+        try:
+            with engine.begin() as connection:
+                migration(connection)
+                _set_version(connection, number)
+        except MigrationError as e:
+            logger.error(f'Migration {number} failed: {e}')
+            break
+
+        version = number
+
+    return version
+
+
+def _set_version(connection, version):
+    connection.execute(schema_version.delete())
+    connection.execute(schema_version.insert(), version=version)
+
+
+def _create_index(connection, table, name):
+    """ Create an index declared on a model if it doesn't exist """
+    existing = {i['name'] for i in inspect(connection).get_indexes(table.name)}
+    if name in existing:
+        return
+
+    index = next(i for i in table.indexes if i.name == name)
+    index.create(connection)
+
+
+def _add_column(connection, table, name):
+    """ Add a column declared on a model if it doesn't exist """
+    existing = {c['name'] for c in inspect(connection).get_columns(table.name)}
+    if name in existing:
+        return
+
+    column = table.columns[name]
+    type = column.type.compile(dialect=connection.dialect)
+    connection.execute(f'ALTER TABLE {table.name} ADD COLUMN {name} {type}')
+
+
+def _add_indexes(connection):
+    """ Add indexes for the statistics queries """
+    events = Event.__table__
+
+    _create_index(connection, events, 'ix_events_game_user_type_time')
+    _create_index(connection, events, 'ix_events_watcher_time')
+
+
+def _add_nickname_index(connection):
+    """ Add a unique index for the nickname queries """
+    nicknames = Nickname.__table__
+
+    duplicates = connection.execute(
+        select([nicknames.c.gameID, nicknames.c.nick]).
+        group_by(nicknames.c.gameID, nicknames.c.nick).
+        having(func.count() > 1)).fetchall()
+
+    if duplicates:
+        raise MigrationError(
+            'Nicknames registered more than once for the same game: ' +
+            ', '.join(f'{nick} (game id {game})' for game, nick in duplicates))
+
+    _create_index(connection, nicknames, 'ix_nicknames_game_nick')
+
+
+def _add_typed_values(connection):
+    """ Move scores and event details out of the info column """
+    events = Event.__table__
+
+    _add_column(connection, events, 'score')
+    _add_column(connection, events, 'payload')
+
+    # Casting in SQL fails on PostgreSQL for the first non-numeric info and
+    # JSON can't be built portably in SQL. Convert in batches in Python
+    _convert_info(connection, EventType.USER_SCORE, events.c.score, _score)
+    for type, key in [(EventType.USER_LEAVE, 'reason'),
+                      (EventType.USER_DIE, 'killer')]:
+        _convert_info(connection, type, events.c.payload,
+                      lambda info, key=key: {key: info})
+
+
+def _convert_info(connection, type, column, convert):
+    """ Fill *column* of the events of *type* with the converted info in
+    batches. Events are left unchanged when *convert* returns None """
+    events = Event.__table__
+    update = events.update().\
+        where(events.c.id == bindparam('event_id')).\
+        values({column.name: bindparam('value')})
+
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            select([events.c.id, events.c.info]).
+            where(events.c.type == int(type)).
+            where(events.c.info.isnot(None)).
+            where(column.is_(None)).
+            where(events.c.id > last_id).
+            order_by(events.c.id).limit(10000)).fetchall()
+
+        if not rows:
+            break
+
+        values = [{'event_id': id, 'value': convert(info)}
+                  for id, info in rows]
+        values = [v for v in values if v['value'] is not None]
+        if len(values) < len(rows):
+            logger.warning(f'Skipped {len(rows) - len(values)} events with '
+                           f'invalid info')
+
+        if values:
+            connection.execute(update, values)
+        last_id = rows[-1].id
+
+
+def _score(info):
+    try:
+        score = float(info)
+    except ValueError:
+        return None
+
+    return score if isfinite(score) else None
+
+
+def _add_time_index(connection):
+    """ Add an index for deleting expired events """
+    _create_index(connection, Event.__table__, 'ix_events_time')
+
+
+def _add_user_time_index(connection):
+    """ Add an index for the event listing of users """
+    _create_index(connection, Event.__table__, 'ix_events_user_time')
+
+
+MIGRATIONS = [
+    _add_indexes,
+    _add_typed_values,
+    _add_time_index,
+    _add_user_time_index,
+    _add_nickname_index,
+]
+""" Migrations in the order they are applied. Only ever append to this list.
+Migrations which can fail on existing data (like :func:`_add_nickname_index`)
+must not be followed by migrations the models depend on, since later
+migrations aren't applied until it succeeds
+"""
@@ -39,16 +39,28 @@ class Event(db.Model):
     :param type: An :class:`EventType` specifies how to handle this event
     :param time: Time the event occurred
     :param info: Additional info. Changes with :attr:`type`
+    :param score: Numeric value of the event (like the score of
+        :attr:`~EventType.USER_SCORE`)
+    :param payload: Structured details of the event. Changes with :attr:`type`
     :param watcher: Watcher the event occurred in (If any)
     :param game: Game the event occured in (If any)
     :param user: User connected to the event (If any)
     """
     __tablename__ = 'events'
+    __table_args__ = (
+        db.Index('ix_events_game_user_type_time',
+                 'gameID', 'userID', 'type', 'time'),
+        db.Index('ix_events_watcher_time', 'watcherID', 'time'),
+        db.Index('ix_events_time', 'time'),
+        db.Index('ix_events_user_time', 'userID', 'time'),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     type = db.Column(db.Integer)
     time = db.Column(DateTime())
     info = db.Column(db.String)
+    score = db.Column(db.Float)
+    payload = db.Column(db.JSON(none_as_null=True))
 
     watcherID = db.Column(db.Integer, db.ForeignKey('watchers.id'))
     watcher = db.relationship('Watcher', back_populates='events')
@@ -74,6 +86,12 @@ class Event(db.Model):
         if self.userID is not None:
             msg += f'User = {self.user}; '
 
+        if self.score is not None:
+            msg += f'Score = {self.score}; '
+
+        if self.payload is not None:
+            msg += f'Payload = {self.payload}; '
+
         if self.info is not None:
             msg += f'Info = {self.info}'
 
@@ -125,6 +143,62 @@ class Watcher(db.Model):
         return f'{self.game} ({self.info})'
 
 
+class ScoreRollup(db.Model):
+    """ Latest and highest score of a user in a watcher. Maintained from
+    :attr:`~EventType.USER_SCORE` events by :mod:`lamon.rollups`
+
+    :param score: Latest score
+    :param max_score: Highest score
+    :param time: Time of the latest score
+    """
+    __tablename__ = 'score_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('userID', 'gameID', 'watcherID'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    score = db.Column(db.Float)
+    max_score = db.Column(db.Float)
+    time = db.Column(DateTime())
+
+    userID = db.Column(db.Integer, db.ForeignKey('users.id'))
+    gameID = db.Column(db.Integer, db.ForeignKey('games.id'))
+    watcherID = db.Column(db.Integer, db.ForeignKey('watchers.id'))
+
+
+class ScoreBucket(db.Model):
+    """ Scores of a user in a watcher aggregated over a time bucket.
+    Maintained from :attr:`~EventType.USER_SCORE` events by
+    :mod:`lamon.rollups`
+
+    :param resolution: Length of the bucket in seconds
+    :param start: Start of the bucket
+    :param end: Time of the last score in the bucket
+    :param last: Last score in the bucket
+    :param min_score: Lowest score in the bucket
+    :param max_score: Highest score in the bucket
+    :param count: Number of scores in the bucket
+    """
+    __tablename__ = 'score_buckets'
+    __table_args__ = (
+        db.UniqueConstraint('userID', 'gameID', 'watcherID', 'resolution',
+                            'start'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    resolution = db.Column(db.Integer)
+    start = db.Column(DateTime())
+    end = db.Column(DateTime())
+    last = db.Column(db.Float)
+    min_score = db.Column(db.Float)
+    max_score = db.Column(db.Float)
+    count = db.Column(db.Integer)
+
+    userID = db.Column(db.Integer, db.ForeignKey('users.id'))
+    gameID = db.Column(db.Integer, db.ForeignKey('games.id'))
+    watcherID = db.Column(db.Integer, db.ForeignKey('watchers.id'))
+
+
 class Role(db.Model):
     """ A user role on the system
 
@@ -158,6 +232,9 @@ class Nickname(db.Model):
     :param game: Associated game
     """
     __tablename__ = 'nicknames'
+    __table_args__ = (
+        db.Index('ix_nicknames_game_nick', 'gameID', 'nick', unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     nick = db.Column(db.String)
@@ -210,10 +287,12 @@ class EventType(IntEnum):
     **User related events**. :attr:`Event.userID`, :attr:`Event.watcherID` and
     :attr:`Event.gameID` have to be set.
 
-    :param USER_SCORE: User score. :attr:`Event.info` is the absolute score.
+    :param USER_SCORE: User score. :attr:`Event.score` is the absolute score.
     :param USER_JOIN: User joined a game.
-    :param USER_LEAVE: User left a game.
-    :param USER_DIE: User died in game
+    :param USER_LEAVE: User left a game. :attr:`Event.payload` may contain
+        the ``reason``
+    :param USER_DIE: User died in game. :attr:`Event.payload` may contain the
+        ``killer`` and ``weapon``
     :param USER_RESPAWN: User respawned after death
     """
     WATCHER_START = 1000
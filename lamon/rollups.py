@@ -0,0 +1,162 @@
+""" Incrementally maintained score aggregates.
+
+:class:`~lamon.models.ScoreRollup` and :class:`~lamon.models.ScoreBucket` rows
+are updated from :attr:`~lamon.models.EventType.USER_SCORE` events in the same
+transaction the events are written in. Statistics read these aggregates
+instead of scanning the events table.
+"""
+from datetime import timedelta
+
+from .models import Event, EventType, ScoreRollup, ScoreBucket
+
+
+RESOLUTIONS = (60, 3600)
+""" Bucket lengths (in seconds) maintained in :class:`ScoreBucket` """
+
+_COLUMNS = (Event.type, Event.time, Event.score, Event.userID, Event.gameID,
+            Event.watcherID)
+
+
+def update_rollups(session, events):
+    """ Fold score events into the aggregates. Doesn't commit.
+
+    :type session: :class:`sqlalchemy.orm.session.Session`
+    :param session: Session to update the aggregates in
+
+    :type events: list
+    :param events: Event mappings (dicts with the :class:`Event` column keys).
+        Events other than :attr:`~EventType.USER_SCORE` are ignored
+    """
+    scores = sorted(_scores(events), key=lambda s: s[1])
+    if not scores:
+        return
+
+    user_ids = {key[0] for key, time, score in scores}
+    _update_latest(session, scores, user_ids)
+    _update_buckets(session, scores, user_ids)
+
+
+def rebuild_rollups(session, chunk_size=10000):
+    """ Recompute all aggregates from the events table. Commits.
+    Aggregates of events deleted by the
+    :class:`~lamon.watcher.retention.RetentionJob` are lost.
+
+    :type session: :class:`sqlalchemy.orm.session.Session`
+    :param session: Session to use
+
+    :type chunk_size: int
+    :param chunk_size: Number of events loaded at once
+    """
+    session.query(ScoreRollup).delete()
+    session.query(ScoreBucket).delete()
+
+    last_id = 0
+    while True:
+        rows = session.query(Event.id, *_COLUMNS).\
+            filter(Event.type == int(EventType.USER_SCORE)).\
+            filter(Event.id > last_id).\
+            order_by(Event.id).limit(chunk_size).all()
+
+        if not rows:
+            break
+
+        update_rollups(session, [row._asdict() for row in rows])
+        session.flush()
+        last_id = rows[-1].id
+
+    session.commit()
+
+
+def bucket_start(time, resolution):
+    """ Start of the bucket *time* falls into
+
+    :type time: :class:`datetime.datetime`
+    :param time: Time of the score
+
+    :type resolution: int
+    :param resolution: Bucket length in seconds. Has to divide a day
+    """
+    seconds = time.hour * 3600 + time.minute * 60 + time.second
+    return time - timedelta(seconds=seconds % resolution,
+                            microseconds=time.microsecond)
+
+
+def _scores(events):
+    """ Yield (key, time, score) of every usable score event """
+    for event in events:
+        if event['type'] != EventType.USER_SCORE or event['userID'] is None \
+                or event['score'] is None:
+            continue
+
+        key = (event['userID'], event['gameID'], event['watcherID'])
+        yield key, event['time'], event['score']
+
+
+def _update_latest(session, scores, user_ids):
+    latest = {}
+    highest = {}
+    for key, time, score in scores:
+        latest[key] = (time, score)
+        highest[key] = max(highest.get(key, score), score)
+
+    query = session.query(ScoreRollup).\
+        filter(ScoreRollup.userID.in_(user_ids))
+    existing = {(r.userID, r.gameID, r.watcherID): r for r in query}
+
+    for key, (time, score) in latest.items():
+        rollup = existing.get(key)
+
+        if rollup is None:
+            session.add(ScoreRollup(userID=key[0], gameID=key[1],
+                                    watcherID=key[2], score=score,
+                                    max_score=highest[key], time=time))
+            continue
+
+        if rollup.time is None or time >= rollup.time:
+            rollup.score = score
+            rollup.time = time
+        rollup.max_score = max(rollup.max_score, highest[key])
+
+
+def _update_buckets(session, scores, user_ids):
+    buckets = {}
+    for key, time, score in scores:
+        for resolution in RESOLUTIONS:
+            index = key + (resolution, bucket_start(time, resolution))
+            bucket = buckets.get(index)
+
+            if bucket is None:
+                buckets[index] = {'end': time, 'last': score,
+                                  'min_score': score, 'max_score': score,
+                                  'count': 1}
+                continue
+
+            bucket['end'] = time
+            bucket['last'] = score
+            bucket['min_score'] = min(bucket['min_score'], score)
+            bucket['max_score'] = max(bucket['max_score'], score)
+            bucket['count'] += 1
+
+    starts = [index[4] for index in buckets]
+    query = session.query(ScoreBucket).\
+        filter(ScoreBucket.userID.in_(user_ids)).\
+        filter(ScoreBucket.start >= min(starts)).\
+        filter(ScoreBucket.start <= max(starts))
+    existing = {(b.userID, b.gameID, b.watcherID, b.resolution, b.start): b
+                for b in query}
+
+    for index, values in buckets.items():
+        bucket = existing.get(index)
+
+        if bucket is None:
+            session.add(ScoreBucket(userID=index[0], gameID=index[1],
+                                    watcherID=index[2], resolution=index[3],
+                                    start=index[4], **values))
+            continue
+
+        if values['end'] >= bucket.end:
+            bucket.end = values['end']
+            bucket.last = values['last']
+        bucket.min_score = min(bucket.min_score, values['min_score'])
+        bucket.max_score = max(bucket.max_score, values['max_score'])
+        bucket.count += values['count']
@@ -0,0 +1,47 @@
+// Infinite scrolling for event lists rendered by render_events
+document.querySelectorAll('.event-list').forEach(function (list) {
+    var more = list.parentNode.querySelector('.event-list-more');
+    var loading = false;
+
+    if (!more) {
+        return;
+    }
+
+    function load() {
+        var next = list.dataset.next;
+        if (loading || !next) {
+            return;
+        }
+
+        loading = true;
+        fetch(next)
+            .then(function (response) { return response.json(); })
+            .then(function (page) {
+                page.events.forEach(function (event) {
+                    var div = document.createElement('div');
+                    div.className = 'event';
+                    div.textContent = event.text;
+                    list.appendChild(div);
+                });
+
+                list.dataset.next = page.next_url || '';
+                if (!page.next_url) {
+                    more.remove();
+                }
+            })
+            .finally(function () { loading = false; });
+    }
+
+    more.addEventListener('click', function (e) {
+        e.preventDefault();
+        load();
+    });
+
+    if ('IntersectionObserver' in window) {
+        new IntersectionObserver(function (entries) {
+            if (entries[0].isIntersecting) {
+                load();
+            }
+        }).observe(more);
+    }
+});
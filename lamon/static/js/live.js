@@ -0,0 +1,20 @@
+// Update scoreboards with events pushed by the live blueprint
+document.querySelectorAll('[data-live]').forEach(function (table) {
+    if (!('EventSource' in window)) {
+        return;
+    }
+
+    var source = new EventSource(table.dataset.live);
+
+    source.onmessage = function (message) {
+        var event = JSON.parse(message.data);
+        if (event.type !== 'USER_SCORE' || event.userID === null) {
+            return;
+        }
+
+        var cell = table.querySelector('[data-score-user="' + event.userID + '"]');
+        if (cell) {
+            cell.textContent = event.score;
+        }
+    };
+});
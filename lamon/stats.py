@@ -1,28 +1,79 @@
 """ Collection of functions to retrieve statistics """
+from sqlalchemy import func
+
 from . import db
-from .models import User, Event, EventType
+from .cache import stats_cache
+from .models import User, Event, EventType, ScoreRollup, ScoreBucket, \
+    Nickname
+from .rollups import bucket_start
+from .watcher.presence import presence
 
 from datetime import datetime
 
 
 def currently_playing(watcher_id=None, game_id=None):
-    events = Event.query.\
-        filter(Event.type == EventType.USER_JOIN, Event.type == EventType.USER_LEAVE).\
-        order_by(Event.time.asc()).all()
-
-    return -2
+    return presence.count(watcher_id=watcher_id, game_id=game_id)
 
 
+@stats_cache.cached
 def number_of_players(watcher_id=None, game_id=None):
-    query = User.query
+    """ Number of distinct users with events """
+    players = _players(watcher_id=watcher_id, game_id=game_id)
 
-    if watcher_id is not None:
-        query = query.filter(User.events.any(Event.watcherID == watcher_id))
+    return db.session.query(func.count(func.distinct(players.c.userID))).\
+        scalar()
 
-    if game_id is not None:
-        query = query.filter(User.events.any(Event.gameID == game_id))
 
-    return len(list(query.all()))
+@stats_cache.cached
+def players_per_game(watcher_id=None):
+    """ :func:`number_of_players` of all games in one query
+
+    :returns: dict mapping game ids to counts. Games without players are
+        missing
+    """
+    players = _players(watcher_id=watcher_id)
+    query = db.session.query(players.c.gameID,
+                             func.count(func.distinct(players.c.userID)))
+
+    return dict(query.group_by(players.c.gameID))
+
+
+@stats_cache.cached
+def players_per_watcher(game_id=None):
+    """ :func:`number_of_players` of all watchers in one query
+
+    :returns: dict mapping watcher ids to counts. Watchers without players
+        are missing
+    """
+    players = _players(game_id=game_id)
+    query = db.session.query(players.c.watcherID,
+                             func.count(func.distinct(players.c.userID)))
+
+    return dict(query.group_by(players.c.watcherID))
+
+
+def _players(watcher_id=None, game_id=None):
+    """ Subquery of the (userID, gameID, watcherID) combinations with events.
+    Events deleted by the :class:`~lamon.watcher.retention.RetentionJob`
+    still count through their :class:`ScoreRollup`
+    """
+    queries = []
+
+    for model in [Event, ScoreRollup]:
+        query = db.session.query(model.userID.label('userID'),
+                                 model.gameID.label('gameID'),
+                                 model.watcherID.label('watcherID')).\
+            filter(model.userID.isnot(None))
+
+        if watcher_id is not None:
+            query = query.filter(model.watcherID == watcher_id)
+
+        if game_id is not None:
+            query = query.filter(model.gameID == game_id)
+
+        queries.append(query)
+
+    return queries[0].union(queries[1]).subquery()
 
 
 def score(timeline=False, **kwargs):
@@ -31,30 +82,149 @@ def score(timeline=False, **kwargs):
     return _score(**kwargs)
 
 
-def _score_timeline(game_id=None, user_id=None):
+@stats_cache.cached
+def _score_timeline(game_id=None, user_id=None, points=None):
+    """ Score of a user over time
+
+    :type points: int
+    :param points: Maximum number of points returned. Long timelines are
+        read from the hour buckets and downsampled with :func:`lttb`. All
+        points are returned if None
+
+    :returns: (x, y) lists
+    """
     if user_id is None:
         raise ValueError('user_id is required')
 
-    events = Event.query.\
-        filter(Event.gameID == game_id).\
-        filter(Event.userID == user_id).\
-        filter(Event.type == EventType.USER_SCORE).all()
+    def buckets(resolution):
+        query = db.session.query(ScoreBucket.start,
+                                 func.max(ScoreBucket.last)).\
+            filter(ScoreBucket.userID == user_id).\
+            filter(ScoreBucket.resolution == resolution)
+
+        if game_id is not None:
+            query = query.filter(ScoreBucket.gameID == game_id)
+
+        return query.group_by(ScoreBucket.start).order_by(ScoreBucket.start)
+
+    minutes = buckets(60)
+
+    if points is not None and minutes.count() > points * 4:
+        # Way too many points. Don't even load them
+        series = buckets(3600).all()
+    else:
+        minutes = minutes.all()
+
+        # Minute buckets of old scores are deleted by the retention job. Use
+        # the hour buckets for that time
+        hours = buckets(3600)
+        if minutes:
+            hours = hours.filter(
+                ScoreBucket.start < bucket_start(minutes[0][0], 3600))
+
+        series = hours.all() + minutes
+
+    if points is not None:
+        series = lttb(series, points)
 
     x = []
     y = []
 
-    for event in events:
-        x.append(event.time.strftime('%Y-%m-%d %H:%M:%S'))
-        y.append(float(event.info))
+    for start, last in series:
+        x.append(start.strftime('%Y-%m-%d %H:%M:%S'))
+        y.append(last)
 
     return x, y
 
 
+def lttb(series, threshold):
+    """ Downsample a series with the Largest-Triangle-Three-Buckets
+    algorithm, which keeps the visual shape of the series.
+
+    :type series: list
+    :param series: (x, y) tuples sorted by x. x may be a number or a
+        :class:`datetime.datetime`
+
+    :type threshold: int
+    :param threshold: Number of points to keep
+
+    :returns: list of (x, y) tuples
+    """
+    if threshold >= len(series) or threshold < 3:
+        return list(series)
+
+    xs = [x.timestamp() if isinstance(x, datetime) else x for x, y in series]
+    ys = [y for x, y in series]
+
+    # The first and last point are always kept. The other points are split
+    # into threshold - 2 buckets
+    every = (len(series) - 2) / (threshold - 2)
+    sampled = [0]
+    a = 0
+
+    for i in range(threshold - 2):
+        # Average of the next bucket
+        start = int((i + 1) * every) + 1
+        end = min(int((i + 2) * every) + 1, len(series))
+        avg_x = sum(xs[start:end]) / (end - start)
+        avg_y = sum(ys[start:end]) / (end - start)
+
+        # Point of this bucket forming the largest triangle with the
+        # previously selected point and the average
+        best = None
+        max_area = -1
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) -
+                       (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > max_area:
+                max_area = area
+                best = j
+
+        sampled.append(best)
+        a = best
+
+    sampled.append(len(series) - 1)
+    return [series[i] for i in sampled]
+
+
+@stats_cache.cached
 def _score(game_id=None, user_id=None):
-    return 3
+    query = ScoreRollup.query.filter(ScoreRollup.userID == user_id)
+
+    if game_id is not None:
+        query = query.filter(ScoreRollup.gameID == game_id)
+
+    rollup = query.order_by(ScoreRollup.time.desc()).first()
+    return 0 if rollup is None else rollup.score
+
+
+def scoreboard(game_id):
+    """ Players of a game with their nickname and latest score, in one query
+
+    :type game_id: int
+    :param game_id: Game to list the players of
+
+    :returns: list of (:class:`User`, nickname, score) tuples. The score is
+        None for players without scores
+    """
+    latest = db.session.query(ScoreRollup.score).\
+        filter(ScoreRollup.userID == User.id).\
+        filter(ScoreRollup.gameID == game_id).\
+        order_by(ScoreRollup.time.desc()).\
+        limit(1).correlate(User).as_scalar()
+
+    query = db.session.query(User, Nickname.nick, latest).\
+        join(Nickname, Nickname.userID == User.id).\
+        filter(Nickname.gameID == game_id).\
+        order_by(User.username)
+
+    return query.all()
 
 
 def register_stats(app):
+    cache_config = app.config.get('STATS', {}).get('cache', {})
+    stats_cache.configure(**cache_config)
+
     app.jinja_env.globals.update(stats_number_of_players=number_of_players)
     app.jinja_env.globals.update(stats_currently_playing=currently_playing)
     app.jinja_env.globals.update(stats_score=score)
@@ -2,6 +2,9 @@ from .main import main_blueprint
 from .user import user_blueprint
 from .game import game_blueprint
 from .watcher import watcher_blueprint
+from .events import events_blueprint
+from .stats import stats_blueprint
+from .live import live_blueprint
 
 
 def register_blueprints(app):
@@ -9,4 +12,6 @@ def register_blueprints(app):
     app.register_blueprint(user_blueprint, url_prefix='/user')
     app.register_blueprint(game_blueprint, url_prefix='/game')
     app.register_blueprint(watcher_blueprint, url_prefix='/watcher')
-    # app.register_blueprint(stats_blueprint, url_prefix='/stats')
+    app.register_blueprint(events_blueprint, url_prefix='/events')
+    app.register_blueprint(stats_blueprint, url_prefix='/stats')
+    app.register_blueprint(live_blueprint, url_prefix='/live')
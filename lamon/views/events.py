@@ -0,0 +1,119 @@
+from datetime import datetime
+
+from flask import Blueprint, jsonify, request, abort, url_for
+from sqlalchemy import or_, and_
+
+from ..models import Event, EventType
+
+events_blueprint = Blueprint('events', __name__, template_folder='templates')
+
+_CURSOR_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+MAX_LIMIT = 500
+
+
+def event_page(before=None, limit=50, watcher_id=None, user_id=None,
+               game_id=None):
+    """ Get one page of events, newest first. Uses keyset pagination, so
+    every page is loaded in constant time regardless of how many events are
+    older or newer.
+
+    :type before: str
+    :param before: Cursor returned with the previous page. None for the
+        newest events
+
+    :type limit: int
+    :param limit: Number of events on the page
+
+    :raises ValueError: When the cursor is invalid
+
+    :returns: (events, cursor of the next page). The cursor is None on the
+        last page
+    """
+    query = Event.query
+
+    if watcher_id is not None:
+        query = query.filter(Event.watcherID == watcher_id)
+    if user_id is not None:
+        query = query.filter(Event.userID == user_id)
+    if game_id is not None:
+        query = query.filter(Event.gameID == game_id)
+
+    if before is not None:
+        time, id = decode_cursor(before)
+        query = query.filter(or_(Event.time < time,
+                                 and_(Event.time == time, Event.id < id)))
+
+    events = query.order_by(Event.time.desc(), Event.id.desc()).\
+        limit(limit + 1).all()
+
+    if len(events) > limit:
+        return events[:limit], encode_cursor(events[limit - 1])
+    return events, None
+
+
+def encode_cursor(event):
+    """ Cursor pointing behind *event* """
+    return f'{event.time.strftime(_CURSOR_FORMAT)},{event.id}'
+
+
+def decode_cursor(cursor):
+    """ Inverse of :func:`encode_cursor`
+
+    :raises ValueError: When the cursor is invalid
+    """
+    time, id = cursor.rsplit(',', 1)
+    return datetime.strptime(time, _CURSOR_FORMAT), int(id)
+
+
+def event_page_args():
+    """ :func:`event_page` arguments from the query string. Aborts with 400
+    on invalid values
+    """
+    args = {'before': request.args.get('before')}
+
+    try:
+        args['limit'] = min(int(request.args.get('limit', 50)), MAX_LIMIT)
+        for key in ['watcher_id', 'user_id', 'game_id']:
+            if key in request.args:
+                args[key] = int(request.args[key])
+
+        if args['before'] is not None:
+            decode_cursor(args['before'])
+    except ValueError:
+        abort(400)
+
+    if args['limit'] < 1:
+        abort(400)
+
+    return args
+
+
+def event_json(event):
+    return {'id': event.id,
+            'type': EventType(event.type).name,
+            'time': event.time.isoformat(),
+            'text': str(event),
+            'info': event.info,
+            'score': event.score,
+            'payload': event.payload,
+            'watcherID': event.watcherID,
+            'gameID': event.gameID,
+            'userID': event.userID}
+
+
+@events_blueprint.route('/')
+def index():
+    """ One page of events as JSON. Accepts the arguments of
+    :func:`event_page` in the query string
+    """
+    args = event_page_args()
+    events, cursor = event_page(**args)
+
+    filters = {k: v for k, v in args.items()
+               if k not in ('before', 'limit')}
+    next_url = None if cursor is None else \
+        url_for('events.index', before=cursor, limit=args['limit'], **filters)
+
+    return jsonify(events=[event_json(e) for e in events], next=cursor,
+                   next_url=next_url)
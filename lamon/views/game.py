@@ -5,6 +5,7 @@ from sqlalchemy.exc import IntegrityError
 
 from ..models import Game, Watcher, User, Nickname
 from .. import db
+from ..stats import players_per_game, players_per_watcher, scoreboard
 
 
 game_blueprint = Blueprint('games', __name__, template_folder='templates')
@@ -13,7 +14,8 @@ game_blueprint = Blueprint('games', __name__, template_folder='templates')
 @game_blueprint.route('/')
 def index():
     games = Game.query.all()
-    return render_template('game/index.html', games=list(games))
+    return render_template('game/index.html', games=list(games),
+                           player_counts=players_per_game())
 
 
 @game_blueprint.route('/<int:game_id>/')
@@ -24,12 +26,8 @@ def index_one(game_id):
         abort(404)
 
     watchers = Watcher.query.filter(Watcher.game == game).all()
-    players = User.query.filter(User.nicknames.any(Nickname.game == game)).all()
-    for player in players: # XXX Don't use this
-        setattr(player, 'nickname',
-                Nickname.query.\
-                    filter(Nickname.user == player, Nickname.game == game)\
-                    .one().nick)
+    players = scoreboard(game.id)
 
     return render_template('game/index_one.html', game=game, watchers=watchers,
-                           players=players)
+                           players=players,
+                           player_counts=players_per_watcher(game_id=game.id))
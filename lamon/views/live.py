@@ -0,0 +1,75 @@
+import json
+
+import gevent
+from flask import Blueprint, Response, request, current_app, abort
+
+from ..watcher.feed import feed
+
+live_blueprint = Blueprint('live', __name__, template_folder='templates')
+
+
+@live_blueprint.record_once
+def configure_feed(state):
+    live_config = state.app.config.get('STATS', {}).get('live', {})
+    feed.configure(live_config.get('buffer_size', 256))
+
+
+@live_blueprint.route('/game/<int:game_id>')
+def game(game_id):
+    """ Server-Sent Events stream of new events of a game """
+    return _event_stream(('game', game_id))
+
+
+@live_blueprint.route('/watcher/<int:watcher_id>')
+def watcher(watcher_id):
+    """ Server-Sent Events stream of new events of a watcher """
+    return _event_stream(('watcher', watcher_id))
+
+
+def _event_stream(topic):
+    """ Stream events of *topic* from the :class:`~lamon.watcher.feed.EventFeed`.
+
+    Starts with events published after the ``Last-Event-ID`` header, so
+    reconnecting browsers don't miss events still in the buffer. Without
+    the header only new events are sent.
+
+    Events are streamed as soon as watchers emit them, so they may not be
+    persisted yet. Queries of the statistics views can lag behind.
+    """
+    config = current_app.config.get('STATS', {}).get('live', {})
+
+    try:
+        last_id = int(request.headers.get('Last-Event-ID', feed.last_id))
+    except ValueError:
+        abort(400)
+
+    lines = _sse_lines(topic, last_id,
+                       poll_interval=config.get('poll_interval', 1),
+                       heartbeat=config.get('heartbeat', 15))
+
+    headers = {'Cache-Control': 'no-cache',
+               'X-Accel-Buffering': 'no'}  # Don't buffer in nginx
+    return Response(lines, mimetype='text/event-stream', headers=headers)
+
+
+def _sse_lines(topic, last_id, poll_interval, heartbeat):
+    """ Poll the in-memory feed. Sleeping yields to other greenlets of the
+    gevent server, so idle streams cost neither a thread nor a query
+    """
+    yield f'retry: {int(poll_interval * 1000)}\n\n'
+    idle = 0
+
+    while True:
+        events = feed.since(topic, last_id)
+
+        for last_id, event in events:
+            yield f'id: {last_id}\ndata: {json.dumps(event)}\n\n'
+
+        if events:
+            idle = 0
+        elif idle >= heartbeat:
+            yield ': heartbeat\n\n'  # Detects disconnected clients
+            idle = 0
+
+        gevent.sleep(poll_interval)
+        idle += poll_interval
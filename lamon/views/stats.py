@@ -1,7 +1,163 @@
-from flask import Blueprint, jsonify, current_app
+import csv
+import io
+import json
+
+from datetime import datetime
+
+from flask import Blueprint, Response, request, abort, stream_with_context
+
+from ..models import Event, EventType, ScoreBucket
 
 stats_blueprint = Blueprint('stats', __name__, template_folder='templates')
 
-@game_blueprint.route('/')
-def index():
-    pass
+_TIME_FORMATS = ['%Y-%m-%dT%H:%M:%S', '%Y-%m-%d']
+
+_EVENT_COLUMNS = ['id', 'type', 'time', 'info', 'score', 'payload',
+                  'watcherID', 'gameID', 'userID']
+
+_SCORE_COLUMNS = ['time', 'score', 'min_score', 'max_score', 'count',
+                  'watcherID', 'gameID', 'userID']
+
+
+@stats_blueprint.route('/events.<format>')
+def events(format):
+    """ Export events as NDJSON or CSV, oldest first.
+
+    Query arguments: ``game_id``, ``user_id``, ``watcher_id``, ``type``
+    (name of an :class:`EventType`), ``since`` and ``until``
+    (``YYYY-mm-dd[THH:MM:SS]``)
+    """
+    query = _filter(Event.query.with_entities(
+        *(getattr(Event, column) for column in _EVENT_COLUMNS)),
+        Event, Event.time)
+
+    if 'type' in request.args:
+        try:
+            query = query.filter(
+                Event.type == int(EventType[request.args['type']]))
+        except KeyError:
+            abort(400)
+
+    query = query.order_by(Event.time, Event.id)
+    rows = (_event_row(row) for row in _stream(query))
+
+    return _export(rows, _EVENT_COLUMNS, format, 'events')
+
+
+@stats_blueprint.route('/score.<format>')
+def score(format):
+    """ Export score timelines as NDJSON or CSV, oldest first.
+
+    Query arguments: the filters of :func:`events`, and ``resolution``:
+    ``raw`` (every score event, the default), ``minute`` or ``hour``
+    (aggregated :class:`ScoreBucket` s)
+    """
+    resolution = request.args.get('resolution', 'raw')
+
+    if resolution == 'raw':
+        query = _filter(Event.query.with_entities(
+            Event.time, Event.score, Event.watcherID, Event.gameID,
+            Event.userID), Event, Event.time).\
+            filter(Event.type == int(EventType.USER_SCORE)).\
+            order_by(Event.time, Event.id)
+        rows = ({'time': e.time.isoformat(), 'score': e.score,
+                 'min_score': e.score, 'max_score': e.score, 'count': 1,
+                 'watcherID': e.watcherID, 'gameID': e.gameID,
+                 'userID': e.userID} for e in _stream(query))
+    elif resolution in ('minute', 'hour'):
+        seconds = 60 if resolution == 'minute' else 3600
+        query = _filter(ScoreBucket.query.with_entities(
+            ScoreBucket.start, ScoreBucket.last, ScoreBucket.min_score,
+            ScoreBucket.max_score, ScoreBucket.count, ScoreBucket.watcherID,
+            ScoreBucket.gameID, ScoreBucket.userID),
+            ScoreBucket, ScoreBucket.start).\
+            filter(ScoreBucket.resolution == seconds).\
+            order_by(ScoreBucket.start, ScoreBucket.id)
+        rows = ({'time': b.start.isoformat(), 'score': b.last,
+                 'min_score': b.min_score, 'max_score': b.max_score,
+                 'count': b.count, 'watcherID': b.watcherID,
+                 'gameID': b.gameID, 'userID': b.userID}
+                for b in _stream(query))
+    else:
+        abort(400)
+
+    return _export(rows, _SCORE_COLUMNS, format, 'score')
+
+
+def _filter(query, model, time):
+    """ Apply the filters from the query string """
+    try:
+        for arg, column in [('game_id', model.gameID),
+                            ('user_id', model.userID),
+                            ('watcher_id', model.watcherID)]:
+            if arg in request.args:
+                query = query.filter(column == int(request.args[arg]))
+
+        if 'since' in request.args:
+            query = query.filter(time >= _parse_time(request.args['since']))
+        if 'until' in request.args:
+            query = query.filter(time < _parse_time(request.args['until']))
+    except ValueError:
+        abort(400)
+
+    return query
+
+
+def _parse_time(value):
+    for format in _TIME_FORMATS:
+        try:
+            return datetime.strptime(value, format)
+        except ValueError:
+            pass
+
+    raise ValueError(f'Invalid time: {value}')
+
+
+def _stream(query):
+    """ Iterate over a query without loading all rows at once. Uses a server
+    side cursor where the database supports it
+    """
+    return query.execution_options(stream_results=True).yield_per(1000)
+
+
+def _event_row(row):
+    """ Export row of the _EVENT_COLUMNS of an event. Selecting the columns
+    instead of events keeps the session from collecting the events and
+    their relationships during long exports """
+    row = dict(zip(_EVENT_COLUMNS, row))
+    row['type'] = EventType(row['type']).name
+    row['time'] = row['time'].isoformat()
+    return row
+
+
+def _export(rows, columns, format, name):
+    if format == 'ndjson':
+        lines = (json.dumps(row) + '\n' for row in rows)
+        mimetype = 'application/x-ndjson'
+    elif format == 'csv':
+        lines = _csv_lines(rows, columns)
+        mimetype = 'text/csv'
+    else:
+        abort(404)
+
+    headers = {'Content-Disposition':
+               f'attachment; filename={name}.{format}'}
+    return Response(stream_with_context(lines), mimetype=mimetype,
+                    headers=headers)
+
+
+def _csv_lines(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, columns)
+
+    writer.writeheader()
+    for row in rows:
+        if row.get('payload') is not None:
+            row['payload'] = json.dumps(row['payload'])
+        writer.writerow(row)
+
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    yield buffer.getvalue()  # Header of an empty export
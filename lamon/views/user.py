@@ -1,8 +1,9 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, abort
 from flask_user import login_required
 from sqlalchemy.orm.exc import NoResultFound
 
 from ..models import User, Nickname
+from .events import event_page, event_page_args
 
 user_blueprint = Blueprint('users', __name__, template_folder='templates')
 
@@ -19,4 +20,10 @@ def index_one(user_id):
         abort(404)
 
     nicknames = Nickname.query.filter(Nickname.user == user).all()
-    return render_template('user/index_one.html', user=user, nicknames=nicknames)
+
+    args = event_page_args()
+    args['user_id'] = user.id
+    events, cursor = event_page(**args)
+
+    return render_template('user/index_one.html', user=user, nicknames=nicknames,
+                           events=events, cursor=cursor)
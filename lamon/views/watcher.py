@@ -3,6 +3,8 @@ from flask_user import roles_required
 from sqlalchemy.orm.exc import NoResultFound
 
 from ..models import Watcher, Game
+from ..stats import players_per_watcher
+from .events import event_page, event_page_args
 
 watcher_blueprint = Blueprint(
     'watchers', __name__, template_folder='templates')
@@ -11,7 +13,8 @@ watcher_blueprint = Blueprint(
 @watcher_blueprint.route('/')
 def index():
     watchers = Watcher.query.all()
-    return render_template('watcher/index.html', watchers=list(watchers))
+    return render_template('watcher/index.html', watchers=list(watchers),
+                           player_counts=players_per_watcher())
 
 
 @watcher_blueprint.route('/<int:watcher_id>')
@@ -21,7 +24,12 @@ def index_one(watcher_id):
     except NoResultFound:
         abort(404)
 
-    return render_template('watcher/index_one.html', watcher=watcher)
+    args = event_page_args()
+    args['watcher_id'] = watcher.id
+    events, cursor = event_page(**args)
+
+    return render_template('watcher/index_one.html', watcher=watcher,
+                           events=events, cursor=cursor)
 
 
 @watcher_blueprint.route('/<int:id>/start')
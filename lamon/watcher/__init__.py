@@ -1,17 +1,36 @@
+import asyncio
 import sys
 
 from abc import ABC, abstractmethod
+from collections import namedtuple
+from concurrent.futures import wait
 from threading import Thread
+from types import MappingProxyType
 from importlib import import_module
 from logging import getLogger, StreamHandler
+from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
 
 from lamon import db
 from .events import Watcher__Events
+from .writer import EventWriter
+from .runtime import WatcherRuntime
 from ..models import Watcher as WatcherModel
 from ..models import Nickname, WatcherConfig, User
 
 
+WatcherSnapshot = namedtuple('WatcherSnapshot',
+                             ['id', 'gameID', 'threadClass', 'info', 'name',
+                              'config'])
+WatcherSnapshot.__doc__ = """ Immutable copy of a :class:`lamon.models.Watcher`
+row, which can be shared between threads.
+
+:param name: String representation of the model
+:param config: Read-only mapping of the raw
+    :class:`~lamon.models.WatcherConfig` values
+"""
+
+
 class Watcher(ABC, Thread, Watcher__Events):
     """ Abstract watcher class. Has to be extended to create a "real"
     watcher plugin.
@@ -22,11 +41,17 @@ class Watcher(ABC, Thread, Watcher__Events):
 
     :type session: :class:`sqlalchemy.orm.session.Session`
     :param session: SQLAlchemy session to access the database. You probably
-        want a scoped_session
+        want a scoped_session. Its transaction is ended after every use, so
+        it doesn't hold a pooled connection while the watcher waits
 
     :type model_id: :class:`int`
     :param model_id: The database id (primary key) of the model.
 
+    :type writer: :class:`lamon.watcher.writer.EventWriter`
+    :param writer: Writer used to save events. Watchers started by the
+        :class:`~lamon.watcher.manager.WatcherManager` share one writer. If
+        None, the watcher creates its own writer using *session*
+
     :raises TypeError: When initialized with a model whose threadClass does
         not fit the object
     :raises KeyError: When a required config-key is missing
@@ -60,11 +85,30 @@ class Watcher(ABC, Thread, Watcher__Events):
                                 the server software.\"\"\"}}
     """
 
-    def __init__(self, logName, session=None, model_id=None):
+    common_config_keys = {
+        'score_heartbeat': {'type': float, 'required': False,
+                            'hint':
+                            """Unchanged scores are not saved. Set this to
+                            save them anyway every given number of
+                            minutes."""},
+        'poll_interval': {'type': float, 'required': False,
+                          'hint':
+                          """Seconds between two polls of the server. Only
+                          used by asyncio based watchers."""}}
+    """ Configuration values every watcher supports. Same format as
+    :attr:`config_keys`.
+    """
+
+    def __init__(self, logName, session=None, model_id=None, writer=None):
         self._session = session
         self._model_id = model_id
+        self._snapshot = None
+        self._refresh_requested = False
         self.config = {}
 
+        self._owns_writer = writer is None
+        self._writer = EventWriter(session) if writer is None else writer
+
         # Setup logger
         self.logger = getLogger(logName)
 
@@ -77,19 +121,7 @@ class Watcher(ABC, Thread, Watcher__Events):
 
         # Load config_keys into self.config
         self.logger.debug(f'Loading watcher configuration')
-        for key, value in self.config_keys.items():
-            query = self._session.query(WatcherConfig).\
-                filter(WatcherConfig.watcherID == self._model_id).\
-                filter(WatcherConfig.key == key)
-            try:
-                self.config[key] = value['type'](query.one().value)
-                self.logger.debug(f'Config: {key} = {self.config[key]}')
-            except NoResultFound:
-                if value['required']:
-                    self.logger.warning(f'No config w/ key found: {key}')
-                    raise KeyError(f'Watcher has no {key} config-key')
-
-                self.logger.debug(f'Optional key {key} not found')
+        self.config = self._load_config(self._model.config)
 
         # Initialize threading.Thread
         super().__init__(name=f'Watcher-{self._model.id}')
@@ -122,12 +154,88 @@ class Watcher(ABC, Thread, Watcher__Events):
 
     @property
     def _model(self):
-        """ Since some database systems don't like multithreaded access
-        this reloads the model at every access.
+        """ :class:`WatcherSnapshot` of the database model.
+
+        Since some database systems don't like multithreaded access, the
+        watcher doesn't keep the model itself. The snapshot is loaded on first
+        access and reloaded (by the thread accessing it) after
+        :meth:`refresh` was called.
+        """
+        if self._snapshot is None or self._refresh_requested:
+            self._refresh_requested = False
+            self._snapshot = self._load_snapshot()
+
+        return self._snapshot
+
+    def refresh(self):
+        """ Signal that the database model changed. The snapshot is reloaded
+        on next access. Safe to call from any thread.
+
+        :attr:`config` is only loaded when the watcher is created. Use
+        :meth:`config_changed` to find out whether it has to be restarted.
+        """
+        self._refresh_requested = True
+
+    def config_changed(self, config):
+        """ Whether configuration values differ from :attr:`config`
+
+        :type config: dict
+        :param config: Configuration values from the database (strings)
         """
+        try:
+            return self._load_config(config) != self.config
+        except KeyError:  # Required key removed
+            return True
+
+    def _load_config(self, raw):
+        """ Typecast the values of :attr:`common_config_keys` and
+        :attr:`config_keys` in *raw*
+
+        :raises KeyError: When a required config-key is missing
+        """
+        config = {}
+        config_keys = dict(self.common_config_keys, **self.config_keys)
+
+        for key, value in config_keys.items():
+            try:
+                config[key] = value['type'](raw[key])
+                self.logger.debug(f'Config: {key} = {config[key]}')
+            except KeyError:
+                if value['required']:
+                    self.logger.warning(f'No config w/ key found: {key}')
+                    raise KeyError(f'Watcher has no {key} config-key')
+
+                self.logger.debug(f'Optional key {key} not found')
+
+        return config
+
+    def _load_snapshot(self):
         query = self._session.query(WatcherModel).\
+            options(joinedload(WatcherModel.config),
+                    joinedload(WatcherModel.game)).\
             filter(WatcherModel.id == self._model_id)
-        return query.one()
+
+        try:
+            model = query.one()
+
+            self.logger.debug('Loaded model snapshot')
+            return WatcherSnapshot(
+                id=model.id, gameID=model.gameID,
+                threadClass=model.threadClass, info=model.info,
+                name=str(model),
+                config=MappingProxyType({c.key: c.value
+                                         for c in model.config}))
+        finally:
+            self._release_session()
+
+    def _release_session(self):
+        """ End the transaction of the session, so its connection goes back
+        to the pool. Watchers only read from the database (events are written
+        by the :class:`~lamon.watcher.writer.EventWriter`), so a watcher
+        holds a connection only while it runs a query, not for its whole
+        lifetime.
+        """
+        self._session.commit()
 
     def stop(self):
         """ Stops the watcher """
@@ -138,13 +246,135 @@ class Watcher(ABC, Thread, Watcher__Events):
         self.logger.debug("Watcher thread stopped")
 
         self.stop_event()
+        self._writer.flush()
+        if self._owns_writer:
+            self._writer.stop()
+        self.logger.debug("Events written")
 
         self._session.commit()
         self._session.close()
         self.logger.debug("DB session closed")
 
     def __repr__(self):
-        return str(self._model)
+        return self._model.name
+
+
+class AsyncWatcher(Watcher):
+    """ Watcher running as a coroutine on a :class:`WatcherRuntime` event loop
+    instead of in its own thread. Plugins implement :meth:`poll`, which is
+    called by a :class:`~lamon.watcher.manager.PollScheduler`.
+
+    Everything that may block (database access and all the event helpers of
+    :class:`~lamon.watcher.events.Watcher__Events`) has to be called through
+    :meth:`run_blocking`.
+
+    :type runtime: :class:`~lamon.watcher.runtime.WatcherRuntime`
+    :param runtime: Runtime to run on. Watchers started by the
+        :class:`~lamon.watcher.manager.WatcherManager` share one runtime. If
+        None, the watcher creates its own runtime
+
+    :type scheduler: :class:`~lamon.watcher.manager.PollScheduler`
+    :param scheduler: Scheduler timing the polls. Shared like *runtime*
+
+    The other parameters are the same as :class:`Watcher`. *session* has to
+    be a :class:`~sqlalchemy.orm.scoping.scoped_session`.
+    """
+
+    poll_interval = 3
+    """ Default seconds between two polls. Can be overwritten with the
+    *poll_interval* config-key
+    """
+
+    def __init__(self, logName, runtime=None, scheduler=None, **kwargs):
+        super().__init__(logName, **kwargs)
+
+        from .manager import PollScheduler
+
+        self._owns_runtime = runtime is None
+        self._runtime = WatcherRuntime() if runtime is None else runtime
+        self._scheduler = PollScheduler() if scheduler is None else scheduler
+        self._future = None
+        self._wakeup = None
+
+    def start(self):
+        """ Schedule the watcher on the event loop """
+        if self._future is not None:
+            raise RuntimeError('watchers can only be started once')
+
+        self._future = self._runtime.submit(self._run_async())
+
+    async def _run_async(self):
+        """ Like :meth:`Watcher.run`, but on the event loop """
+        self._wakeup = asyncio.Event()
+
+        self.logger.info(f'Started watcher (id={self._model_id})')
+        await self.run_blocking(self.start_event)
+
+        try:
+            await self.runner()
+        except Exception as e:
+            await self.run_blocking(self.exception_event, e)
+            self.logger.exception(e)
+
+    async def runner(self):
+        """ Main loop. Lets the scheduler call :meth:`poll` until the watcher
+        is stopped. Plugins may extend it to set up and tear down
+        connections.
+        """
+        await self._scheduler.run(self)
+
+    @abstractmethod
+    async def poll(self):
+        """ Query the server once and emit events. Has to be overwritten with a
+        coroutine.
+
+        :raises WatcherConnectionError: When the server can't be reached.
+            The scheduler emits the connection events and retries with
+            backoff. Other exceptions stop the watcher.
+        """
+
+    async def run_blocking(self, func, *args):
+        """ Run a blocking function in the runtime's executor and return its
+        result. The database session of the executor thread is removed
+        afterwards, so no connection is held between calls.
+        """
+        def call():
+            try:
+                return func(*args)
+            finally:
+                self._session.remove()
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, call)
+
+    async def sleep(self, delay):
+        """ Sleep for *delay* seconds or until the watcher is stopped """
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+
+    def stop(self):
+        """ Stops the watcher """
+        self.shutdown = False
+
+        if self._wakeup is not None:
+            self._runtime.call_soon(self._wakeup.set)
+
+        super().stop()
+
+        if self._owns_runtime:
+            self._runtime.stop()
+
+    def join(self, timeout=None):
+        """ Wait until the watcher coroutine finished """
+        if self._future is None:
+            raise RuntimeError('cannot join watcher before it is started')
+
+        wait([self._future], timeout)
+
+    def is_alive(self):
+        return self._future is not None and not self._future.done()
 
 
 class WatcherException(Exception):
@@ -154,6 +384,14 @@ class WatcherException(Exception):
     pass
 
 
+class WatcherConnectionError(WatcherException):
+    """ Exception to be raised when a server can't be reached. The
+    :class:`~lamon.watcher.manager.PollScheduler` retries polls failing with
+    this exception
+    """
+    pass
+
+
 def load_watcher_class(className):
     """ Dynamically load a class extending watcher into the module namespace.
     This is used by WatcherManager to load the class at watcher startup.
@@ -0,0 +1,188 @@
+from itertools import count
+from logging import getLogger
+from queue import Queue, Full, Empty
+from threading import Thread, Lock
+
+BLOCK = 'block'
+""" Policy: :meth:`EventBus.publish` waits until the subscriber's queue has
+room. Slow subscribers slow down the watchers """
+
+DROP = 'drop'
+""" Policy: Events that don't fit into the subscriber's queue are dropped
+and counted in :attr:`Subscription.dropped` """
+
+_STOP = object()
+
+
+class Subscription():
+    """ Queue of events for one subscriber of an :class:`EventBus`.
+
+    With a *handler*, a daemon thread calls it with lists of queued events
+    (everything queued since the last call, at least one event). Without a
+    handler, the subscriber takes events out with :meth:`get`.
+
+    :type handler: callable
+    :param handler: Called with a list of event mappings (Optional)
+
+    :type types: iterable
+    :param types: :class:`~lamon.models.EventType` s the subscriber gets.
+        None for all events
+
+    :type maxsize: int
+    :param maxsize: Maximum number of queued events
+
+    :type policy: str
+    :param policy: What to do when the queue is full: :data:`DROP` or
+        :data:`BLOCK`
+
+    :type name: str
+    :param name: Name used in log messages and by
+        :meth:`EventBus.subscribe` to replace subscriptions
+    """
+
+    def __init__(self, handler=None, types=None, maxsize=1000, policy=DROP,
+                 name=None):
+        if policy not in (BLOCK, DROP):
+            raise ValueError(f'Unknown policy: {policy}')
+
+        if maxsize < 1:
+            raise ValueError('maxsize must be positive')
+
+        self.handler = handler
+        self.types = None if types is None else \
+            frozenset(int(type) for type in types)
+        self.policy = policy
+        self.name = name
+        self.dropped = 0
+
+        self._queue = Queue(maxsize=maxsize)
+        self._thread = None
+
+        self.logger = getLogger(__name__)
+
+        if handler is not None:
+            self._thread = Thread(target=self._run, daemon=True,
+                                  name=f'EventBus-{name}')
+            self._thread.start()
+
+    def accepts(self, event):
+        """ Whether the subscriber wants *event* """
+        return self.types is None or event['type'] in self.types
+
+    def put(self, event):
+        """ Queue an event according to the policy """
+        if self.policy == BLOCK:
+            self._queue.put(event)
+            return
+
+        try:
+            self._queue.put_nowait(event)
+        except Full:
+            if not self.dropped:
+                self.logger.warning(f'Subscriber {self.name} is too slow. '
+                                    'Dropping events')
+            self.dropped += 1
+
+    def get(self, timeout=None):
+        """ Take the oldest queued event
+
+        :type timeout: float
+        :param timeout: Seconds to wait for an event. Waits forever if None
+
+        :raises queue.Empty: When no event arrived within *timeout*
+        """
+        return self._queue.get(timeout=timeout)
+
+    def close(self):
+        """ Stop the handler thread after it handled all queued events """
+        if self._thread is None:
+            return
+
+        self._queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+
+            try:
+                while True:
+                    batch.append(self._queue.get_nowait())
+            except Empty:
+                pass
+
+            stop = _STOP in batch
+            batch = [event for event in batch if event is not _STOP]
+
+            if batch:
+                try:
+                    self.handler(batch)
+                except Exception as e:
+                    self.logger.exception(e)
+
+            if stop:
+                return
+
+
+class EventBus():
+    """ Deliver events emitted by watchers to in-process consumers.
+
+    :meth:`~lamon.watcher.events.Watcher__Events._add_event` publishes every
+    event as a mapping of :class:`~lamon.models.Event` columns (like the
+    mappings written by the :class:`~lamon.watcher.writer.EventWriter`), so
+    consumers get events in memory instead of reading them from the database.
+    Every subscriber has its own bounded queue and a full queue only affects
+    that subscriber (see :data:`DROP` and :data:`BLOCK`).
+
+    Events are published when they are emitted, before they are committed.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._subscriptions = {}
+        self._names = count(1)
+
+    def subscribe(self, handler=None, name=None, **kwargs):
+        """ Add a subscriber. Accepts the arguments of :class:`Subscription`.
+        An existing subscription with the same *name* is closed and replaced.
+
+        :returns: :class:`Subscription`
+        """
+        if name is None:
+            name = f'subscriber-{next(self._names)}'
+
+        subscription = Subscription(handler=handler, name=name, **kwargs)
+
+        with self._lock:
+            old = self._subscriptions.get(name)
+            self._subscriptions[name] = subscription
+
+        if old is not None:
+            old.close()
+
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """ Remove a subscriber and stop its handler thread """
+        with self._lock:
+            if self._subscriptions.get(subscription.name) is subscription:
+                del self._subscriptions[subscription.name]
+
+        subscription.close()
+
+    def publish(self, event):
+        """ Hand an event to all subscribers of its type
+
+        :type event: dict
+        :param event: Event mapping
+        """
+        with self._lock:
+            subscriptions = list(self._subscriptions.values())
+
+        for subscription in subscriptions:
+            if subscription.accepts(event):
+                subscription.put(dict(event))
+
+
+bus = EventBus()
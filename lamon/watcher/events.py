@@ -1,8 +1,11 @@
 from datetime import datetime
+from time import monotonic
 
-from sqlalchemy.orm.exc import NoResultFound
-
-from ..models import EventType, Event, User, Nickname
+from ..models import EventType, Event
+from .nicknames import nickname_cache
+from .presence import presence
+from .bus import bus
+from .writer import event_mapping
 
 
 class Watcher__Events():
@@ -11,10 +14,12 @@ class Watcher__Events():
     def start_event(self, **kwargs):
         """ Saves a :attr:`~EventType.WATCHER_START` event """
         self._add_event(Event(type=EventType.WATCHER_START, **kwargs))
+        presence.clear(self._model_id)
 
     def stop_event(self, **kwargs):
         """ Saves a :attr:`~EventType.WATCHER_STOP` event """
         self._add_event(Event(type=EventType.WATCHER_STOP, **kwargs))
+        presence.clear(self._model_id)
 
     def connection_lost_event(self, **kwargs):
         """ Saves a :attr:`~EventType.WATCHER_CONNECTION_LOST` event.
@@ -35,15 +40,25 @@ class Watcher__Events():
         """ Save a new score into the database. Emits a
         :attr:`~EventType.USER_SCORE` event.
 
+        Only changed scores are saved. An unchanged score is saved again
+        after the watcher's ``score_heartbeat`` (in minutes) has passed, if
+        that config-key is set.
+
         :type score: :class:`float`
         :param score: Absolute score of the user
 
         :type nickname: :class:`str`
         :param nickname: Nickname of user who scored
         """
-        user = self._get_user(nickname)
-        self._add_event(Event(userID=user.id, gameID=self._model.gameID,
-                              type=EventType.USER_SCORE, info=str(score), **kwargs))
+        if not self._score_changed(nickname, float(score)):
+            return
+
+        user_id = self._get_user_id(nickname)
+        self._add_event(Event(userID=user_id, gameID=self._model.gameID,
+                              type=EventType.USER_SCORE, score=float(score),
+                              **kwargs))
+
+        self._last_scores[nickname] = (float(score), monotonic())
 
     def join_event(self, nickname, **kwargs):
         """ Save a :attr:`~EventType.USER_JOIN` event
@@ -51,28 +66,74 @@ class Watcher__Events():
         :type nickname: :class:`str`
         :param nickname: Nickname of user who joined
         """
-        user = self._get_user(nickname)
-        self._add_event(Event(userID=user.id, gameID=self._model.gameID,
+        user_id = self._get_user_id(nickname)
+        self._add_event(Event(userID=user_id, gameID=self._model.gameID,
                               type=EventType.USER_JOIN, **kwargs))
+        presence.join(self._model_id, self._model.gameID, user_id)
 
     def leave_event(self, nickname, **kwargs):
         """ Save a :attr:`~EventType.USER_LEAVE` event
 
         :type nickname: :class:`str`
         :param nickname: Nickname of user who left
+
+        :type payload: :class:`dict`
+        :param payload: Details, like the ``reason`` (Optional)
         """
-        user = self._get_user(nickname)
-        self._add_event(Event(userID=user.id, gameID=self._model.gameID,
+        user_id = self._get_user_id(nickname)
+        self._add_event(Event(userID=user_id, gameID=self._model.gameID,
                               type=EventType.USER_LEAVE, **kwargs))
+        presence.leave(self._model_id, user_id)
+
+        # Save the first score after rejoining
+        getattr(self, '_last_scores', {}).pop(nickname, None)
+
+    def players_event(self, nicknames, **kwargs):
+        """ Report the complete list of players on the server. Saves a
+        :attr:`~EventType.USER_JOIN` or :attr:`~EventType.USER_LEAVE` event
+        for every user who appeared or disappeared since the last call.
+        Players without a registered nickname are ignored.
+
+        :type nicknames: iterable
+        :param nicknames: Nicknames of all players currently on the server
+        """
+        nicknames = set(nicknames)
+        user_ids = set()
+
+        for nickname in nicknames:
+            try:
+                user_ids.add(self._get_user_id(nickname))
+            except ValueError:
+                pass
+
+        joined, left = presence.sync(self._model_id, self._model.gameID,
+                                     user_ids)
+
+        for user_id in joined:
+            self._add_event(Event(userID=user_id, gameID=self._model.gameID,
+                                  type=EventType.USER_JOIN, **kwargs))
+
+        for user_id in left:
+            self._add_event(Event(userID=user_id, gameID=self._model.gameID,
+                                  type=EventType.USER_LEAVE, **kwargs))
+
+        # Save the first score after rejoining
+        last_scores = getattr(self, '_last_scores', {})
+        for nickname in set(last_scores) - nicknames:
+            last_scores.pop(nickname)
 
     def die_event(self, nickname, **kwargs):
-        """ Save a :attr:`~EventType.USER_LEAVE` event
+        """ Save a :attr:`~EventType.USER_DIE` event
 
         :type nickname: :class:`str`
-        :param nickname: Nickname of user who scored
+        :param nickname: Nickname of user who died
+
+        :type payload: :class:`dict`
+        :param payload: Details, like the ``killer`` and the ``weapon``
+            (Optional)
         """
-        user = self._get_user(nickname)
-        self._add_event(Event(userID=user.id, gameID=self._model.gameID,
+        user_id = self._get_user_id(nickname)
+        self._add_event(Event(userID=user_id, gameID=self._model.gameID,
                               type=EventType.USER_DIE, **kwargs))
 
     def respawn_event(self, nickname, **kwargs):
@@ -81,8 +142,8 @@ class Watcher__Events():
         :type nickname: :class:`str`
         :param nickname: Nickname of user who respawned
         """
-        user = self._get_user(nickname)
-        self._add_event(Event(userID=user.id, gameID=self._model.gameID,
+        user_id = self._get_user_id(nickname)
+        self._add_event(Event(userID=user_id, gameID=self._model.gameID,
                               type=EventType.USER_RESPAWN, **kwargs))
 
     def exception_event(self, exception, **kwargs):
@@ -94,25 +155,48 @@ class Watcher__Events():
         self._add_event(Event(type=EventType.WATCHER_EXCEPTION,
                               info=str(exception), **kwargs))
 
-    def _get_user(self, nickname):
-        """ Get the :class:`lamon.models.User` with the associated Nickname
+    def _score_changed(self, nickname, score):
+        """ Check whether a score has to be saved
+
+        :type nickname: str
+        :param nickname: Nickname of the user
+
+        :type score: float
+        :param score: Current absolute score
+        """
+        if not hasattr(self, '_last_scores'):
+            self._last_scores = {}
+
+        if nickname not in self._last_scores:
+            return True
+
+        last_score, written = self._last_scores[nickname]
+        if last_score != score:
+            return True
+
+        heartbeat = self.config.get('score_heartbeat')
+        return heartbeat is not None and monotonic() - written >= heartbeat * 60
+
+    def _get_user_id(self, nickname):
+        """ Get the id of the :class:`lamon.models.User` with the associated
+        Nickname. Lookups are cached in
+        :data:`lamon.watcher.nicknames.nickname_cache`
 
         :type nickname: str
         :param nickname: Nickname
 
         :raises ValueError: When no user with the given nickname is found
         """
-        query = self._session.query(User).join(Nickname).\
-            filter(Nickname.nick == nickname).\
-            filter(Nickname.gameID == self._model.gameID)
-
         try:
-            return query.one()
-        except NoResultFound:
-            raise ValueError(f'No user with given nickname ({nickname}) found')
+            return nickname_cache.resolve(self._session, self._model.gameID,
+                                          nickname)
+        finally:
+            self._release_session()
 
     def _add_event(self, event):
-        """ Add a event to the database
+        """ Queue a event for the database and publish it on the
+        :data:`~lamon.watcher.bus.bus`. The event is written asynchronously by
+        the watcher's :class:`~lamon.watcher.writer.EventWriter`
 
         :type event: lamon.models.Event
         :param event: Event to add to the database. `event.watcherID` and
@@ -123,10 +207,11 @@ class Watcher__Events():
         if event.time is None:
             event.time = datetime.now()
 
-        if event.game is None and event.gameID is None:
-            event.game = self._model.game
+        if event.gameID is None:
+            event.gameID = self._model.gameID
 
-        self._session.add(event)
-        self._session.commit()
+        mapping = event_mapping(event)
+        self._writer.put(mapping)
+        bus.publish(mapping)
 
         self.logger.debug(str(event))
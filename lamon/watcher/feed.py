@@ -0,0 +1,99 @@
+from collections import deque
+from itertools import count
+from threading import Lock
+
+from ..models import EventType
+
+
+class EventFeed():
+    """ Recent events, for pushing them to browsers.
+
+    The :class:`~lamon.watcher.manager.WatcherManager` subscribes the feed to
+    the :data:`~lamon.watcher.bus.bus` once, no matter how many clients are
+    connected. It keeps the newest events of every game and watcher in a
+    ring buffer, so any number of clients (see :mod:`lamon.views.live`) can
+    read them without querying the database. Every event gets a sequence
+    number, which clients use to continue where they left off.
+
+    Events are published when watchers emit them, before the
+    :class:`~lamon.watcher.writer.EventWriter` commits them. So the feed can
+    show events that are not in the database yet, or never will be if
+    writing them fails.
+
+    :type buffer_size: int
+    :param buffer_size: Number of events kept per game and watcher
+    """
+
+    def __init__(self, buffer_size=256):
+        self._lock = Lock()
+        self._sequence = count(1)
+        self._last = 0
+        self.configure(buffer_size)
+
+    def configure(self, buffer_size=256):
+        """ Change the buffer size. Drops all buffered events """
+        with self._lock:
+            self.buffer_size = buffer_size
+            self._buffers = {}
+
+    def publish(self, events):
+        """ Add emitted (not necessarily committed) events to the buffers of
+        their game and watcher
+
+        :type events: list
+        :param events: Event mappings, as published on the
+            :class:`~lamon.watcher.bus.EventBus`
+        """
+        with self._lock:
+            for event in events:
+                self._last = next(self._sequence)
+                item = (self._last, _event_json(event))
+
+                for topic in _topics(event):
+                    buffer = self._buffers.get(topic)
+                    if buffer is None:
+                        buffer = deque(maxlen=self.buffer_size)
+                        self._buffers[topic] = buffer
+                    buffer.append(item)
+
+    def since(self, topic, last_id=0):
+        """ Buffered events of a topic published after *last_id*
+
+        :type topic: tuple
+        :param topic: ``('game', id)`` or ``('watcher', id)``
+
+        :type last_id: int
+        :param last_id: Sequence number of the last event the client got
+
+        :returns: list of (sequence number, event dict) tuples, oldest first.
+            Events already dropped from the buffer are skipped
+        """
+        with self._lock:
+            buffer = self._buffers.get(topic, ())
+            return [item for item in buffer if item[0] > last_id]
+
+    @property
+    def last_id(self):
+        """ Sequence number of the newest event """
+        return self._last
+
+
+def _topics(event):
+    if event.get('gameID') is not None:
+        yield ('game', event['gameID'])
+    if event.get('watcherID') is not None:
+        yield ('watcher', event['watcherID'])
+
+
+def _event_json(event):
+    return {'type': EventType(event['type']).name,
+            'time': event['time'].isoformat(),
+            'info': event.get('info'),
+            'score': event.get('score'),
+            'payload': event.get('payload'),
+            'watcherID': event.get('watcherID'),
+            'gameID': event.get('gameID'),
+            'userID': event.get('userID')}
+
+
+feed = EventFeed()
@@ -1,14 +1,132 @@
 import re
 
-from ..models import Event
+from functools import partial
+
+from ..models import Event, EventType
+
+# Groups that would clash when patterns are combined
+_UNSUPPORTED = re.compile(r'\(\?P[<=]|\\[1-9]')
+
+# Methods of Watcher__Events emitting the log_events
+_EVENT_HELPERS = {EventType.USER_JOIN: 'join_event',
+                  EventType.USER_LEAVE: 'leave_event',
+                  EventType.USER_DIE: 'die_event',
+                  EventType.USER_RESPAWN: 'respawn_event'}
+
+
+class LogParser():
+    """ Dispatch log messages to handlers with a single regular expression.
+
+    All patterns are compiled once into one alternation, so a message is
+    scanned once, however many patterns there are. A *prefix* shared by all
+    patterns (like the timestamp header of a log line) is matched only once,
+    before the alternation. The handler of the first matching pattern (in
+    definition order) is called with a match object whose groups are
+    numbered as if ``prefix + pattern`` was matched alone.
+
+    Patterns are matched at the start of the message (like
+    :func:`re.match`). They must not contain named groups or numbered
+    backreferences, since those would clash in the combined expression.
+
+    :type patterns: dict
+    :param patterns: Maps regular expressions (strings or compiled) to
+        callables taking the match
+
+    :type prefix: str
+    :param prefix: Regular expression every message has to start with
+
+    :raises ValueError: When a pattern uses named groups or backreferences
+    """
+
+    def __init__(self, patterns, prefix=''):
+        self.patterns = patterns
+        self.prefix = prefix
+
+        prefix_groups = self._groups(prefix)
+        alternatives = []
+        self._handlers = {}
+        group = prefix_groups + 1
+
+        for expr, handler in patterns.items():
+            expr = getattr(expr, 'pattern', expr)
+            groups = self._groups(expr)
+
+            alternatives.append(f'({expr})')
+            self._handlers[group] = (handler, prefix_groups, group, groups)
+            group += groups + 1
+
+        self._regex = re.compile(f'{prefix}(?:{"|".join(alternatives)})')
+
+    def parse(self, msg):
+        """ Call the handler of the first pattern matching *msg*
+
+        :returns: Whether a pattern matched
+        """
+        match = self._regex.match(msg)
+        if match is None:
+            return False
+
+        handler, *groups = self._handlers[match.lastindex]
+        handler(_PatternMatch(match, *groups))
+        return True
+
+    @staticmethod
+    def _groups(expr):
+        if _UNSUPPORTED.search(expr):
+            raise ValueError(f'Unsupported group in log pattern: {expr}')
+
+        return re.compile(expr).groups
+
+
+class _PatternMatch():
+    """ Match of one pattern of a :class:`LogParser`. Hides the groups of
+    the other patterns """
+
+    __slots__ = ('_match', '_prefix', '_offset', '_groups')
+
+    def __init__(self, match, prefix, offset, groups):
+        self._match = match
+        self._prefix = prefix
+        self._offset = offset
+        self._groups = groups
+
+    def __getitem__(self, index):
+        return self._match.group(self._index(index))
+
+    def group(self, *indices):
+        return self._match.group(*(self._index(i) for i in indices or (0,)))
+
+    def groups(self, default=None):
+        groups = self._match.groups(default)
+        return groups[:self._prefix] + \
+            groups[self._offset:self._offset + self._groups]
+
+    @property
+    def string(self):
+        return self._match.string
+
+    def _index(self, index):
+        """ Index of a group in the combined expression """
+        if not 0 <= index <= self._prefix + self._groups:
+            raise IndexError('no such group')
+
+        if index <= self._prefix:
+            return index
+        return self._offset + index - self._prefix
 
 
 class LogMixin():
     """ Provide support for parsing logfiles to a watcher.
 
-    This mixin expects the watcher to have a parse attribute when it is created.
-    This dict describes how to handle log messages. Each key is a regular-expression
-    which is matched against the message. The value is a callable.
+    Watchers describe the messages they understand in :attr:`log_events` and
+    convert matches in :meth:`log_event`. Alternatively, a watcher can set a
+    log_parser attribute when it is created. This dict describes how to
+    handle log messages. Each key is a regular-expression which is matched
+    against the message. The value is a callable. Watchers can set a
+    log_prefix, that every message has to start with. Its groups come before
+    the groups of the matching pattern.
+
+    The patterns are compiled into a :class:`LogParser` on first use.
 
 
     Example:
@@ -16,20 +134,72 @@ class LogMixin():
     .. code-block:: python
 
         log_parser = {
-            'User (\c*) scored: (\c*)': lambda e: self.score_event(e[1], int(e[2]))
+            'User (\\w*) scored: (\\d*)': lambda e: self.score_event(e[1], int(e[2]))
         }
     """
 
+    log_prefix = ''
+
+    receives_logs = False
+    """ Whether the watcher takes a *log_receiver* argument. The
+    :class:`~lamon.watcher.manager.WatcherManager` passes its
+    :class:`~lamon.watcher.log_receiver.LogReceiver` only to those watchers
+    """
+
+    log_events = {}
+    """ Maps patterns of messages to the :class:`~lamon.models.EventType` of
+    the event they describe. Used when the watcher sets no log_parser, and
+    by :mod:`lamon.importer`
+    """
+
+    @classmethod
+    def log_event(cls, type, match):
+        """ Convert a match of a :attr:`log_events` pattern. Must not access
+        the database, since the import calls it in worker processes.
+        Watchers setting :attr:`log_events` override it. The default ignores
+        every match.
+
+        :type type: :class:`~lamon.models.EventType`
+        :param type: Type of the pattern
+
+        :param match: Match of the pattern (including the log_prefix)
+
+        :returns: (nickname, dict of event arguments, like ``time`` and
+            ``payload``), or None to ignore the match
+        """
+        return None
+
     def parse(self, msg):
-        for expr, call in self.log_parser.items():
-            if type(expr) is str:
-                comp = re.compile(expr)
-                self.log_parser[comp] = self.log_parser.pop(expr)
-                expr = comp
+        if getattr(self, 'log_parser', None) is None:
+            self.log_parser = {expr: partial(self._emit_log_event, type)
+                               for expr, type in self.log_events.items()}
+
+        engine = getattr(self, '_log_engine', None)
+        if engine is None or engine.patterns is not self.log_parser:
+            engine = self._log_engine = LogParser(self.log_parser,
+                                                  self.log_prefix)
+
+        engine.parse(msg)
+
+    def parse_lines(self, lines):
+        """ Parse a batch of log lines. Lines of players without a registered
+        nickname are skipped, other errors are logged.
 
-            match = re.match(expr, msg)
+        :type lines: iterable
+        :param lines: Log messages
+        """
+        for line in lines:
+            try:
+                self.parse(line)
+            except ValueError:  # Player without registered nickname
+                pass
+            except Exception as e:
+                self.logger.exception(e)
 
-            if match is None:
-                continue
+    def _emit_log_event(self, type, match):
+        event = self.log_event(type, match)
+        if event is None:
+            return
 
-            call(match)
+        nickname, kwargs = event
+        getattr(self, _EVENT_HELPERS[type])(nickname, **kwargs)
@@ -0,0 +1,171 @@
+import asyncio
+import socket
+
+from collections import deque
+from logging import getLogger
+
+_HEADER = b'\xff\xff\xff\xff'
+_PLAIN = ord('R')
+_SECRET = ord('S')
+
+
+class LogReceiver(asyncio.DatagramProtocol):
+    """ Receive the log lines Source engine servers send with
+    ``logaddress_add``.
+
+    One socket is shared by all watchers. Packets are assigned to watchers by
+    their source address, which is the game port of the server. Lines are
+    collected per watcher and parsed in batches with
+    :meth:`~lamon.watcher.log_mixin.LogMixin.parse_lines` in the runtime's
+    executor, so the event loop never waits for the database. The events the
+    handlers emit go through the shared
+    :class:`~lamon.watcher.writer.EventWriter` like all other events.
+
+    :type host: str
+    :param host: Address to listen on
+
+    :type port: int
+    :param port: UDP port to listen on. 0 disables the receiver
+
+    :type queue_size: int
+    :param queue_size: Maximum number of unparsed lines per watcher. When a
+        watcher falls behind, its oldest lines are dropped
+    """
+
+    def __init__(self, host='0.0.0.0', port=0, queue_size=10000):
+        self.host = host
+        self.port = port
+        self.queue_size = queue_size
+
+        self.transport = None
+        self.dropped = 0
+
+        self._sources = {}
+        self._starting = None
+
+        self.logger = getLogger(__name__)
+
+    @property
+    def enabled(self):
+        return bool(self.port)
+
+    async def register(self, watcher, addr, secret=None):
+        """ Feed log lines from *addr* to *watcher*. Starts listening on the
+        first call. Has to be awaited on the runtime's event loop.
+
+        :type watcher: :class:`~lamon.watcher.AsyncWatcher`
+        :param watcher: Watcher using :class:`~lamon.watcher.log_mixin.LogMixin`
+
+        :type addr: tuple
+        :param addr: (host, port) of the server. The host is resolved
+
+        :type secret: str
+        :param secret: ``sv_logsecret`` of the server. Packets without it are
+            ignored if set
+
+        :raises OSError: When the address can't be resolved or the port can't
+            be bound
+        """
+        await self._start()
+
+        loop = asyncio.get_event_loop()
+        infos = await loop.getaddrinfo(*addr, type=socket.SOCK_DGRAM)
+
+        for *_, sockaddr in infos:
+            self._sources[sockaddr[:2]] = _Source(watcher, secret,
+                                                  self.queue_size)
+        self.logger.debug(f'Receiving logs of {addr}')
+
+    def unregister(self, watcher):
+        """ Stop feeding log lines to *watcher* """
+        for key, source in list(self._sources.items()):
+            if source.watcher is watcher:
+                del self._sources[key]
+
+    def close(self):
+        """ Close the socket """
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+        self._starting = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.logger.info(f'Listening for logs on {self.host}:{self.port}')
+
+    def connection_lost(self, exc):
+        self.transport = None
+
+    def datagram_received(self, data, addr):
+        source = self._sources.get(addr[:2])
+        if source is None:
+            return
+
+        line = self._decode(data, source.secret)
+        if line is None:
+            return
+
+        if len(source.lines) == source.lines.maxlen:
+            if not self.dropped:
+                self.logger.warning('Log lines arrive faster than they are '
+                                    'parsed. Dropping lines')
+            self.dropped += 1
+
+        source.lines.append(line)
+
+        if source.task is None:
+            source.task = asyncio.ensure_future(self._drain(source))
+
+    async def _start(self):
+        # Concurrent registrations wait for the same socket
+        if self._starting is None:
+            loop = asyncio.get_event_loop()
+            self._starting = asyncio.ensure_future(
+                loop.create_datagram_endpoint(
+                    lambda: self, local_addr=(self.host, self.port)))
+
+        await asyncio.shield(self._starting)
+
+    async def _drain(self, source):
+        """ Parse the queued lines of a source, until none are left """
+        try:
+            while source.lines:
+                lines = list(source.lines)
+                source.lines.clear()
+
+                await source.watcher.run_blocking(
+                    source.watcher.parse_lines, lines)
+        except Exception as e:
+            self.logger.exception(e)
+        finally:
+            source.task = None
+
+    @staticmethod
+    def _decode(data, secret):
+        """ Log line of a packet. None if the packet isn't a (valid) log
+        line """
+        if not data.startswith(_HEADER) or len(data) < 6:
+            return None
+
+        kind, payload = data[4], data[5:]
+
+        if kind == _SECRET:
+            secret = b'' if secret is None else secret.encode()
+            if not secret or not payload.startswith(secret):
+                return None
+            payload = payload[len(secret):]
+        elif kind != _PLAIN or secret is not None:
+            return None
+
+        return payload.decode('utf-8', 'replace').rstrip('\x00\r\n')
+
+
+class _Source():
+    __slots__ = ('watcher', 'secret', 'lines', 'task')
+
+    def __init__(self, watcher, secret, queue_size):
+        self.watcher = watcher
+        self.secret = secret
+        self.lines = deque(maxlen=queue_size)
+        self.task = None
@@ -0,0 +1,248 @@
+import asyncio
+import os
+
+from logging import getLogger
+from time import monotonic
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:  # Optional dependency. Poll instead
+    INotify = None
+
+from ..models import WatcherConfig
+
+OFFSET_KEY = 'log_offset'
+""" :class:`~lamon.models.WatcherConfig` key of the saved position. The
+value is ``<inode>:<offset>`` """
+
+
+class LogTailer():
+    """ Read the lines appended to a log file.
+
+    The file is read in chunks of *chunk_size* bytes. An incomplete last
+    line is kept until it is finished. When the file is replaced (log
+    rotation), the rest of the old file is read before continuing at the
+    start of the new file. When the file is truncated, reading continues at
+    its start.
+
+    :type path: str
+    :param path: Log file
+
+    :type inode: int
+    :param inode: Inode of the file when *offset* was saved
+
+    :type offset: int
+    :param offset: Position to continue at, if *inode* still is the file.
+        If the file was replaced or truncated meanwhile, reading starts at
+        its beginning. Without an offset, reading starts at the end
+
+    :type chunk_size: int
+    :param chunk_size: Bytes read at once
+    """
+
+    def __init__(self, path, inode=None, offset=None, chunk_size=1 << 20):
+        self.path = path
+        self.chunk_size = chunk_size
+
+        self._file = None
+        self._inode = None
+        self._offset = 0
+        self._buffer = b''
+
+        self._open(resume=(inode, offset))
+
+    @property
+    def position(self):
+        """ (inode, offset) after the last returned line """
+        return self._inode, self._offset
+
+    def read(self):
+        """ Complete lines of the next chunk. Call until it returns an empty
+        list to read everything appended since the last call.
+
+        :returns: list of str without line endings
+        """
+        if self._file is None:
+            self._open(resume=(None, 0))  # Created after we started
+
+        while self._file is not None:
+            chunk = self._file.read(self.chunk_size)
+
+            if chunk:
+                lines = self._split(chunk)
+                if lines:
+                    return lines
+            elif self._replaced():
+                self._open(resume=(None, 0))  # Rotated
+            elif os.fstat(self._file.fileno()).st_size < \
+                    self._offset + len(self._buffer):
+                self._seek(0)  # Truncated
+            else:
+                break
+
+        return []
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _open(self, resume=(None, None)):
+        """ Open the file. *resume* is (inode, offset). Starts at the end of
+        the file if offset is None, and at its start if the inode is another
+        file or the file is shorter than offset """
+        self.close()
+
+        try:
+            self._file = open(self.path, 'rb')
+        except FileNotFoundError:
+            return
+
+        stat = os.fstat(self._file.fileno())
+        self._inode = stat.st_ino
+
+        inode, offset = resume
+        if offset is None:
+            offset = stat.st_size
+        elif (inode is not None and inode != stat.st_ino) or \
+                offset > stat.st_size:
+            offset = 0  # Rotated or truncated since the offset was saved
+
+        self._seek(offset)
+
+    def _seek(self, offset):
+        self._file.seek(offset)
+        self._offset = offset
+        self._buffer = b''
+
+    def _replaced(self):
+        try:
+            return os.stat(self.path).st_ino != self._inode
+        except FileNotFoundError:
+            return False  # Not recreated yet
+
+    def _split(self, chunk):
+        data = self._buffer + chunk
+        end = data.rfind(b'\n') + 1
+
+        self._buffer = data[end:]
+        self._offset += end  # The buffer starts at the offset
+        # Split before decoding. Other line breaks may be part of a message
+        return [line.rstrip(b'\r').decode('utf-8', 'replace')
+                for line in data[:end - 1].split(b'\n')] if end else []
+
+
+async def follow(watcher, path, poll_interval=1, save_interval=10,
+                 chunk_size=1 << 20):
+    """ Feed the lines appended to a log file to the
+    :meth:`~lamon.watcher.log_mixin.LogMixin.parse_lines` of a watcher, until
+    the task is cancelled.
+
+    Waits for changes with inotify if :mod:`inotify_simple` is installed.
+    Otherwise (and additionally, for file systems without inotify support)
+    the file is checked every *poll_interval* seconds. The position is saved
+    in the watcher's :class:`~lamon.models.WatcherConfig` at most every
+    *save_interval* seconds and when following stops, so a restarted watcher
+    continues where it stopped. Without a saved position, following starts
+    at the end of the file.
+
+    :type watcher: :class:`~lamon.watcher.AsyncWatcher`
+    :param watcher: Watcher using :class:`~lamon.watcher.log_mixin.LogMixin`
+
+    :type path: str
+    :param path: Log file
+    """
+    logger = getLogger(__name__)
+
+    position = await watcher.run_blocking(
+        load_position, watcher._session, watcher._model_id)
+    tailer = await watcher.run_blocking(
+        lambda: LogTailer(path, *position, chunk_size=chunk_size))
+    changed, unwatch = _watch(path)
+    saved = monotonic()
+
+    logger.debug(f'Following {path}')
+
+    try:
+        while True:
+            lines = await watcher.run_blocking(tailer.read)
+
+            if lines:
+                await watcher.run_blocking(watcher.parse_lines, lines)
+            else:
+                try:
+                    await asyncio.wait_for(changed.wait(), poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                changed.clear()
+
+            if monotonic() - saved >= save_interval:
+                await watcher.run_blocking(_save, watcher, tailer.position)
+                saved = monotonic()
+    finally:
+        unwatch()
+        await watcher.run_blocking(_save, watcher, tailer.position)
+        tailer.close()
+
+
+def load_position(session, watcher_id):
+    """ Saved (inode, offset) of a watcher. (None, None) if there is none """
+    value = session.query(WatcherConfig.value).\
+        filter(WatcherConfig.watcherID == watcher_id).\
+        filter(WatcherConfig.key == OFFSET_KEY).scalar()
+
+    try:
+        inode, offset = value.split(':')
+        return int(inode), int(offset)
+    except (AttributeError, ValueError):
+        return None, None
+
+
+def save_position(session, watcher_id, position):
+    """ Save the (inode, offset) of a watcher """
+    inode, offset = position
+    if inode is None:
+        return
+
+    config = session.query(WatcherConfig).\
+        filter(WatcherConfig.watcherID == watcher_id).\
+        filter(WatcherConfig.key == OFFSET_KEY).first()
+
+    if config is None:
+        config = WatcherConfig(watcherID=watcher_id, key=OFFSET_KEY)
+        session.add(config)
+
+    config.value = f'{inode}:{offset}'
+    session.commit()
+
+
+def _save(watcher, position):
+    # Events of the parsed lines are committed before their position
+    watcher._writer.flush()
+    save_position(watcher._session, watcher._model_id, position)
+
+
+def _watch(path):
+    """ :class:`asyncio.Event` set when the directory of *path* changes, and
+    a function to stop watching. The event is never set without inotify """
+    changed = asyncio.Event()
+
+    if INotify is None:
+        return changed, lambda: None
+
+    inotify = INotify()
+    inotify.add_watch(os.path.dirname(os.path.abspath(path)),
+                      flags.MODIFY | flags.CREATE | flags.MOVED_TO)
+
+    def on_change():
+        inotify.read(timeout=0)
+        changed.set()
+
+    loop = asyncio.get_event_loop()
+    loop.add_reader(inotify.fileno(), on_change)
+
+    def unwatch():
+        loop.remove_reader(inotify.fileno())
+        inotify.close()
+
+    return changed, unwatch
@@ -1,10 +1,21 @@
+import asyncio
 import logging
+import random
 
 from flask import current_app
 from sqlalchemy.orm import scoped_session, sessionmaker
 
-from ..models import Watcher as WatcherModel
-from ..watcher import Watcher, load_watcher_class
+from ..models import Watcher as WatcherModel, WatcherConfig
+from ..watcher import Watcher, AsyncWatcher, WatcherConnectionError, \
+    load_watcher_class
+from .writer import EventWriter
+from .log_mixin import LogMixin
+from .log_receiver import LogReceiver
+from .runtime import WatcherRuntime
+from .presence import presence
+from .retention import RetentionJob
+from .bus import bus
+from .feed import feed
 
 
 class WatcherManager():
@@ -34,6 +45,43 @@ class WatcherManager():
         self.db = db
         self.logger = app.logger.getChild('watcher_manager')
 
+        # One writer for all watchers
+        writer_config = app.config.get('WATCHER', {}).get('writer', {})
+        session_factory = sessionmaker(bind=db.get_engine(app))
+        self.writer = EventWriter(session_factory, **writer_config)
+
+        # Sessions of the watchers. Every thread gets its own session, which
+        # watchers close after each use
+        self.session = scoped_session(session_factory)
+
+        # Restore who is playing from the join and leave events
+        session = session_factory()
+        try:
+            presence.rebuild(session)
+        finally:
+            session.close()
+
+        # Live events for the web interface
+        bus.subscribe(feed.publish, name='feed')
+
+        # One event loop for all asyncio based watchers
+        runtime_config = app.config.get('WATCHER', {}).get('runtime', {})
+        self.runtime = WatcherRuntime(**runtime_config)
+
+        # Deletion of old events in the background
+        retention_config = app.config.get('WATCHER', {}).get('retention', {})
+        self.retention = RetentionJob(session_factory, **retention_config)
+        if self.retention.enabled:
+            self.retention.start()
+
+        # One socket for the log streams of all servers
+        logs_config = app.config.get('WATCHER', {}).get('logs', {})
+        self.log_receiver = LogReceiver(**logs_config)
+
+        # Poll timing of all asyncio based watchers
+        scheduler_config = app.config.get('WATCHER', {}).get('scheduler', {})
+        self.scheduler = PollScheduler(**scheduler_config)
+
     def start(self, id=None, model=None):
         """ Start a watcher.
 
@@ -61,11 +109,16 @@ class WatcherManager():
 
         self.logger.info(f'Starting gamewatcher: {model}')
 
-        # Create db session not connected to flask
-        session = scoped_session(sessionmaker(bind=self.db.engine))
-
         watcher_ = load_watcher_class(model.threadClass)
-        watcher = watcher_(session=session, model_id=id)
+        kwargs = {'session': self.session, 'model_id': id,
+                  'writer': self.writer}
+        if issubclass(watcher_, AsyncWatcher):
+            kwargs['runtime'] = self.runtime
+            kwargs['scheduler'] = self.scheduler
+        if issubclass(watcher_, LogMixin) and watcher_.receives_logs:
+            kwargs['log_receiver'] = self.log_receiver
+
+        watcher = watcher_(**kwargs)
 
         self._watchers[id] = watcher
         watcher.start()
@@ -113,6 +166,38 @@ class WatcherManager():
             self.logger.warning(f'Watcher thread not found: {model}')
             raise ValueError(f'Cannot stop watcher (id={id}). Not running')
 
+    def refresh(self, id=None, model=None):
+        """ Tell a running watcher that its database model changed. Watchers
+        read their configuration when they start, so a watcher whose
+        configuration changed is restarted instead
+
+        Either id or model is required as argument
+
+        :type id: int
+        :param id: Database id of watcher (Default value = None)
+
+        :type model: :class:`lamon.model.Watcher`
+        :param model: Database model of watcher (Default value = None)
+
+        :raises ValueError: When watcher is not running
+        :raises KeyError: When the restarted watcher misses a required
+            config-key
+        """
+        if id is None:
+            id = model.id
+
+        if id not in self._watchers:
+            raise ValueError(f'Cannot refresh watcher (id={id}). Not running')
+
+        config = WatcherConfig.query.filter(WatcherConfig.watcherID == id)
+        if self._watchers[id].config_changed({c.key: c.value for c in config}):
+            self.logger.info(f'Configuration of watcher (id={id}) changed')
+            self.restart(id=id)
+            return
+
+        self.logger.debug(f'Refreshing watcher (id={id})')
+        self._watchers[id].refresh()
+
     def is_running(self, id=None, model=None):
         """ Check if given watcher is currently running
 
@@ -130,3 +215,83 @@ class WatcherManager():
             id = model.id
 
         return id in self._watchers
+
+
+class PollScheduler():
+    """ Owns the poll timing of all :class:`~lamon.watcher.AsyncWatcher` s.
+
+    Every watcher is polled each *poll_interval* seconds (config-key, or
+    :attr:`~lamon.watcher.AsyncWatcher.poll_interval`). Delays are randomized
+    by *jitter*, so watchers started at the same time don't write to the
+    database at the same time. When a poll fails with
+    :class:`~lamon.watcher.WatcherConnectionError`, the delay doubles with
+    every failure up to *max_backoff* seconds.
+
+    :type max_in_flight: int
+    :param max_in_flight: Maximum number of polls running at the same time
+
+    :type jitter: float
+    :param jitter: Delays are multiplied by a random factor between
+        1 - jitter and 1 + jitter
+
+    :type max_backoff: float
+    :param max_backoff: Maximum delay after failed polls
+    """
+
+    def __init__(self, max_in_flight=16, jitter=0.1, max_backoff=300):
+        self.max_in_flight = max_in_flight
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+
+        self._semaphore = None
+
+    async def run(self, watcher):
+        """ Poll a watcher until it is stopped. Has to run on the event loop
+        of the watcher's runtime.
+
+        :type watcher: :class:`~lamon.watcher.AsyncWatcher`
+        :param watcher: Watcher to poll
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        interval = watcher.config.get('poll_interval') or \
+            watcher.poll_interval
+        failures = 0
+
+        delay = random.uniform(0, interval)  # Spread out the first polls
+        while True:
+            await watcher.sleep(delay)
+            if not getattr(watcher, 'shutdown', True):
+                return
+
+            try:
+                async with self._semaphore:
+                    await watcher.poll()
+            except (WatcherConnectionError, OSError) as e:
+                watcher.logger.debug(f'Poll failed: {e}')
+
+                if failures == 0:
+                    await watcher.run_blocking(watcher.connection_lost_event)
+                failures += 1
+            else:
+                if failures:
+                    await watcher.run_blocking(
+                        watcher.connection_reaquired_event)
+                failures = 0
+
+            delay = self.delay(interval, failures)
+
+    def delay(self, interval, failures=0):
+        """ Seconds to wait before the next poll
+
+        :type interval: float
+        :param interval: Poll interval of the watcher
+
+        :type failures: int
+        :param failures: Number of failed polls in a row
+        """
+        # 2 ** 32 exceeds any useful backoff. Larger powers overflow floats
+        delay = min(interval * 2 ** min(failures, 32),
+                    max(interval, self.max_backoff))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
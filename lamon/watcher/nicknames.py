@@ -0,0 +1,128 @@
+from itertools import chain
+from threading import Lock
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import NoResultFound
+
+from ..cache import TTLCache
+from ..models import Nickname
+
+
+class NicknameCache():
+    """ Resolve nicknames to user ids, with one cache per game.
+
+    Unknown nicknames are cached too, so players without a registered
+    nickname don't cause a query on every poll. Caches of a game are
+    invalidated whenever a :class:`~lamon.models.Nickname` of that game is
+    committed.
+
+    :type maxsize: int
+    :param maxsize: Maximum number of cached nicknames per game
+
+    :type ttl: float
+    :param ttl: Seconds a resolved nickname is cached
+
+    :type negative_ttl: float
+    :param negative_ttl: Seconds an unknown nickname is cached
+    """
+
+    def __init__(self, maxsize=1024, ttl=600, negative_ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+
+        self._games = {}
+        self._lock = Lock()
+
+    def resolve(self, session, game_id, nickname):
+        """ Get the id of the user with the given nickname
+
+        :type session: :class:`sqlalchemy.orm.session.Session`
+        :param session: Session used on a cache miss
+
+        :type game_id: int
+        :param game_id: Game the nickname is registered for
+
+        :type nickname: str
+        :param nickname: Nickname
+
+        :raises ValueError: When no user with the given nickname is found
+        """
+        cache = self._cache(game_id)
+
+        try:
+            user_id = cache[nickname]
+        except KeyError:
+            query = session.query(Nickname.userID).\
+                filter(Nickname.nick == nickname).\
+                filter(Nickname.gameID == game_id).\
+                filter(Nickname.userID.isnot(None))
+
+            try:
+                user_id = query.one()[0]
+                cache.set(nickname, user_id)
+            except NoResultFound:
+                user_id = None
+                cache.set(nickname, user_id, ttl=self.negative_ttl)
+
+        if user_id is None:
+            raise ValueError(f'No user with given nickname ({nickname}) found')
+
+        return user_id
+
+    def invalidate(self, game_id=None):
+        """ Drop cached nicknames
+
+        :type game_id: int
+        :param game_id: Game to invalidate. Invalidates all games if None
+        """
+        with self._lock:
+            if game_id is None:
+                self._games.clear()
+            else:
+                self._games.pop(game_id, None)
+
+    def _cache(self, game_id):
+        with self._lock:
+            if game_id not in self._games:
+                self._games[game_id] = TTLCache(self.maxsize, self.ttl)
+            return self._games[game_id]
+
+
+nickname_cache = NicknameCache()
+""" Cache shared by all watchers of the process """
+
+
+_INFO_KEY = 'lamon.nickname_cache.games'
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changed_games(session, flush_context):
+    """ Remember games whose nicknames were changed in this transaction """
+    games = session.info.setdefault(_INFO_KEY, set())
+
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if not isinstance(obj, Nickname):
+            continue
+
+        history = inspect(obj).attrs.gameID.history
+        games.add(obj.gameID)
+        games.update(history.deleted or ())
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_games(session):
+    games = session.info.pop(_INFO_KEY, ())
+
+    if None in games:  # Nickname without a game. Be safe
+        nickname_cache.invalidate()
+        return
+
+    for game_id in games:
+        nickname_cache.invalidate(game_id)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_changed_games(session, previous_transaction):
+    session.info.pop(_INFO_KEY, None)
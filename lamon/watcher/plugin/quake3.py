@@ -1,18 +1,22 @@
-import socket
+import asyncio
 import re
-import time
 
-from .. import Watcher, WatcherException
+from itertools import count
+
+from .. import AsyncWatcher, WatcherException, WatcherConnectionError
+from ..udp import UDPClient
 from lamon.models import Event, EventType
 
 
-class Quake3Watcher(Watcher):
-    """ Watcher implementing communication to Quake 3 """
+class Quake3Watcher(AsyncWatcher):
+    """ Watcher implementing communication to Quake 3. Polls the server with
+    ``getstatus``, which needs no rcon password.
+    """
 
     config_keys = {'address': {'type': str, 'required': True},
                    'port': {'type': int, 'required': True},
                    'timeout': {'type': int, 'required': True},
-                   'rcon_password': {'type': str, 'required': True}}
+                   'rcon_password': {'type': str, 'required': False}}
 
     log_parser = {
         '.*Kill:.*: (.*) killed (.*) by .*': lambda e: self.die_event(e[1])
@@ -21,67 +25,85 @@ class Quake3Watcher(Watcher):
     def __init__(self, **kwargs):
         super().__init__(__name__, **kwargs)
 
-        self.connection_lost = False
+    async def runner(self):
+        self._quake3 = Quake3((self.config['address'], self.config['port']),
+                              self.config['timeout'],
+                              self.config.get('rcon_password'))
 
-    def runner(self):
-        quake3 = Quake3((self.config['address'], self.config['port']),
-                        self.config['timeout'], self.config['rcon_password'])
+        try:
+            await super().runner()
+        finally:
+            self._quake3.close()
 
-        while getattr(self, 'shutdown', True):
-            try:
-                info = quake3.get_info()
-            except WatcherException:
-                if not self.connection_lost:  # Prevent duplicate events
-                    self.connection_lost_event()
-                    self.connection_lost = True
+    async def poll(self):
+        info = await self._quake3.get_status()
+        await self.run_blocking(self._update_scores, info['players'])
 
-                time.sleep(3)
-                continue
+    def _update_scores(self, players):
+        self.players_event(players.keys())
 
-            for key, value in info['players'].items():
-                try:
-                    self.score_event(self, key, value['frags'])
-                except ValueError:
-                    pass
-
-            if self.connection_lost:
-                self.connection_reaquired_event()
-                self.connection_lost = False
-            time.sleep(3)
+        for key, value in players.items():
+            try:
+                self.score_event(key, value['frags'])
+            except ValueError:
+                pass
 
     def _get_event_time(self, gametime):
         pass
 
 
-class Quake3():
-    """ Implementation of the quake3 protocol """
+class Quake3(UDPClient):
+    """ Non-blocking implementation of the quake3 protocol.
+
+    Responses are assigned to requests by their type (``statusResponse``,
+    ``print``, ...), and status responses additionally by the challenge they
+    echo. So any number of status queries can be in flight next to an rcon
+    command, each with its own timeout. Responses of rcon commands can't be
+    told apart, so rcon commands are sent one after another. Their output
+    may span several packets, which are collected until none arrived for
+    *gap* seconds.
 
-    def __init__(self, addr, timeout, password):
-        self.packet_prefix = ('\xff' * 4).encode()
+    :type addr: tuple
+    :param addr: (host, port) of the server
 
-        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        self.sock.settimeout(timeout)
-        self.sock.connect(addr)
+    :type timeout: float
+    :param timeout: Default seconds to wait for a response
+
+    :type password: str
+    :param password: rcon password (Only needed for rcon commands)
+
+    :type gap: float
+    :param gap: Seconds to wait for further packets of a response
+    """
+
+    def __init__(self, addr, timeout, password=None, gap=0.05):
+        super().__init__(addr, timeout)
 
         self.password = password
+        self.gap = gap
+
+        self._pending = {}  # Response type -> list of _Request
+        self._challenges = count(1)
+        self._print_lock = None
 
         # Regexes. Save here so we don't compile them everytime
         self.user_re = re.compile('\s*(\d*)\s*(\d*)\s*(\d*)\s*([^\x12]*)')
         self.map_re = re.compile('map: (.*)')
+        self.player_re = re.compile(r'(-?\d+) (-?\d+) "(.*)"')
 
-    def get_info(self):
-        """ Get Server information
+    async def get_info(self):
+        """ Get Server information with the rcon ``status`` command
 
         :returns: Dict of server info
         :rtype: dict
         """
         result = {'players': {}}
 
-        rcon_status = self.rcon('status')[1].replace('^7', '\x12').split('\n')
+        rcon_status = (await self.rcon('status'))[1].replace('^7', '\x12').split('\n')
 
         for i in rcon_status[3:]:
             match = self.user_re.match(i)
-            if match and match.group(4) is not '':
+            if match and match.group(4) != '':
                 result['players'][match.group(4)] = {
                     'frags': match.group(2),
                     'ping': match.group(3)
@@ -93,44 +115,75 @@ class Quake3():
 
         return result
 
-    def cmd(self, cmd):
+    async def get_status(self, timeout=None):
+        """ Get Server information with ``getstatus``. Like :meth:`get_info`,
+        but without rcon. The server variables are in ``info``
+
+        :type timeout: float
+        :param timeout: Overrides the client's timeout
+
+        :returns: Dict of server info
+        :rtype: dict
+
+        :raises WatcherConnectionError: When no response arrives in time
+        """
+        challenge = str(next(self._challenges))
+        body = await self._exchange(f'getstatus {challenge}',
+                                    'statusResponse', challenge, timeout)
+        lines = body.split('\n')
+
+        info = _infostring(lines[0])
+        result = {'info': info, 'players': {}}
+
+        for line in lines[1:]:
+            match = self.player_re.match(line)
+            if match:
+                # rcon status ends names with ^7. Cut them where get_info does
+                name = match.group(3).split('^7')[0]
+                result['players'][name] = {'frags': match.group(1),
+                                           'ping': match.group(2)}
+
+        if 'mapname' in info:
+            result['map'] = info['mapname']
+
+        return result
+
+    async def cmd(self, cmd, response='print', timeout=None):
         """ Execute a command on the server
 
         :type cmd: str
         :param cmd: Command to execute
 
+        :type response: str
+        :param response: Type of the expected response. ``print`` responses
+            may consist of several packets
+
+        :type timeout: float
+        :param timeout: Overrides the client's timeout
+
         :returns: responseType, responseBody
         :rtype: tuple
 
-        :raises: WatcherException
+        :raises WatcherConnectionError: When no response arrives in time
         """
-        self.sock.send(b'\xFF\xFF\xFF\xFF' + cmd.encode())
-
-        try:
-            resp = self.sock.recv(4096)
-        except (socket.timeout, socket.error) as e:
-            raise WatcherException("Watcher connection failure")
-
-        resp = resp[len(b'\xFF\xFF\xFF\xFF'):].decode().split('\n')
+        return response, await self._exchange(cmd, response, timeout=timeout)
 
-        responseType = resp[0]
-        responseBody = '\n'.join(resp[1:])
-
-        return responseType, responseBody
-
-    def rcon(self, cmd):
+    async def rcon(self, cmd, timeout=None):
         """ Execute a rcon command
 
         :type cmd: str
         :param cmd: RCON command to execute
 
+        :type timeout: float
+        :param timeout: Overrides the client's timeout
+
         :returns: responseType, responseBody
         :rtype: tuple
 
         :raises WatcherException: Bas RCON Password
         """
-        respType, respBody = self.cmd(
-            f'rcon "{self.password}" {cmd}')
+        respType, respBody = await self.cmd(
+            f'rcon "{self.password}" {cmd}', timeout=timeout)
 
         if respBody == 'Bad rconpassword.\n':
             raise WatcherException("Bad RCON Password")
@@ -139,5 +192,95 @@ class Quake3():
 
         return respType, respBody
 
-    def __del__(self):
-        self.sock.close()
+    async def _exchange(self, cmd, response, challenge=None, timeout=None):
+        """ Send a command and wait for the body of its response """
+        if response != 'print':
+            return await self._request(cmd, response, challenge, timeout)
+
+        if self._print_lock is None:
+            self._print_lock = asyncio.Lock()
+
+        async with self._print_lock:
+            return await self._request(cmd, response, challenge, timeout)
+
+    async def _request(self, cmd, response, challenge, timeout):
+        await self.connect()
+
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + (self.timeout if timeout is None else timeout)
+
+        request = _Request(challenge)
+        pending = self._pending.setdefault(response, [])
+        pending.append(request)
+
+        try:
+            self.send(_HEADER + cmd.encode())
+
+            try:
+                await asyncio.wait_for(request.received.wait(),
+                                       deadline - loop.time())
+            except asyncio.TimeoutError:
+                raise WatcherConnectionError('Watcher connection failure')
+
+            # Wait for the rest of split responses
+            while response == 'print' and request.error is None:
+                request.received.clear()
+                try:
+                    await asyncio.wait_for(
+                        request.received.wait(),
+                        min(self.gap, deadline - loop.time()))
+                except asyncio.TimeoutError:
+                    break
+        finally:
+            pending.remove(request)
+
+        if request.error is not None:
+            raise WatcherConnectionError(
+                f'Watcher connection failure: {request.error}')
+
+        return b''.join(request.packets).decode(errors='replace')
+
+    def datagram_received(self, data, addr):
+        if not data.startswith(_HEADER):
+            return
+
+        response, _, body = data[len(_HEADER):].partition(b'\n')
+        pending = self._pending.get(response.decode(errors='replace'))
+        if not pending:
+            return  # Response of a timed out request
+
+        request = pending[0]
+        if body.startswith(b'\\'):
+            challenge = _infostring(body.split(b'\n', 1)[0].decode(
+                errors='replace')).get('challenge')
+            request = next((r for r in pending if r.challenge == challenge),
+                           request)
+
+        request.packets.append(body)
+        request.received.set()
+
+    def error_received(self, exc):
+        # E.g. ICMP port unreachable. Fail all pending requests right away
+        for pending in self._pending.values():
+            for request in pending:
+                request.error = exc
+                request.received.set()
+
+
+class _Request():
+    __slots__ = ('challenge', 'packets', 'received', 'error')
+
+    def __init__(self, challenge):
+        self.challenge = challenge
+        self.packets = []
+        self.received = asyncio.Event()
+        self.error = None
+
+
+_HEADER = b'\xFF\xFF\xFF\xFF'
+
+
+def _infostring(string):
+    """ Dict of a ``\\key\\value`` info string """
+    parts = string.split('\\')[1:]
+    return dict(zip(parts[::2], parts[1::2]))
@@ -1,14 +1,17 @@
-from valve.source.a2s import ServerQuerier, NoResponseError
-from socket import gaierror
-from time import sleep
+import asyncio
+import struct
+
+from valve.source import messages
 from datetime import datetime
 
-from .. import Watcher, WatcherException
+from .. import AsyncWatcher, WatcherException
 from ..log_mixin import LogMixin
+from ..log_tailer import follow
+from ..udp import UDPClient
 from lamon.models import EventType
 
 
-class SourceEngineWatcher(Watcher):
+class SourceEngineWatcher(AsyncWatcher):
     """
     Watcher implementating communication to games based on Valve's source
     engine
@@ -28,57 +31,180 @@ class SourceEngineWatcher(Watcher):
     def __init__(self, **kwargs):
         super().__init__(__name__, **kwargs)
 
-    def runner(self):
-        # Setup valve server querier
+    async def runner(self):
         addr = (self.config['address'], self.config['port'])
-        server_info = None
+        self._server = A2SClient(addr, self.config['timeout'])
 
-        with ServerQuerier(addr, self.config['timeout']) as server:
-            while getattr(self, 'shutdown', True):
-                try:
-                    server_info = server.info()
-                except (NoResponseError, gaierror):
-                    self.connection_lost_event()
-                    sleep(self.config['timeout'])
-                    continue
+        try:
+            await super().runner()
+        finally:
+            self._server.close()
 
-                if server_info['app_id'] != int(self.config['app_id']):
-                    raise WatcherException(f'Wrong app id on server: {server_info["app_id"]}')
-                self._updatePlayers(server.players()['players'])
+    async def poll(self):
+        server_info = await self._server.info()
+        if server_info['app_id'] != int(self.config['app_id']):
+            raise WatcherException(f'Wrong app id on server: {server_info["app_id"]}')
 
-                self.connection_reaquired_event()
+        players = await self._server.players()
+        await self.run_blocking(self._updatePlayers, players['players'])
 
     def _updatePlayers(self, players):
+        self.players_event(p['name'] for p in players if p['name'])
+
         for p in players:
             if not p['name']:  # Valve doc mentions possible empty players
                 continue
 
-            self.score_event(p['name'], p['score'])
+            try:
+                self.score_event(p['name'], p['score'])
+            except ValueError:  # Player without registered nickname
+                pass
+
+
+class A2SClient(UDPClient):
+    """ Non-blocking implementation of Valve's A2S server query protocol.
+    Uses the message definitions of :mod:`valve.source.messages`.
+    """
+
+    async def info(self):
+        """ Get the server info. See :meth:`valve.source.a2s.ServerQuerier.info`
+
+        :raises WatcherException: On connection failure or a broken response
+        """
+        request = messages.InfoRequest().encode()
+        response = await self._query(request)
+
+        if response[:1] == b'\x41':  # Newer servers want a challenge
+            challenge = self._decode(messages.GetChallengeResponse, response)
+            response = await self._query(
+                request + struct.pack('<l', challenge['challenge']))
+
+        return self._decode(messages.InfoResponse, response)
+
+    async def players(self):
+        """ Get the player list.
+        See :meth:`valve.source.a2s.ServerQuerier.players`
+
+        :raises WatcherException: On connection failure or a broken response
+        """
+        response = await self._query(
+            messages.PlayersRequest(challenge=-1).encode())
+        challenge = self._decode(messages.GetChallengeResponse, response)
+
+        response = await self._query(messages.PlayersRequest(
+            challenge=challenge['challenge']).encode())
+        return self._decode(messages.PlayersResponse, response)
+
+    async def _query(self, payload):
+        """ Send a request and return the payload of the (possibly split)
+        response
+        """
+        header = messages.Header(split=messages.NO_SPLIT).encode()
+        response = self._decode(messages.Header,
+                                await self.request(header + payload))
+
+        if response['split'] == messages.NO_SPLIT:
+            return response.payload
+
+        fragments = {}
+        while True:
+            fragment = self._decode(messages.Fragment, response.payload)
+            if fragment.is_compressed:
+                raise WatcherException('Compressed responses are not supported')
+
+            fragments[fragment['fragment_id']] = fragment.payload
+            if len(fragments) >= fragment['fragment_count']:
+                break
+
+            response = self._decode(messages.Header, await self.receive())
+
+        return b''.join(fragments[i] for i in sorted(fragments))
+
+    @staticmethod
+    def _decode(message, data):
+        try:
+            return message.decode(data)
+        except messages.BrokenMessageError as e:
+            raise WatcherException(f'Broken response: {e}')
 
 
 class TTTWatcher(SourceEngineWatcher, LogMixin):
-    """ Like a SourceEngineWatcher. But is able to parse TTT logfiles """
-    log_header_short = '^L (\d\d\/\d\d\/\d{4} - \d\d:\d\d:\d\d): '
-    log_header_long = log_header_short + '\d\d:\d\d.\d\d - '
-
-    log_kill_message = log_header_long + 'KILL:\s*(.*) \[.*\] killed (.*) \[.*\]$'
-    log_join_message = log_header_short + '"(.*)<\d*><STEAM_.*><>" entered the game'
-    log_leave_message = log_header_short + '"(.*)<\d*><STEAM_.*><>" disconnected \(reason "(.*)"\)'
-    def __init__(self, *args, **kwargs):
-        self.log_parser = {
-            self.log_kill_message: lambda e: self._log_message(e, EventType.USER_DIE),
-            self.log_join_message: lambda e: self._log_message(e, EventType.USER_JOIN),
-            self.log_leave_message: lambda e: self._log_message(e, EventType.USER_LEAVE)
-        }
+    """ Like a SourceEngineWatcher. But is able to parse TTT logfiles.
+
+    If the :class:`~lamon.watcher.manager.WatcherManager` listens for logs
+    (``[watcher.logs]``), the watcher receives the server's log stream.
+    Add the listener on the server with ``logaddress_add <host>:<port>``.
+    Alternatively, the watcher follows the log file given by the
+    ``log_file`` config-key (see :func:`~lamon.watcher.log_tailer.follow`).
+
+    :type log_receiver: :class:`~lamon.watcher.log_receiver.LogReceiver`
+    :param log_receiver: Receiver of the server's log lines (Optional)
+    """
+
+    receives_logs = True
+
+    config_keys = dict(SourceEngineWatcher.config_keys, **{
+        'log_secret': {'type': str, 'required': False,
+                       'hint': """sv_logsecret of the server, if it is
+                       set"""},
+        'log_file': {'type': str, 'required': False,
+                     'hint': """Log file of the server to follow, if the
+                     server can't send its logs"""}})
+
+    log_prefix = r'L (\d\d/\d\d/\d{4} - \d\d:\d\d:\d\d): '
+    log_round_time = r'\d\d:\d\d\.\d+ - '
+
+    log_kill_message = log_round_time + r'KILL:\s*(.*) \[.*\] killed (.*) \[.*\]$'
+    log_join_message = r'"(.*)<\d*><STEAM_.*><>" entered the game'
+    log_leave_message = r'"(.*)<\d*><STEAM_.*><>" disconnected \(reason "(.*)"\)'
+
+    log_events = {log_kill_message: EventType.USER_DIE,
+                  log_join_message: EventType.USER_JOIN,
+                  log_leave_message: EventType.USER_LEAVE}
+
+    def __init__(self, *args, log_receiver=None, **kwargs):
+        self._log_receiver = log_receiver
 
         super().__init__(*args, **kwargs)
 
-    def _log_message(self, expr, type):
-        time = datetime.strptime(expr[1], '%m/%d/%Y - %H:%M:%S')
+    async def runner(self):
+        receiver = self._log_receiver
+        if receiver is not None and receiver.enabled:
+            addr = (self.config['address'], self.config['port'])
+            await receiver.register(self, addr, self.config.get('log_secret'))
+
+        tail = None
+        if self.config.get('log_file'):
+            tail = asyncio.ensure_future(follow(self, self.config['log_file']))
+            tail.add_done_callback(self._follow_done)
+
+        try:
+            await super().runner()
+        finally:
+            if receiver is not None:
+                receiver.unregister(self)
+
+            if tail is not None:
+                tail.cancel()
+                await asyncio.wait([tail])  # Failures are reported already
+
+    def _follow_done(self, tail):
+        """ Report a failure of following the log file. Polling goes on """
+        if tail.cancelled() or tail.exception() is None:
+            return
+
+        e = tail.exception()
+        self.logger.error(f'Stopped following the log file: {e}',
+                          exc_info=e)
+        asyncio.ensure_future(self.run_blocking(self.exception_event, e))
+
+    @classmethod
+    def log_event(cls, type, match):
+        time = datetime.strptime(match[1], '%m/%d/%Y - %H:%M:%S')
 
         if type is EventType.USER_DIE:
-            self.die_event(expr[3], time=time, info=expr[2])
+            return match[3], {'time': time, 'payload': {'killer': match[2]}}
         elif type is EventType.USER_JOIN:
-            self.join_event(expr[2], time=time)
+            return match[2], {'time': time}
         elif type is EventType.USER_LEAVE:
-            self.leave_event(expr[2], time=time, info=expr[3])
+            return match[2], {'time': time, 'payload': {'reason': match[3]}}
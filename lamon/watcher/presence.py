@@ -0,0 +1,212 @@
+from collections import Counter
+from threading import Lock
+
+from ..models import Event, EventType
+
+
+class PresenceIndex():
+    """ In-memory index of the users currently playing.
+
+    Watchers keep it up to date through
+    :meth:`~lamon.watcher.events.Watcher__Events.join_event`,
+    :meth:`~lamon.watcher.events.Watcher__Events.leave_event` and
+    :meth:`~lamon.watcher.events.Watcher__Events.players_event`. All lookups
+    are answered without touching the database. After a restart the index is
+    restored from the events table with :meth:`rebuild`.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._clear_all()
+
+    def join(self, watcher_id, game_id, user_id):
+        """ Mark a user as playing
+
+        :type watcher_id: int
+        :param watcher_id: Watcher the user joined
+
+        :type game_id: int
+        :param game_id: Game of the watcher
+
+        :type user_id: int
+        :param user_id: User who joined
+
+        :returns: Whether the user wasn't already playing in the watcher
+        """
+        with self._lock:
+            self._set_game(watcher_id, game_id)
+            return self._add(watcher_id, user_id)
+
+    def leave(self, watcher_id, user_id):
+        """ Mark a user as no longer playing in a watcher
+
+        :returns: Whether the user was playing in the watcher
+        """
+        with self._lock:
+            return self._remove(watcher_id, user_id)
+
+    def sync(self, watcher_id, game_id, user_ids):
+        """ Replace the users playing in a watcher
+
+        :type watcher_id: int
+        :param watcher_id: Watcher whose player list was fetched
+
+        :type game_id: int
+        :param game_id: Game of the watcher
+
+        :type user_ids: iterable
+        :param user_ids: Ids of all users currently playing in the watcher
+
+        :returns: (joined, left) sets of user ids
+        """
+        user_ids = set(user_ids)
+
+        with self._lock:
+            self._set_game(watcher_id, game_id)
+            current = self._watchers.get(watcher_id, set())
+
+            joined = user_ids - current
+            left = current - user_ids
+
+            for user_id in joined:
+                self._add(watcher_id, user_id)
+            for user_id in left:
+                self._remove(watcher_id, user_id)
+
+        return joined, left
+
+    def clear(self, watcher_id=None):
+        """ Forget the users playing in a watcher
+
+        :type watcher_id: int
+        :param watcher_id: Watcher to clear. Clears everything if None
+        """
+        with self._lock:
+            if watcher_id is None:
+                self._clear_all()
+            else:
+                self._clear(watcher_id)
+
+    def users(self, watcher_id=None, game_id=None):
+        """ Ids of the users currently playing
+
+        :type watcher_id: int
+        :param watcher_id: Only users in this watcher
+
+        :type game_id: int
+        :param game_id: Only users in this game
+
+        :returns: :class:`frozenset`
+        """
+        with self._lock:
+            return frozenset(self._users_of(watcher_id, game_id))
+
+    def count(self, watcher_id=None, game_id=None):
+        """ Number of users currently playing. Arguments are the same as
+        :meth:`users`
+        """
+        with self._lock:
+            return len(self._users_of(watcher_id, game_id))
+
+    def is_playing(self, user_id, watcher_id=None, game_id=None):
+        """ Whether a user is currently playing. Arguments are the same as
+        :meth:`users`
+        """
+        with self._lock:
+            return user_id in self._users_of(watcher_id, game_id)
+
+    def rebuild(self, session):
+        """ Restore the index from the events table with a single scan over
+        the join, leave and watcher start/stop events.
+
+        :type session: :class:`sqlalchemy.orm.session.Session`
+        :param session: Session to query the events with
+        """
+        types = [int(EventType.USER_JOIN), int(EventType.USER_LEAVE),
+                 int(EventType.WATCHER_START), int(EventType.WATCHER_STOP)]
+
+        query = session.query(Event.type, Event.watcherID, Event.gameID,
+                              Event.userID).\
+            filter(Event.type.in_(types)).\
+            order_by(Event.time, Event.id).\
+            yield_per(1000)
+
+        with self._lock:
+            self._clear_all()
+
+            for type, watcher_id, game_id, user_id in query:
+                if type in (EventType.WATCHER_START, EventType.WATCHER_STOP):
+                    self._clear(watcher_id)
+                elif user_id is None:
+                    continue
+                elif type == EventType.USER_JOIN:
+                    self._set_game(watcher_id, game_id)
+                    self._add(watcher_id, user_id)
+                else:
+                    self._remove(watcher_id, user_id)
+
+    def _users_of(self, watcher_id, game_id):
+        if watcher_id is None:
+            return self._users if game_id is None else \
+                self._games.get(game_id, ())
+
+        if game_id is not None and self._watcher_games.get(watcher_id) != game_id:
+            return ()
+
+        return self._watchers.get(watcher_id, ())
+
+    def _add(self, watcher_id, user_id):
+        users = self._watchers.setdefault(watcher_id, set())
+        if user_id in users:
+            return False
+
+        users.add(user_id)
+        game_id = self._watcher_games.get(watcher_id)
+        self._games.setdefault(game_id, Counter())[user_id] += 1
+        self._users[user_id] += 1
+        return True
+
+    def _remove(self, watcher_id, user_id):
+        users = self._watchers.get(watcher_id, set())
+        if user_id not in users:
+            return False
+
+        users.discard(user_id)
+        game_id = self._watcher_games.get(watcher_id)
+        _decrement(self._games[game_id], user_id)
+        _decrement(self._users, user_id)
+        return True
+
+    def _set_game(self, watcher_id, game_id):
+        """ Move the users of a watcher when its game changed """
+        if watcher_id in self._watcher_games and \
+                self._watcher_games[watcher_id] == game_id:
+            return
+
+        users = list(self._watchers.get(watcher_id, ()))
+        self._clear(watcher_id)
+        self._watcher_games[watcher_id] = game_id
+
+        for user_id in users:
+            self._add(watcher_id, user_id)
+
+    def _clear(self, watcher_id):
+        for user_id in list(self._watchers.get(watcher_id, ())):
+            self._remove(watcher_id, user_id)
+        self._watchers.pop(watcher_id, None)
+
+    def _clear_all(self):
+        self._watchers = {}  # watcher id -> set of user ids
+        self._watcher_games = {}  # watcher id -> game id
+        self._games = {}  # game id -> Counter of user ids
+        self._users = Counter()  # user id -> number of watchers
+
+
+def _decrement(counter, key):
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+presence = PresenceIndex()
+""" Index shared by all watchers of the process """
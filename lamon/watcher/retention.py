@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+from logging import getLogger
+from threading import Thread, Event as ThreadingEvent
+
+from ..cache import stats_cache
+from ..models import Event, ScoreBucket
+
+
+class RetentionJob(Thread):
+    """ Periodically delete old data, so the size of the database (and the
+    latency of queries on recent data) doesn't depend on the total history.
+
+    * Raw events older than *raw_days* are deleted. Their scores are kept in
+      the :class:`~lamon.models.ScoreRollup` and
+      :class:`~lamon.models.ScoreBucket` aggregates.
+    * Minute buckets older than *minute_bucket_days* are deleted, which
+      downsamples old scores to the hour buckets.
+
+    Rows are deleted in batches on all databases. Partitioning the events
+    table by time is not supported.
+
+    :type session_factory: callable
+    :param session_factory: Returns a :class:`sqlalchemy.orm.session.Session`
+
+    :type raw_days: float
+    :param raw_days: Days raw events are kept. 0 keeps them forever
+
+    :type minute_bucket_days: float
+    :param minute_bucket_days: Days minute buckets are kept. 0 keeps them
+        forever
+
+    :type interval: float
+    :param interval: Seconds between two runs
+
+    :type batch_size: int
+    :param batch_size: Maximum number of rows deleted per transaction
+    """
+
+    def __init__(self, session_factory, raw_days=0, minute_bucket_days=0,
+                 interval=3600, batch_size=10000):
+        super().__init__(name='RetentionJob', daemon=True)
+
+        self._session_factory = session_factory
+        self._stopped = ThreadingEvent()
+
+        self.raw_days = raw_days
+        self.minute_bucket_days = minute_bucket_days
+        self.interval = interval
+        self.batch_size = batch_size
+
+        self.logger = getLogger(__name__)
+
+    @property
+    def enabled(self):
+        """ Whether there is anything to delete """
+        return bool(self.raw_days or self.minute_bucket_days)
+
+    def run(self):
+        while not self._stopped.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                self.logger.exception(e)
+
+            self._stopped.wait(self.interval)
+
+    def stop(self):
+        """ Stop the job. Waits for a running cleanup to finish """
+        self._stopped.set()
+        if self.is_alive():
+            self.join()
+
+    def run_once(self, now=None):
+        """ Delete expired data once
+
+        :type now: :class:`datetime.datetime`
+        :param now: Current time (Default: :meth:`datetime.datetime.now`)
+
+        :returns: dict with the number of deleted events and buckets
+        """
+        now = datetime.now() if now is None else now
+        result = {'events': 0, 'buckets': 0}
+
+        session = self._session_factory()
+        try:
+            if self.raw_days:
+                cutoff = now - timedelta(days=self.raw_days)
+                result['events'] = self._delete(
+                    session, Event, Event.time < cutoff)
+
+            if self.minute_bucket_days:
+                cutoff = now - timedelta(days=self.minute_bucket_days)
+                result['buckets'] = self._delete(
+                    session, ScoreBucket, ScoreBucket.resolution == 60,
+                    ScoreBucket.start < cutoff)
+        finally:
+            session.close()
+
+        if any(result.values()):
+            stats_cache.clear()
+            self.logger.info(f'Deleted {result["events"]} events and '
+                             f'{result["buckets"]} score buckets')
+        return result
+
+    def _delete(self, session, model, *criteria):
+        """ Delete matching rows in batches, so no transaction holds locks
+        for long """
+        total = 0
+
+        while True:
+            ids = [id for id, in session.query(model.id).
+                   filter(*criteria).limit(self.batch_size)]
+            if not ids:
+                return total
+
+            session.query(model).filter(model.id.in_(ids)).\
+                delete(synchronize_session=False)
+            session.commit()
+            total += len(ids)
@@ -0,0 +1,82 @@
+import asyncio
+
+from concurrent.futures import ThreadPoolExecutor
+from logging import getLogger
+from threading import Thread, Lock
+
+
+class WatcherRuntime():
+    """ Event loop shared by all :class:`~lamon.watcher.AsyncWatcher` s.
+
+    The loop runs in a single thread, which is started when the first
+    coroutine is submitted. Blocking work (database access) runs in the
+    loop's default executor.
+
+    :type max_workers: int
+    :param max_workers: Number of executor threads
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+
+        self._loop = None
+        self._thread = None
+        self._executor = None
+        self._lock = Lock()
+
+        self.logger = getLogger(__name__)
+
+    @property
+    def loop(self):
+        """ The :class:`asyncio.AbstractEventLoop`. Starts the runtime """
+        self._ensure_started()
+        return self._loop
+
+    def submit(self, coro):
+        """ Schedule a coroutine on the event loop. Safe to call from any
+        thread.
+
+        :returns: :class:`concurrent.futures.Future`
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def call_soon(self, callback, *args):
+        """ Call *callback* in the event loop thread """
+        self.loop.call_soon_threadsafe(callback, *args)
+
+    def is_running(self):
+        """ Whether the event loop thread is running """
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self):
+        """ Stop the event loop and the executor """
+        with self._lock:
+            if self._thread is None:
+                return
+
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._executor.shutdown()
+            self._loop.close()
+
+            self._thread = None
+            self.logger.debug('Runtime stopped')
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+
+            self._loop = asyncio.new_event_loop()
+            self._executor = ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix='WatcherRuntime')
+            self._loop.set_default_executor(self._executor)
+
+            self._thread = Thread(target=self._run, name='WatcherRuntime',
+                                  daemon=True)
+            self._thread.start()
+            self.logger.debug('Runtime started')
+
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
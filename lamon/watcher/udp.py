@@ -0,0 +1,116 @@
+import asyncio
+
+from . import WatcherConnectionError
+
+
+class UDPClient(asyncio.DatagramProtocol):
+    """ Non-blocking client for UDP request/response protocols. Has to be
+    used from a coroutine running on an event loop.
+
+    :type addr: tuple
+    :param addr: (host, port) of the server
+
+    :type timeout: float
+    :param timeout: Seconds to wait for a response
+    """
+
+    def __init__(self, addr, timeout):
+        self.addr = addr
+        self.timeout = timeout
+
+        self.transport = None
+        self._responses = None
+        self._connecting = None
+
+    @property
+    def connected(self):
+        return self.transport is not None
+
+    async def connect(self):
+        """ Create the socket. Does nothing if it already exists.
+        Concurrent calls wait for the same socket
+
+        :raises OSError: When the address can't be resolved
+        """
+        if self.connected:
+            return
+
+        if self._connecting is None:
+            self._responses = asyncio.Queue()
+
+            loop = asyncio.get_event_loop()
+            self._connecting = asyncio.ensure_future(
+                loop.create_datagram_endpoint(lambda: self,
+                                              remote_addr=self.addr))
+
+        connecting = self._connecting
+        try:
+            await asyncio.shield(connecting)
+        except Exception:
+            if self._connecting is connecting:
+                self._connecting = None  # Retry on the next call
+            raise
+
+    async def request(self, data):
+        """ Send a packet and wait for the first response packet.
+        Responses to earlier (timed out) requests are discarded.
+
+        :type data: bytes
+        :param data: Packet to send
+
+        :raises WatcherConnectionError: When no response arrives in time
+        """
+        await self.connect()
+
+        while not self._responses.empty():
+            self._responses.get_nowait()
+
+        self.send(data)
+        return await self.receive()
+
+    def send(self, data):
+        """ Send a packet without waiting for a response """
+        self.transport.sendto(data)
+
+    async def receive(self, timeout=None):
+        """ Wait for the next packet from the server
+
+        :type timeout: float
+        :param timeout: Overrides the client's timeout
+
+        :raises WatcherConnectionError: When no packet arrives in time or the
+            socket reported an error
+        """
+        timeout = self.timeout if timeout is None else timeout
+
+        try:
+            data = await asyncio.wait_for(self._responses.get(), timeout)
+        except asyncio.TimeoutError:
+            raise WatcherConnectionError('Watcher connection failure')
+
+        if isinstance(data, Exception):
+            raise WatcherConnectionError(f'Watcher connection failure: {data}')
+
+        return data
+
+    def close(self):
+        """ Close the socket """
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+        self._connecting = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        self._responses.put_nowait(data)
+
+    def error_received(self, exc):
+        # E.g. ICMP port unreachable. Fail the pending request right away
+        self._responses.put_nowait(exc)
+
+    def connection_lost(self, exc):
+        self.transport = None
+        self._connecting = None
@@ -0,0 +1,201 @@
+from logging import getLogger
+from queue import Queue, Empty
+from threading import Thread, Lock, Event as Flag
+from time import monotonic
+
+from ..models import Event
+from ..cache import stats_cache
+from ..rollups import update_rollups
+
+
+_STOP = object()
+
+
+class EventWriter(Thread):
+    """ Write events to the database in batches.
+
+    Watchers enqueue events with :meth:`put` instead of committing every
+    single event. A dedicated thread collects them and writes them with one
+    bulk insert as soon as *batch_size* events are queued or *flush_interval*
+    seconds have passed since the oldest unwritten event.
+
+    The queue is bounded. When the database can't keep up, :meth:`put` blocks
+    and thereby slows down the watchers producing events (backpressure).
+
+    :type session_factory: callable
+    :param session_factory: Returns a :class:`sqlalchemy.orm.session.Session`.
+        A new session is requested (and closed) for every batch
+
+    :type queue_size: int
+    :param queue_size: Maximum number of queued events
+
+    :type batch_size: int
+    :param batch_size: Number of events that triggers a write
+
+    :type flush_interval: float
+    :param flush_interval: Maximum time (in seconds) an event waits in the
+        queue before it is written
+    """
+
+    def __init__(self, session_factory, queue_size=10000, batch_size=500,
+                 flush_interval=0.5):
+        super().__init__(name='EventWriter', daemon=True)
+
+        self._session_factory = session_factory
+        self._queue = Queue(maxsize=queue_size)
+        self._start_lock = Lock()
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.logger = getLogger(__name__)
+
+    def put(self, event, timeout=None):
+        """ Queue an event for writing. Blocks while the queue is full.
+
+        :type event: :class:`lamon.models.Event`
+        :param event: Event to write, or its mapping from
+            :func:`event_mapping`
+
+        :type timeout: float
+        :param timeout: Seconds to wait for a free slot. Waits forever if None
+
+        :raises queue.Full: When no slot became available within *timeout*
+        :raises RuntimeError: When the writer was already stopped
+        """
+        self._ensure_started()
+        if isinstance(event, Event):
+            event = event_mapping(event)
+
+        self._queue.put(event, timeout=timeout)
+
+    def flush(self):
+        """ Write the events queued before the call. Returns when they are
+        committed. Events queued meanwhile by other threads don't delay it
+        """
+        if not self.is_alive():
+            return
+
+        written = Flag()
+        self._queue.put(written)
+        written.wait()
+
+    def stop(self):
+        """ Write all queued events and stop the writer thread """
+        if not self.is_alive():
+            return
+
+        self._queue.put(_STOP)
+        self.join()
+
+    def run(self):
+        batch = []
+        deadline = None
+
+        while True:
+            timeout = None if deadline is None else \
+                max(deadline - monotonic(), 0)
+
+            try:
+                item = self._queue.get(timeout=timeout)
+            except Empty:  # flush_interval elapsed
+                item = None
+
+            flush = isinstance(item, Flag)
+
+            if item is not None and not flush and item is not _STOP:
+                batch.append(item)
+                if deadline is None:
+                    deadline = monotonic() + self.flush_interval
+
+                if len(batch) < self.batch_size:
+                    continue
+
+            self._write(batch)
+            batch = []
+            deadline = None
+
+            if flush:
+                item.set()
+            elif item is _STOP:
+                return
+
+    def _write(self, batch):
+        """ Insert a batch of event mappings and update the score rollups in
+        one transaction.
+
+        A failed batch is retried once. If it fails again, it is split in
+        halves until the failing events are isolated, so that a single bad
+        event doesn't cost the whole batch. Only the failing events are
+        dropped.
+        """
+        if not batch:
+            return
+
+        error = self._insert(batch)
+        if error is None:
+            return
+
+        self.logger.warning(f'Writing {len(batch)} events failed, '
+                            f'retrying: {error}')
+        error = self._insert(batch)
+        if error is None:
+            return
+
+        dropped = self._bisect(batch, error)
+        if dropped:
+            self.logger.error(f'Dropped {dropped} of {len(batch)} events')
+
+    def _bisect(self, batch, error):
+        """ Write both halves of a failed batch separately. Returns the
+        number of dropped events """
+        if len(batch) == 1:
+            self.logger.error(f'Dropping event {batch[0]}: {error}')
+            return 1
+
+        middle = len(batch) // 2
+        dropped = 0
+
+        for part in (batch[:middle], batch[middle:]):
+            error = self._insert(part)
+            if error is not None:
+                dropped += self._bisect(part, error)
+
+        return dropped
+
+    def _insert(self, batch):
+        """ Write events in one transaction. Returns the exception if it
+        failed """
+        session = self._session_factory()
+        try:
+            session.bulk_insert_mappings(Event, batch)
+            update_rollups(session, batch)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            self.logger.debug('Writing events failed', exc_info=True)
+            return e
+        finally:
+            session.close()
+
+        self.logger.debug(f'Wrote {len(batch)} events')
+        stats_cache.invalidate_events(batch)
+        return None
+
+    def _ensure_started(self):
+        if self.is_alive():
+            return
+
+        with self._start_lock:
+            if self.ident is not None and not self.is_alive():
+                raise RuntimeError('EventWriter is stopped')
+
+            if self.ident is None:
+                self.start()
+
+
+def event_mapping(event):
+    """ Convert an event into a dict suitable for bulk inserts """
+    return {column.key: getattr(event, column.key)
+            for column in Event.__table__.columns
+            if not column.primary_key}
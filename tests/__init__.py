@@ -1,3 +1,4 @@
+import asyncio
 import threading
 import logging
 import os
@@ -54,3 +55,10 @@ def fake_watcher(session, watcher_model):
         watcher.stop()
     except:
         pass
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    yield loop
+    loop.close()
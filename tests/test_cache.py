@@ -0,0 +1,108 @@
+import time
+
+from lamon.cache import TTLCache, StatsCache
+
+
+class TestTTLCache():
+    """ Test the LRU/TTL cache """
+
+    def test_none_value(self):
+        """ Test that None can be cached """
+        cache = TTLCache()
+        cache['key'] = None
+
+        assert 'key' in cache
+        assert 'missing' not in cache
+
+    def test_lru(self):
+        """ Test eviction of the least recently used entry """
+        cache = TTLCache(maxsize=2)
+        cache['a'] = 1
+        cache['b'] = 2
+        cache['a']
+        cache['c'] = 3
+
+        assert 'a' in cache
+        assert 'b' not in cache
+        assert 'c' in cache
+
+    def test_ttl(self):
+        """ Test expiry of entries """
+        cache = TTLCache(ttl=60)
+        cache.set('short', 1, ttl=0.01)
+        cache['long'] = 2
+        time.sleep(0.02)
+
+        assert cache.get('short') is None
+        assert cache.get('long') == 2
+
+
+class TestStatsCache():
+    """ Test caching of statistics with tag based invalidation """
+
+    def _counting(self, cache):
+        calls = []
+
+        @cache.cached
+        def func(game_id=None, user_id=None):
+            calls.append((game_id, user_id))
+            return len(calls)
+
+        return func, calls
+
+    def test_cached(self):
+        cache = StatsCache()
+        func, calls = self._counting(cache)
+
+        assert func(game_id=1) == func(game_id=1)
+        assert func(game_id=2) == 2
+        assert func.uncached(game_id=1) == 3
+
+    def test_invalidate(self):
+        """ Test that only dependent entries are invalidated """
+        cache = StatsCache()
+        func, calls = self._counting(cache)
+        func(game_id=1)
+        func(game_id=2)
+        func()
+
+        cache.invalidate_events([{'gameID': 1, 'userID': None,
+                                  'watcherID': 3}])
+        func(game_id=1)
+        func(game_id=2)
+        func()
+
+        assert calls == [(1, None), (2, None), (None, None),
+                         (1, None), (None, None)]
+
+    def test_clear(self):
+        cache = StatsCache()
+        func, calls = self._counting(cache)
+        func(user_id=1)
+        cache.clear()
+        func(user_id=1)
+
+        assert len(calls) == 2
+
+    def test_configure(self):
+        cache = StatsCache()
+        cache.configure('lamon.cache.TTLCache', maxsize=1, ttl=10)
+        func, calls = self._counting(cache)
+        func(game_id=1)
+        func(game_id=2)
+        func(game_id=1)  # Evicted
+
+        assert len(calls) == 3
+
+    def test_mapping_backend(self):
+        """ Test that dicts and other mappings can store the results """
+        cache = StatsCache()
+        cache.configure('builtins.dict')
+        func, calls = self._counting(cache)
+        func(game_id=1)
+        func(game_id=1)
+        cache.clear()
+        func(game_id=1)
+
+        assert len(calls) == 2
+        assert len(cache.backend.mapping) == 1
@@ -0,0 +1,26 @@
+from lamon import engine_options
+
+from . import flask
+
+
+class TestEngineOptions():
+    """ Test the connection pool options from the database section """
+
+    def test_postgres(self):
+        options = engine_options({'database_uri': 'postgresql://db/lamon',
+                                  'pool_size': 2, 'max_overflow': 0,
+                                  'pool_pre_ping': True})
+
+        assert options == {'pool_size': 2, 'max_overflow': 0,
+                           'pool_pre_ping': True}
+
+    def test_sqlite(self):
+        """ Test that queue pool options are left out for SQLite """
+        options = engine_options({'database_uri': 'sqlite:///test.db',
+                                  'pool_size': 2, 'pool_recycle': 60})
+
+        assert options == {'pool_recycle': 60}
+
+    def test_app(self, flask):
+        assert flask.config['SQLALCHEMY_ENGINE_OPTIONS'] == \
+            {'pool_recycle': 3600, 'pool_pre_ping': True}
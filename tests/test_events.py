@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from lamon.models import User, Event, EventType
+from lamon.views.events import event_page
+
+from . import session, flask, watcher_model
+
+
+@pytest.fixture
+def events(session, watcher_model):
+    start = datetime(2019, 1, 1)
+    for i in range(7):
+        # Two events per timestamp to test the id tie-breaker
+        session.add(Event(type=EventType.WATCHER_START, info=str(i),
+                          time=start + timedelta(minutes=i // 2),
+                          watcherID=watcher_model.id))
+    session.add(Event(type=EventType.WATCHER_START, info='other',
+                      time=start))
+    session.commit()
+
+    yield watcher_model
+
+
+class TestEventPage():
+    """ Test keyset pagination of events """
+
+    def test_pages(self, flask, events):
+        infos = []
+        cursor = None
+
+        with flask.app_context():
+            while True:
+                page, cursor = event_page(before=cursor, limit=3,
+                                          watcher_id=events.id)
+                infos.extend(e.info for e in page)
+                if cursor is None:
+                    break
+
+        assert infos == ['6', '5', '4', '3', '2', '1', '0']
+
+    def test_invalid_cursor(self, flask):
+        with flask.app_context():
+            with pytest.raises(ValueError):
+                event_page(before='invalid')
+
+
+class TestEventViews():
+    """ Test the JSON endpoint and the detail pages """
+
+    def test_json(self, flask, events):
+        client = flask.test_client()
+        response = client.get(f'/events/?watcher_id={events.id}&limit=4')
+        page = response.get_json()
+
+        assert [e['info'] for e in page['events']] == ['6', '5', '4', '3']
+        assert page['events'][0]['type'] == 'WATCHER_START'
+
+        page = client.get(page['next_url']).get_json()
+        assert [e['info'] for e in page['events']] == ['2', '1', '0']
+        assert page['next'] is None
+
+    def test_bad_request(self, flask):
+        client = flask.test_client()
+
+        assert client.get('/events/?before=x').status_code == 400
+        assert client.get('/events/?limit=0').status_code == 400
+
+    def test_watcher_page(self, flask, events):
+        client = flask.test_client()
+        response = client.get(f'/watcher/{events.id}')
+
+        assert response.status_code == 200
+        assert b'Info = 6' in response.data
+        assert b'Info = other' not in response.data
+
+    def test_user_page(self, flask, session):
+        user = User(username='player')
+        session.add(user)
+        session.commit()
+        session.add(Event(type=EventType.USER_JOIN, time=datetime.now(),
+                          userID=user.id))
+        session.commit()
+
+        response = flask.test_client().get(f'/user/{user.id}')
+
+        assert response.status_code == 200
+        assert b'USER_JOIN' in response.data
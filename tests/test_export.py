@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+
+from datetime import datetime
+
+import pytest
+
+from sqlalchemy import event
+
+from lamon import db
+from lamon.models import User, Event, EventType
+from lamon.rollups import update_rollups
+
+from . import session, flask, watcher_model
+
+
+@pytest.fixture
+def scores(session, watcher_model):
+    user = User(username='player')
+    session.add(user)
+    session.commit()
+
+    mappings = []
+    for minute, score in enumerate([1, 4, 2]):
+        mapping = {'type': int(EventType.USER_SCORE), 'score': score,
+                   'time': datetime(2019, 1, 1, 12, minute),
+                   'userID': user.id, 'gameID': None,
+                   'watcherID': watcher_model.id}
+        mappings.append(mapping)
+        session.add(Event(**mapping))
+
+    session.add(Event(type=EventType.USER_LEAVE, userID=user.id,
+                      time=datetime(2019, 1, 2),
+                      payload={'reason': 'Disconnect'}))
+    update_rollups(session, mappings)
+    session.commit()
+
+    yield user
+
+
+def _ndjson(response):
+    return [json.loads(line) for line in response.data.decode().splitlines()]
+
+
+class TestExport():
+    """ Test the streaming export endpoints """
+
+    def test_events_ndjson(self, flask, scores):
+        response = flask.test_client().\
+            get(f'/stats/events.ndjson?user_id={scores.id}')
+        rows = _ndjson(response)
+
+        assert response.mimetype == 'application/x-ndjson'
+        assert [r['type'] for r in rows] == ['USER_SCORE'] * 3 + ['USER_LEAVE']
+        assert rows[-1]['payload'] == {'reason': 'Disconnect'}
+
+    def test_events_single_query(self, flask, scores):
+        """ Test that exporting doesn't load the related objects """
+        statements = []
+
+        def count(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        with flask.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            response = flask.test_client().get('/stats/events.ndjson')
+            assert len(_ndjson(response)) == 4
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+
+        assert len([s for s in statements if 'FROM events' in s]) == 1
+        assert not [s for s in statements
+                    if 'FROM users' in s or 'FROM watchers' in s]
+
+    def test_events_filters(self, flask, scores):
+        client = flask.test_client()
+
+        rows = _ndjson(client.get('/stats/events.ndjson?type=USER_LEAVE'))
+        assert len(rows) == 1
+
+        rows = _ndjson(client.get('/stats/events.ndjson?'
+                                  'since=2019-01-01T12:01:00&until=2019-01-02'))
+        assert [r['score'] for r in rows] == [4, 2]
+
+    def test_events_csv(self, flask, scores):
+        response = flask.test_client().get('/stats/events.csv?type=USER_LEAVE')
+        rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+
+        assert response.mimetype == 'text/csv'
+        assert json.loads(rows[0]['payload']) == {'reason': 'Disconnect'}
+
+    def test_score(self, flask, scores):
+        client = flask.test_client()
+
+        rows = _ndjson(client.get(f'/stats/score.ndjson?user_id={scores.id}'))
+        assert [r['score'] for r in rows] == [1, 4, 2]
+
+        rows = _ndjson(client.get('/stats/score.ndjson?resolution=hour'))
+        assert [(r['score'], r['max_score'], r['count']) for r in rows] == \
+            [(2, 4, 3)]
+
+    def test_bad_request(self, flask):
+        client = flask.test_client()
+
+        assert client.get('/stats/events.ndjson?since=x').status_code == 400
+        assert client.get('/stats/events.ndjson?type=x').status_code == 400
+        assert client.get('/stats/score.csv?resolution=x').status_code == 400
+        assert client.get('/stats/events.xml').status_code == 404
@@ -0,0 +1,107 @@
+import pytest
+
+from click.testing import CliRunner
+
+from lamon.cli import main
+from lamon.importer import log_chunks, parse_chunk, import_logs
+from lamon.models import User, Game, Nickname, Event, EventType, Watcher
+
+from . import session, flask, watcher_model
+
+TTT = 'lamon.watcher.plugin.source_engine.TTTWatcher'
+
+LINES = [
+    'L 07/28/2019 - 21:51:45: "player<3><STEAM_0:1:1><>" entered the game',
+    'L 07/28/2019 - 21:51:46: "unknown<4><STEAM_0:1:2><>" entered the game',
+    'L 07/28/2019 - 21:53:40: 00:43.100 - KILL:\t unknown [traitor] killed player [innocent]',
+    'L 07/28/2019 - 21:53:41: 00:44.100 - DMG:\t unknown [traitor] damaged player [innocent] for 25 dmg',
+    'L 07/28/2019 - 21:54:00: "player<3><STEAM_0:1:1><>" disconnected (reason "Disconnect by user.")',
+]
+
+
+@pytest.fixture
+def logs(tmpdir):
+    directory = tmpdir.mkdir('logs')
+    directory.join('L0728000.log').write('\n'.join(LINES) + '\n')
+    directory.join('notes.txt').write(LINES[0] + '\n')
+
+    yield directory
+
+
+@pytest.fixture
+def ttt_model(session):
+    game = Game(name='ttt')
+    session.add(Nickname(nick='player', user=User(username='player'),
+                         game=game))
+    watcher = Watcher(threadClass=TTT, game=game)
+    session.add(watcher)
+    session.commit()
+
+    yield watcher
+
+
+class TestImporter():
+    """ Test the import of archived logs """
+
+    def test_chunks(self, logs):
+        """ Test that every line is parsed exactly once across chunks """
+        for chunk_size in [1, 50, 100, 1 << 20]:
+            chunks = log_chunks([str(logs)], chunk_size=chunk_size)
+            results = [parse_chunk(TTT, chunk) for chunk in chunks]
+
+            assert {chunk[0] for chunk in chunks} == \
+                {str(logs.join('L0728000.log'))}
+            assert sum(lines for lines, _ in results) == len(LINES)
+            assert [(type, nick) for _, records in results
+                    for type, nick, _ in records] == [
+                (EventType.USER_JOIN, 'player'),
+                (EventType.USER_JOIN, 'unknown'),
+                (EventType.USER_DIE, 'player'),
+                (EventType.USER_LEAVE, 'player')]
+
+    def test_import(self, session, ttt_model, logs):
+        """ Test that events of known players are written """
+        stats = import_logs(session, ttt_model, [str(logs)], processes=2,
+                            batch_size=2)
+
+        assert stats['lines'] == len(LINES)
+        assert stats['events'] == 3
+        assert stats['skipped'] == 1
+
+        events = session.query(Event).order_by(Event.time).all()
+        user = session.query(User).filter(User.username == 'player').one()
+        assert [e.type for e in events] == [EventType.USER_JOIN,
+                                            EventType.USER_DIE,
+                                            EventType.USER_LEAVE]
+        assert {(e.userID, e.gameID, e.watcherID) for e in events} == \
+            {(user.id, ttt_model.gameID, ttt_model.id)}
+        assert events[1].payload == {'killer': 'unknown'}
+
+    def test_no_log_watcher(self, session, watcher_model, logs):
+        """ Test that watchers without log parsing are rejected """
+        with pytest.raises(TypeError):
+            import_logs(session, watcher_model, [str(logs)])
+
+    def test_command_no_log_watcher(self, session, watcher_model, logs):
+        """ Test that the command rejects watchers without log parsing """
+        result = CliRunner().invoke(main, [
+            '--config', 'tests/config.toml', 'import-logs',
+            '--watcher', str(watcher_model.id), str(logs)])
+
+        assert result.exit_code == 2
+        assert 'does not parse logs' in result.output
+
+    def test_command(self, session, ttt_model, logs):
+        """ Test the import-logs command """
+        result = CliRunner().invoke(main, [
+            '--config', 'tests/config.toml', 'import-logs',
+            '--watcher', str(ttt_model.id), '--processes', '1', str(logs)])
+
+        assert result.exit_code == 0, result.output
+        assert 'Imported 3 events from 5 lines' in result.output
+        assert session.query(Event).count() == 3
+
+        result = CliRunner().invoke(main, [
+            '--config', 'tests/config.toml', 'import-logs',
+            '--watcher', '1000', str(logs)])
+        assert result.exit_code != 0
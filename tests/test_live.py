@@ -0,0 +1,66 @@
+import json
+
+from datetime import datetime
+
+from lamon.models import EventType
+from lamon.watcher.feed import feed
+
+from . import flask
+
+
+def _publish(game_id, score):
+    feed.publish([{'type': int(EventType.USER_SCORE),
+                   'time': datetime(2019, 1, 1), 'score': score,
+                   'gameID': game_id, 'watcherID': None, 'userID': 1}])
+
+
+def _messages(response, count):
+    """ Read *count* messages from an endless event stream """
+    messages = []
+    chunks = iter(response.response)
+
+    while len(messages) < count:
+        chunk = next(chunks)
+        chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+        if chunk.startswith('id:'):
+            id, data = chunk.strip().split('\n')
+            messages.append((int(id[4:]), json.loads(data[6:])))
+
+    response.close()
+    return messages
+
+
+class TestLive():
+    """ Test the Server-Sent Events streams """
+
+    def test_new_events(self, flask):
+        flask.config['STATS']['live']['poll_interval'] = 0.01
+        _publish(1, 1)  # Published before connecting
+
+        response = flask.test_client().get('/live/game/1', buffered=False)
+        _publish(2, 2)
+        _publish(1, 3)
+
+        assert response.mimetype == 'text/event-stream'
+        assert [e['score'] for _, e in _messages(response, 1)] == [3]
+
+    def test_last_event_id(self, flask):
+        flask.config['STATS']['live']['poll_interval'] = 0.01
+        _publish(1, 1)
+        last_id = feed.last_id
+        _publish(1, 2)
+        _publish(1, 3)
+
+        response = flask.test_client().\
+            get('/live/game/1', headers={'Last-Event-ID': str(last_id)},
+                buffered=False)
+        messages = _messages(response, 2)
+
+        assert [e['score'] for _, e in messages] == [2, 3]
+        assert messages[-1][0] == feed.last_id
+
+    def test_bad_request(self, flask):
+        response = flask.test_client().\
+            get('/live/game/1', headers={'Last-Event-ID': 'x'})
+
+        assert response.status_code == 400
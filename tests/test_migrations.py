@@ -0,0 +1,96 @@
+import pytest
+
+from sqlalchemy import create_engine, inspect, select
+
+from lamon import db
+from lamon.migrations import migrate, schema_version, MIGRATIONS
+from lamon.models import Event, EventType, Nickname
+
+
+@pytest.fixture
+def engine():
+    """ Database as created by a version without indexes """
+    engine = create_engine('sqlite://')
+    db.Model.metadata.create_all(engine)
+
+    for table in [Event.__table__, Nickname.__table__]:
+        for index in table.indexes:
+            index.drop(engine)
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def baseline():
+    """ Database as created by the first version of lamon """
+    engine = create_engine('sqlite://')
+    engine.execute('CREATE TABLE events (id INTEGER PRIMARY KEY, '
+                   'type INTEGER, time DATETIME, info VARCHAR, '
+                   'watcherID INTEGER, gameID INTEGER, userID INTEGER)')
+    engine.execute('CREATE TABLE nicknames (id INTEGER PRIMARY KEY, '
+                   'nick VARCHAR, userID INTEGER, gameID INTEGER)')
+
+    yield engine
+    engine.dispose()
+
+
+def _indexes(engine, table):
+    return {i['name'] for i in inspect(engine).get_indexes(table)}
+
+
+class TestMigrate():
+    """ Test the schema migrations """
+
+    def test_migrate(self, engine):
+        """ Test that missing indexes are created """
+        assert migrate(engine) == len(MIGRATIONS)
+
+        assert _indexes(engine, 'events') == {'ix_events_game_user_type_time',
+                                              'ix_events_watcher_time',
+                                              'ix_events_time',
+                                              'ix_events_user_time'}
+        assert _indexes(engine, 'nicknames') == {'ix_nicknames_game_nick'}
+
+    def test_idempotent(self, engine):
+        """ Test that migrations are only applied once """
+        migrate(engine)
+        engine.execute(schema_version.delete())
+
+        assert migrate(engine) == len(MIGRATIONS)  # Indexes already exist
+        assert migrate(engine) == len(MIGRATIONS)
+
+    def test_duplicate_nicknames(self, baseline):
+        """ Test that duplicate nicknames don't block the other migrations
+        and the unique index is retried on the next start """
+        for _ in range(2):
+            baseline.execute(Nickname.__table__.insert(), nick='nick',
+                             gameID=1)
+
+        assert migrate(baseline) == len(MIGRATIONS) - 1
+        assert 'ix_nicknames_game_nick' not in _indexes(baseline, 'nicknames')
+        assert {'score', 'payload'} <= \
+            {c['name'] for c in inspect(baseline).get_columns('events')}
+
+        baseline.execute(Nickname.__table__.delete().
+                         where(Nickname.__table__.c.id == 1))
+        assert migrate(baseline) == len(MIGRATIONS)
+        assert 'ix_nicknames_game_nick' in _indexes(baseline, 'nicknames')
+
+    def test_typed_values(self, baseline):
+        """ Test moving scores and details out of the info column """
+        engine = baseline
+        engine.execute('INSERT INTO events (type, info) VALUES (?, ?)',
+                       [(int(EventType.USER_SCORE), '12.5'),
+                        (int(EventType.USER_LEAVE), 'Disconnect by user.'),
+                        (int(EventType.USER_JOIN), None),
+                        (int(EventType.USER_SCORE), 'n/a')])
+
+        migrate(engine)
+
+        rows = engine.execute(select([Event.__table__.c.score,
+                                      Event.__table__.c.payload]).
+                              order_by(Event.__table__.c.id)).fetchall()
+        assert [tuple(row) for row in rows] == [
+            (12.5, None), (None, {'reason': 'Disconnect by user.'}),
+            (None, None), (None, None)]
@@ -0,0 +1,146 @@
+from datetime import datetime
+
+from lamon import stats
+from lamon.cache import stats_cache
+from lamon.models import User, Event, EventType, ScoreRollup, ScoreBucket
+from lamon.rollups import update_rollups, rebuild_rollups, bucket_start
+
+from . import session, flask, watcher_model
+
+
+def _score(user, watcher_model, time, score):
+    return {'type': EventType.USER_SCORE, 'time': time, 'score': score,
+            'userID': user.id, 'gameID': None, 'watcherID': watcher_model.id}
+
+
+def _user(session):
+    user = User(username='player')
+    session.add(user)
+    session.commit()
+    return user
+
+
+def _buckets(session, resolution):
+    return session.query(ScoreBucket).\
+        filter(ScoreBucket.resolution == resolution).\
+        order_by(ScoreBucket.start).all()
+
+
+class TestRollups():
+    """ Test incremental score aggregates """
+
+    def test_bucket_start(self):
+        """ Test flooring to bucket boundaries """
+        time = datetime(2019, 1, 1, 12, 34, 56, 789)
+
+        assert bucket_start(time, 60) == datetime(2019, 1, 1, 12, 34)
+        assert bucket_start(time, 3600) == datetime(2019, 1, 1, 12)
+
+    def test_update(self, session, watcher_model):
+        """ Test aggregation of a single batch """
+        user = _user(session)
+        update_rollups(session, [
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 0, 30), 5),
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 0, 10), 2),
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 1, 0), 3),
+            {'type': EventType.USER_JOIN, 'time': datetime.now(),
+             'score': None, 'userID': user.id, 'gameID': None,
+             'watcherID': watcher_model.id}
+        ])
+        session.commit()
+
+        rollup = session.query(ScoreRollup).one()
+        assert rollup.score == 3
+        assert rollup.max_score == 5
+        assert rollup.time == datetime(2019, 1, 1, 12, 1, 0)
+
+        minutes = _buckets(session, 60)
+        assert [(b.last, b.min_score, b.max_score, b.count)
+                for b in minutes] == [(5, 2, 5, 2), (3, 3, 3, 1)]
+
+        hours = _buckets(session, 3600)
+        assert [(b.last, b.count) for b in hours] == [(3, 3)]
+
+    def test_incremental(self, session, watcher_model):
+        """ Test merging a batch into existing aggregates """
+        user = _user(session)
+        update_rollups(session, [
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 0, 10), 4)])
+        session.commit()
+
+        update_rollups(session, [
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 0, 20), 1),
+            _score(user, watcher_model, datetime(2019, 1, 1, 11, 0, 0), 9)])
+        session.commit()
+
+        rollup = session.query(ScoreRollup).one()
+        assert rollup.score == 1
+        assert rollup.max_score == 9
+
+        minutes = _buckets(session, 60)
+        assert [(b.last, b.min_score, b.max_score, b.count)
+                for b in minutes] == [(9, 9, 9, 1), (1, 1, 4, 2)]
+
+    def test_rebuild(self, session, watcher_model):
+        """ Test that rebuilding from events matches incremental updates """
+        user = _user(session)
+        for minute, score in enumerate([1, 7, 3]):
+            session.add(Event(type=EventType.USER_SCORE, score=score,
+                              time=datetime(2019, 1, 1, 12, minute),
+                              userID=user.id, watcherID=watcher_model.id))
+        session.commit()
+
+        rebuild_rollups(session, chunk_size=2)
+
+        rollup = session.query(ScoreRollup).one()
+        assert (rollup.score, rollup.max_score) == (3, 7)
+        assert [b.last for b in _buckets(session, 60)] == [1, 7, 3]
+        assert [b.count for b in _buckets(session, 3600)] == [3]
+
+
+class TestScoreStats():
+    """ Test score statistics read from the rollups """
+
+    def test_score(self, session, watcher_model):
+        user = _user(session)
+        assert stats.score(user_id=user.id) == 0
+
+        update_rollups(session, [
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 0), 2),
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 5), 6)])
+        session.commit()
+        stats_cache.invalidate(user_id=user.id)  # Done by the writer
+
+        assert stats.score(user_id=user.id) == 6
+
+    def test_score_timeline(self, session, watcher_model):
+        user = _user(session)
+        update_rollups(session, [
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 0, 1), 2),
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 0, 2), 4),
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 5), 6)])
+        session.commit()
+
+        x, y = stats.score(timeline=True, user_id=user.id)
+
+        assert x == ['2019-01-01 12:00:00', '2019-01-01 12:05:00']
+        assert y == [4, 6]
+
+    def test_score_timeline_downsampled(self, session, watcher_model):
+        """ Test that hour buckets are used where minute buckets were deleted
+        """
+        user = _user(session)
+        update_rollups(session, [
+            _score(user, watcher_model, datetime(2019, 1, 1, 10, 30), 1),
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 10), 2),
+            _score(user, watcher_model, datetime(2019, 1, 1, 12, 20), 3)])
+        session.query(ScoreBucket).\
+            filter(ScoreBucket.resolution == 60).\
+            filter(ScoreBucket.start < datetime(2019, 1, 1, 12)).delete()
+        session.commit()
+
+        x, y = stats.score(timeline=True, user_id=user.id)
+
+        assert x == ['2019-01-01 10:00:00', '2019-01-01 12:10:00',
+                     '2019-01-01 12:20:00']
+        assert y == [1, 2, 3]
@@ -0,0 +1,151 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from lamon import stats
+from lamon.cache import stats_cache
+from lamon.rollups import update_rollups
+from lamon.models import User, Game, Nickname, Event, EventType
+from lamon.models import Watcher as WatcherModel
+
+from . import session, flask
+
+
+@pytest.fixture
+def games(session):
+    games = [Game(name='a'), Game(name='b')]
+    watchers = [WatcherModel(game=games[0]), WatcherModel(game=games[0]),
+                WatcherModel(game=games[1])]
+    users = [User(username=f'user{i}') for i in range(3)]
+    session.add_all(games + watchers + users)
+    session.commit()
+
+    def add(watcher, user):
+        session.add(Event(type=EventType.USER_JOIN, time=datetime.now(),
+                          watcherID=watcher.id, gameID=watcher.gameID,
+                          userID=user.id))
+
+    add(watchers[0], users[0])
+    add(watchers[0], users[0])
+    add(watchers[1], users[0])
+    add(watchers[1], users[1])
+    add(watchers[2], users[2])
+    session.add(Event(type=EventType.WATCHER_START, time=datetime.now(),
+                      watcherID=watchers[2].id, gameID=games[1].id))
+    session.commit()
+
+    yield games, watchers
+
+
+class TestNumberOfPlayers():
+    """ Test distinct player counts """
+
+    def test_number_of_players(self, flask, games):
+        games, watchers = games
+
+        with flask.app_context():
+            assert stats.number_of_players() == 3
+            assert stats.number_of_players(game_id=games[0].id) == 2
+            assert stats.number_of_players(watcher_id=watchers[0].id) == 1
+
+    def test_players_per_game(self, flask, games):
+        games, watchers = games
+
+        with flask.app_context():
+            assert stats.players_per_game() == {games[0].id: 2,
+                                                games[1].id: 1}
+
+    def test_players_per_watcher(self, flask, games):
+        games, watchers = games
+
+        with flask.app_context():
+            assert stats.players_per_watcher(game_id=games[0].id) == \
+                {watchers[0].id: 1, watchers[1].id: 2}
+
+    def test_expired_events(self, flask, session, games):
+        """ Test that players with scores still count after their events
+        were deleted """
+        games, watchers = games
+        user = session.query(User).filter(User.username == 'user2').one()
+        update_rollups(session, [{
+            'type': EventType.USER_SCORE, 'time': datetime.now(),
+            'score': 1, 'userID': user.id, 'gameID': games[1].id,
+            'watcherID': watchers[2].id}])
+        session.query(Event).delete()
+        session.commit()
+        stats_cache.clear()
+
+        with flask.app_context():
+            assert stats.number_of_players() == 1
+            assert stats.players_per_game() == {games[1].id: 1}
+            assert stats.players_per_watcher() == {watchers[2].id: 1}
+
+    def test_views(self, flask, games):
+        """ Test that the listing pages render the counts """
+        client = flask.test_client()
+
+        assert client.get('/game/').status_code == 200
+        assert client.get('/watcher/').status_code == 200
+        assert client.get(f'/game/{games[0][0].id}/').status_code == 200
+
+
+class TestScoreboard():
+    """ Test the players table of the game page """
+
+    def test_scoreboard(self, flask, session):
+        game = Game(name='game')
+        users = [User(username='a'), User(username='b')]
+        session.add_all([Nickname(nick='nick_a', user=users[0], game=game),
+                         Nickname(nick='nick_b', user=users[1], game=game)])
+        session.commit()
+
+        update_rollups(session, [
+            {'type': EventType.USER_SCORE, 'time': datetime(2019, 1, 1, h),
+             'score': score, 'userID': users[0].id, 'gameID': game.id,
+             'watcherID': None} for h, score in [(1, 5), (2, 7)]])
+        session.commit()
+
+        with flask.app_context():
+            board = [(u.username, nick, score)
+                     for u, nick, score in stats.scoreboard(game.id)]
+
+        assert board == [('a', 'nick_a', 7), ('b', 'nick_b', None)]
+
+
+class TestLTTB():
+    """ Test timeline downsampling """
+
+    def test_lttb(self):
+        series = [(i, 0) for i in range(1000)]
+        series[500] = (500, 100)  # Spike
+
+        sampled = stats.lttb(series, 20)
+
+        assert len(sampled) == 20
+        assert sampled[0] == series[0]
+        assert sampled[-1] == series[-1]
+        assert (500, 100) in sampled
+        assert [x for x, y in sampled] == sorted(x for x, y in sampled)
+
+    def test_short(self):
+        series = [(datetime(2019, 1, 1, h), h) for h in range(5)]
+        assert stats.lttb(series, 10) == series
+
+    def test_score_timeline(self, flask, session):
+        user = User(username='player')
+        session.add(user)
+        session.commit()
+
+        update_rollups(session, [
+            {'type': EventType.USER_SCORE, 'score': m % 7,
+             'time': datetime(2019, 1, 1) + timedelta(minutes=m),
+             'userID': user.id, 'gameID': None, 'watcherID': None}
+            for m in range(600)])
+        session.commit()
+
+        with flask.app_context():
+            x, y = stats.score(timeline=True, user_id=user.id, points=200)
+            assert len(x) == 200
+
+            x, y = stats.score(timeline=True, user_id=user.id, points=10)
+            assert len(x) == 10  # From the hour buckets
@@ -1,8 +1,9 @@
 from time import sleep, time
 from random import randrange, choice
 
-from lamon.watcher import Watcher
+from lamon.watcher import Watcher, AsyncWatcher
 from lamon.models import Game, User, Nickname
+from lamon.models import Watcher as WatcherModel
 
 
 class FakeWatcher(Watcher):
@@ -22,13 +23,26 @@ class FakeWatcher(Watcher):
         return inst
 
     def __init__(self, **kwargs):
-        super().__init__(__name__, kwargs['session'], kwargs['model_id'])
+        super().__init__(__name__, kwargs['session'], kwargs['model_id'],
+                         kwargs.get('writer'))
 
     def runner(self):
         while getattr(self, 'shutdown', True):
             pass
 
 
+class FakeAsyncWatcher(AsyncWatcher):
+    """ Testing watcher running on the event loop. Does nothing """
+
+    config_keys = {}
+
+    def __init__(self, **kwargs):
+        super().__init__(__name__, **kwargs)
+
+    async def poll(self):
+        pass
+
+
 class ValueWatcher(Watcher):
     """ Insert random testing values """
 
@@ -38,8 +52,11 @@ class ValueWatcher(Watcher):
     def runner(self):
         while getattr(self, 'shutdown', True):
             game = choice(self._session.query(Game).all())
-            self._model.game = game
+            self._session.query(WatcherModel).\
+                filter(WatcherModel.id == self._model_id).\
+                update({'gameID': game.id})
             self._session.commit()
+            self.refresh()
 
             new_round = time() + (5 * 60)
 
@@ -1,3 +1,5 @@
+import asyncio
+
 from unittest.mock import MagicMock
 
 import pytest
@@ -9,7 +11,7 @@ from lamon.models import WatcherConfig
 from lamon.watcher.plugin.quake3 import Quake3Watcher, Quake3
 from lamon.watcher import WatcherException
 
-from tests import watcher_model, session, flask
+from tests import watcher_model, session, flask, loop
 
 
 # @pytest.fixture
@@ -47,41 +49,60 @@ from tests import watcher_model, session, flask
 
 
 @pytest.fixture
-def quake3():
-    """ Set up a mock Quake3 object """
+def quake3(loop):
+    """ Set up a Quake3 object with a mock transport """
     q = Quake3(('localhost', 5000), 1, '1234')
-    q.sock.close()
-    q.sock = MagicMock()
 
+    async def connect():
+        if q._responses is None:
+            q._responses = asyncio.Queue()
+            q.transport = MagicMock()
+
+    q.connect = connect
     return q
 
+
+def respond(quake3, data):
+    """ Let the mock transport answer every packet with data """
+    quake3.transport.sendto.side_effect = \
+        lambda packet: quake3.datagram_received(data, quake3.addr)
+
 class TestQuake3():
     """ Test the Quake3 Watcher """
 
-    def test_cmd(self, quake3):
+    def test_cmd(self, quake3, loop):
         """ Test correct command sending / receiving """
-        quake3.sock.recv.return_value = b'\xFF\xFF\xFF\xFFprint\nte\nst'
-        resp = quake3.cmd('test')
+        loop.run_until_complete(quake3.connect())
+        respond(quake3, b'\xFF\xFF\xFF\xFFprint\nte\nst')
+        resp = loop.run_until_complete(quake3.cmd('test'))
 
-        quake3.sock.send.assert_called_with(
+        quake3.transport.sendto.assert_called_with(
             b'\xFF\xFF\xFF\xFF' + b'test')
 
         assert resp == ('print', 'te\nst')
 
-    def test_badPassword(self, quake3):
+    def test_timeout(self, quake3, loop):
+        """ Test for correct exception when the server doesn't answer """
+        quake3.timeout = 0.01
+
+        with pytest.raises(WatcherException):
+            loop.run_until_complete(quake3.cmd('test'))
+
+    def test_badPassword(self, quake3, loop):
         """ Test for correct exception on bad password """
-        quake3.sock.recv.return_value = b'\xff\xff\xff\xffprint\nBad rconpassword.\n'
+        loop.run_until_complete(quake3.connect())
+        respond(quake3, b'\xff\xff\xff\xffprint\nBad rconpassword.\n')
 
         with pytest.raises(WatcherException):
-            quake3.get_info()
+            loop.run_until_complete(quake3.get_info())
 
-    def test_get_info(self, quake3, monkeypatch):
+    def test_get_info(self, quake3, loop):
         """ Test parsing of the status string """
-        def mock(*args):
+        async def mock(*args):
             return ('print', 'map: Q3 DM1\nnum score ping name            lastmsg address               qport rate\n--- ----- ---- --------------- ------- --------------------- ----- -----\n  0     0    0 Unnamed Player^7         0 l oopback              33978 99999\n  1     0  999 Angel^7                 0 bot                       0 16384\n  2     0  999 Angel^7                 0 bot                       0 16384\n  3     0  999 Cadavre^7  0 bot                       0 16384\n  4     0  999 Cadavre^7               0 bot                       0 16384\n  5     0  999 Bitterman^7             0 bot                       0 16384\n  6     0 999 Bitterman^7             0 bot                       0 16384\n  7     0  999 Crash^7                 0 bot                       0 16384\n\n')
 
         quake3.rcon = mock
-        info = quake3.get_info()
+        info = loop.run_until_complete(quake3.get_info())
 
         assert info['players'] == {
             'Unnamed Player': {
@@ -105,3 +126,107 @@ class TestQuake3():
             }
         }
         assert info['map'] == 'Q3 DM1'
+
+    def test_split_response(self, quake3, loop):
+        """ Test that rcon output spanning several packets is joined """
+        loop.run_until_complete(quake3.connect())
+
+        def reply(packet):
+            for part in [b'map: q3dm1\nnum sc', b'ore ping\n']:
+                loop.call_soon(quake3.datagram_received,
+                               b'\xFF\xFF\xFF\xFFprint\n' + part, quake3.addr)
+
+        quake3.transport.sendto.side_effect = reply
+        resp = loop.run_until_complete(quake3.rcon('status'))
+
+        assert resp == ('print', 'map: q3dm1\nnum score ping\n')
+
+    def test_get_status(self, quake3, loop):
+        """ Test parsing of the getstatus response """
+        loop.run_until_complete(quake3.connect())
+        respond(quake3, b'\xFF\xFF\xFF\xFFstatusResponse\n'
+                        b'\\mapname\\q3dm17\\challenge\\1\\sv_hostname\\lan\n'
+                        b'5 50 "Angel"\n-1 999 "^1Crash^7Bot"\n')
+
+        status = loop.run_until_complete(quake3.get_status())
+
+        quake3.transport.sendto.assert_called_with(
+            b'\xFF\xFF\xFF\xFFgetstatus 1')
+        assert status['map'] == 'q3dm17'
+        assert status['info']['sv_hostname'] == 'lan'
+        assert status['players'] == {'Angel': {'frags': '5', 'ping': '50'},
+                                     '^1Crash': {'frags': '-1',
+                                                 'ping': '999'}}
+
+    def test_concurrent(self, quake3, loop):
+        """ Test that concurrent requests get their own responses """
+        loop.run_until_complete(quake3.connect())
+        packets = []
+        quake3.transport.sendto.side_effect = packets.append
+
+        async def requests():
+            return await asyncio.gather(quake3.get_status(),
+                                        quake3.get_status(),
+                                        quake3.rcon('status'))
+
+        async def replies():
+            await asyncio.sleep(0.01)
+            assert len(packets) == 3
+            for data in [b'print\nrcon',
+                         b'statusResponse\n\\mapname\\two\\challenge\\2\n',
+                         b'statusResponse\n\\mapname\\one\\challenge\\1\n']:
+                quake3.datagram_received(b'\xFF\xFF\xFF\xFF' + data,
+                                         quake3.addr)
+
+        one, two, rcon = loop.run_until_complete(
+            asyncio.gather(requests(), replies()))[0]
+
+        assert (one['map'], two['map']) == ('one', 'two')
+        assert rcon == ('print', 'rcon')
+
+    def test_request_timeout(self, quake3, loop):
+        """ Test that a late response doesn't reach the next request """
+        loop.run_until_complete(quake3.connect())
+
+        with pytest.raises(WatcherException):
+            loop.run_until_complete(quake3.get_status(timeout=0.01))
+
+        quake3.datagram_received(
+            b'\xFF\xFF\xFF\xFFstatusResponse\n\\challenge\\1\n', quake3.addr)
+        respond(quake3, b'\xFF\xFF\xFF\xFFstatusResponse\n'
+                        b'\\mapname\\q3dm1\\challenge\\2\n')
+
+        assert loop.run_until_complete(quake3.get_status())['map'] == 'q3dm1'
+
+    def test_concurrent_connect(self, loop):
+        """ Test that concurrent first requests share one socket """
+        class Server(asyncio.DatagramProtocol):
+            def connection_made(self, transport):
+                self.transport = transport
+
+            def datagram_received(self, data, addr):
+                challenge = data[4:].decode().split(' ')[1]
+                self.transport.sendto(
+                    b'\xFF\xFF\xFF\xFFstatusResponse\n\\challenge\\' +
+                    challenge.encode() + b'\n', addr)
+
+        server, _ = loop.run_until_complete(loop.create_datagram_endpoint(
+            Server, local_addr=('127.0.0.1', 0)))
+        quake3 = Quake3(server.get_extra_info('sockname'), 1)
+
+        endpoints = []
+        create = loop.create_datagram_endpoint
+
+        async def create_endpoint(*args, **kwargs):
+            endpoints.append(args)
+            return await create(*args, **kwargs)
+
+        loop.create_datagram_endpoint = create_endpoint
+        try:
+            loop.run_until_complete(asyncio.gather(
+                *(quake3.get_status() for _ in range(5))))
+        finally:
+            quake3.close()
+            server.close()
+
+        assert len(endpoints) == 1
@@ -1,15 +1,20 @@
 from sqlalchemy.orm import scoped_session, sessionmaker
 from datetime import datetime
+from unittest.mock import MagicMock
 
+import asyncio
+import struct
 import pytest
 import os
 
 from lamon import db
 from lamon.models import WatcherConfig
 from lamon.watcher.log_mixin import LogMixin
-from lamon.watcher.plugin.source_engine import SourceEngineWatcher, TTTWatcher
+from lamon.watcher import WatcherException
+from lamon.watcher.plugin.source_engine import SourceEngineWatcher, \
+    TTTWatcher, A2SClient
 
-from tests import watcher_model, session, flask
+from tests import watcher_model, session, flask, loop
 
 
 @pytest.fixture
@@ -56,6 +61,66 @@ def ttt_watcher(watcher_model, session, monkeypatch):
         pass
 
 
+@pytest.fixture
+def a2s(loop):
+    """ Set up an A2SClient with a mock transport """
+    client = A2SClient(('localhost', 27015), 0.1)
+
+    async def connect():
+        if client._responses is None:
+            client._responses = asyncio.Queue()
+            client.transport = MagicMock()
+
+    client.connect = connect
+    loop.run_until_complete(client.connect())
+    return client
+
+
+def respond(client, *responses):
+    """ Answer each sent packet with the next list of packets """
+    responses = list(responses)
+
+    def sendto(packet):
+        for data in responses.pop(0):
+            client.datagram_received(data, client.addr)
+
+    client.transport.sendto.side_effect = sendto
+
+
+class TestA2SClient():
+    challenge = b'\xff\xff\xff\xff\x41' + struct.pack('<l', 1234)
+
+    def test_players_split(self, a2s, loop):
+        """ Test challenge handling and reassembly of split responses """
+        payload = b'\x44\x01\x00player\x00' + struct.pack('<lf', 5, 1.0)
+        fragments = [
+            b'\xfe\xff\xff\xff' + struct.pack('<lBBh', 1, 2, i, 1248) + part
+            for i, part in enumerate([payload[:5], payload[5:]])]
+
+        respond(a2s, [self.challenge], reversed(fragments))
+        players = loop.run_until_complete(a2s.players())
+
+        assert players['players'][0]['name'] == 'player'
+        assert players['players'][0]['score'] == 5
+
+        sent = a2s.transport.sendto.call_args[0][0]
+        assert sent == b'\xff\xff\xff\xff\x55' + struct.pack('<l', 1234)
+
+    def test_broken_response(self, a2s, loop):
+        """ Test for correct exception on garbage """
+        respond(a2s, [b'\xff\xff\xff\xff\x00'])
+
+        with pytest.raises(WatcherException):
+            loop.run_until_complete(a2s.players())
+
+    def test_no_response(self, a2s, loop):
+        """ Test for correct exception when the server doesn't answer """
+        respond(a2s, [])
+
+        with pytest.raises(WatcherException):
+            loop.run_until_complete(a2s.info())
+
+
 class TestTTT():
     def test_join_message(self, ttt_watcher, monkeypatch):
         messages = [
@@ -83,10 +148,10 @@ class TestTTT():
         ]
 
         for msg in messages:
-            def mock(nick, time=None, info=None):
+            def mock(nick, time=None, payload=None):
                 assert nick == msg[1]
                 assert time == msg[2]
-                assert info == msg[3]
+                assert payload == {'reason': msg[3]}
 
             monkeypatch.setattr(ttt_watcher, 'leave_event', mock)
 
@@ -101,11 +166,63 @@ class TestTTT():
         ]
 
         for msg in messages:
-            def mock(nick, time=None, info=None):
+            def mock(nick, time=None, payload=None):
                 assert nick == msg[1]
                 assert time == msg[2]
-                assert info == msg[3]
+                assert payload == {'killer': msg[3]}
 
             monkeypatch.setattr(ttt_watcher, 'die_event', mock)
 
             ttt_watcher.parse(msg[0])
+
+    def test_messages_dispatched(self, ttt_watcher, monkeypatch):
+        """ Test that every message reaches its handler """
+        calls = []
+        for name in ['join_event', 'leave_event', 'die_event']:
+            monkeypatch.setattr(ttt_watcher, name,
+                                lambda nick, name=name, **kwargs:
+                                calls.append((name, nick)))
+
+        ttt_watcher.parse("L 07/28/2019 - 21:53:40: 00:43.100 - KILL:\t JanCS [traitor] killed ugulugu [innocent]")
+        ttt_watcher.parse("L 07/28/2019 - 21:57:00: 04:03.57 - KILL:\t JanCS [traitor] killed flohwag1 [innocent]")
+        ttt_watcher.parse("L 07/28/2019 - 21:51:45: \"d4rkshad0w<3><STEAM_0:1:219712654><>\" entered the game")
+        ttt_watcher.parse("L 07/28/2019 - 21:53:41: 00:44.100 - DMG:\t JanCS [traitor] damaged flohwag1 [innocent] for 25 dmg")
+
+        assert calls == [('die_event', 'ugulugu'), ('die_event', 'flohwag1'),
+                         ('join_event', 'd4rkshad0w')]
+
+    def test_parse_lines(self, ttt_watcher, monkeypatch):
+        """ Test that unknown players don't stop a batch """
+        joined = []
+
+        def join_event(nick, **kwargs):
+            if nick == 'unknown':
+                raise ValueError(nick)
+            joined.append(nick)
+
+        monkeypatch.setattr(ttt_watcher, 'join_event', join_event)
+        ttt_watcher.parse_lines([
+            "L 07/28/2019 - 21:51:45: \"unknown<3><STEAM_0:1:1><>\" entered the game",
+            "L 07/28/2019 - 21:51:46: \"player<4><STEAM_0:1:2><>\" entered the game"])
+
+        assert joined == ['player']
+
+    def test_follow_failure(self, ttt_watcher, loop, monkeypatch):
+        """ Test that a failure of following the log file is reported """
+        from lamon.watcher.plugin import source_engine
+
+        async def follow(watcher, path):
+            raise OSError('Permission denied')
+
+        async def poll_runner(self):
+            await asyncio.sleep(0.1)
+
+        exceptions = []
+        monkeypatch.setattr(source_engine, 'follow', follow)
+        monkeypatch.setattr(SourceEngineWatcher, 'runner', poll_runner)
+        monkeypatch.setattr(ttt_watcher, 'exception_event', exceptions.append)
+        ttt_watcher.config['log_file'] = '/var/log/ttt.log'
+
+        loop.run_until_complete(ttt_watcher.runner())
+
+        assert [str(e) for e in exceptions] == ['Permission denied']
@@ -0,0 +1,107 @@
+from queue import Empty
+from threading import Thread, Event as ThreadingEvent
+
+import pytest
+
+from lamon.models import EventType
+from lamon.watcher.bus import EventBus, BLOCK, DROP, bus
+
+from .. import fake_watcher, session, flask, watcher_model
+
+
+def _event(type=EventType.USER_SCORE, info=None):
+    return {'type': int(type), 'info': info}
+
+
+class TestEventBus():
+    """ Test publishing events to in-process subscribers """
+
+    def test_types(self):
+        event_bus = EventBus()
+        scores = event_bus.subscribe(types=[EventType.USER_SCORE])
+        everything = event_bus.subscribe()
+
+        event_bus.publish(_event(EventType.USER_SCORE, 'a'))
+        event_bus.publish(_event(EventType.USER_JOIN, 'b'))
+
+        assert scores.get(timeout=1)['info'] == 'a'
+        with pytest.raises(Empty):
+            scores.get(timeout=0)
+        assert [everything.get(timeout=1)['info'] for _ in range(2)] == \
+            ['a', 'b']
+
+    def test_handler(self):
+        """ Test that handlers get batches of all events in order """
+        event_bus = EventBus()
+        received = []
+        subscription = event_bus.subscribe(received.extend)
+
+        for i in range(10):
+            event_bus.publish(_event(info=i))
+        event_bus.unsubscribe(subscription)
+
+        assert [e['info'] for e in received] == list(range(10))
+
+    def test_drop(self):
+        event_bus = EventBus()
+        subscription = event_bus.subscribe(maxsize=2, policy=DROP)
+
+        for i in range(5):
+            event_bus.publish(_event(info=i))
+
+        assert subscription.dropped == 3
+        assert [subscription.get(timeout=1)['info'] for _ in range(2)] == \
+            [0, 1]
+
+    def test_block(self):
+        """ Test that publishing waits for slow subscribers """
+        event_bus = EventBus()
+        release = ThreadingEvent()
+        received = []
+
+        def handler(events):
+            release.wait()
+            received.extend(events)
+
+        subscription = event_bus.subscribe(handler, maxsize=1, policy=BLOCK)
+        publisher = Thread(target=lambda: [event_bus.publish(_event(info=i))
+                                           for i in range(3)])
+        publisher.start()
+        publisher.join(timeout=0.2)
+        blocked = publisher.is_alive()
+
+        release.set()
+        publisher.join()
+        event_bus.unsubscribe(subscription)
+
+        assert blocked
+        assert subscription.dropped == 0
+        assert [e['info'] for e in received] == [0, 1, 2]
+
+    def test_replace(self):
+        """ Test that subscribing with a used name replaces the subscriber """
+        event_bus = EventBus()
+        old = event_bus.subscribe(name='x')
+        new = event_bus.subscribe(name='x')
+        event_bus.publish(_event())
+
+        assert new.get(timeout=1)
+        with pytest.raises(Empty):
+            old.get(timeout=0)
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            EventBus().subscribe(policy='unknown')
+
+    def test_watcher_events(self, fake_watcher, watcher_model):
+        """ Test that watchers publish their events """
+        subscription = bus.subscribe(types=[EventType.WATCHER_EXCEPTION])
+        try:
+            fake_watcher.exception_event(Exception('error'))
+            event = subscription.get(timeout=1)
+        finally:
+            bus.unsubscribe(subscription)
+
+        assert event['info'] == 'error'
+        assert event['watcherID'] == watcher_model.id
+        assert event['time'] is not None
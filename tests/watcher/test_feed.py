@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from lamon.models import EventType
+from lamon.watcher.feed import EventFeed
+
+
+def _event(game_id, watcher_id, score=None):
+    return {'type': int(EventType.USER_SCORE), 'time': datetime(2019, 1, 1),
+            'score': score, 'gameID': game_id, 'watcherID': watcher_id,
+            'userID': None, 'info': None, 'payload': None}
+
+
+class TestEventFeed():
+    """ Test the ring buffers of recently written events """
+
+    def test_topics(self):
+        feed = EventFeed()
+        feed.publish([_event(1, 10, 5), _event(2, 10), _event(None, 20)])
+
+        assert [e['score'] for _, e in feed.since(('game', 1))] == [5]
+        assert len(feed.since(('watcher', 10))) == 2
+        assert len(feed.since(('watcher', 20))) == 1
+        assert feed.since(('game', 3)) == []
+        assert feed.since(('game', 1))[0][1]['type'] == 'USER_SCORE'
+
+    def test_since(self):
+        feed = EventFeed()
+        feed.publish([_event(1, 10, 1)])
+        last_id = feed.last_id
+        feed.publish([_event(1, 10, 2), _event(1, 10, 3)])
+
+        events = feed.since(('game', 1), last_id)
+        assert [e['score'] for _, e in events] == [2, 3]
+        assert events[-1][0] == feed.last_id
+
+    def test_buffer_size(self):
+        feed = EventFeed(buffer_size=2)
+        feed.publish([_event(1, 10, i) for i in range(5)])
+
+        assert [e['score'] for _, e in feed.since(('game', 1))] == [3, 4]
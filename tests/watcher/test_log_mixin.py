@@ -0,0 +1,73 @@
+import pytest
+
+from lamon.models import EventType
+from lamon.watcher.log_mixin import LogParser, LogMixin
+
+
+class TestLogParser():
+    """ Test dispatching log messages with the combined expression """
+
+    def test_dispatch(self):
+        matches = []
+        parser = LogParser({
+            r'score (\w+) (\d+)': lambda m: matches.append(('score', m[1], m[2])),
+            r'join (\w+)': lambda m: matches.append(('join', m[1])),
+            r'join (\w+) again': lambda m: matches.append(('again', m[1]))})
+
+        assert parser.parse('join player again')
+        assert parser.parse('score player 5')
+        assert not parser.parse('other join player')
+
+        # The first matching pattern wins
+        assert matches == [('join', 'player'), ('score', 'player', '5')]
+
+    def test_groups(self):
+        """ Test that groups are numbered like the pattern matched alone """
+        matches = []
+        parser = LogParser({r'a(\d)': None,
+                            r'b(\d)(x)?': matches.append},
+                           prefix=r'\[(\d\d)\] ')
+
+        parser.parse('[12] b3 rest')
+        match, = matches
+
+        assert match[0] == '[12] b3'
+        assert (match[1], match[2], match[3]) == ('12', '3', None)
+        assert match.group(1, 2) == ('12', '3')
+        assert match.groups('-') == ('12', '3', '-')
+        with pytest.raises(IndexError):
+            match[4]
+
+    def test_unsupported(self):
+        with pytest.raises(ValueError):
+            LogParser({r'(?P<name>.*)': None})
+        with pytest.raises(ValueError):
+            LogParser({r'(a)\1': None})
+
+
+class TestLogMixin():
+    def test_parse(self):
+        class Parser(LogMixin):
+            log_prefix = r'(\d+): '
+
+            def __init__(self):
+                self.messages = []
+                self.log_parser = {r'(.*)': self.messages.append}
+
+        parser = Parser()
+        parser.parse('1: a')
+        parser.log_parser = {r'x(.*)': parser.messages.append}
+        parser.parse('2: xb')
+
+        assert [(m[1], m[2]) for m in parser.messages] == \
+            [('1', 'a'), ('2', 'b')]
+
+    def test_default_log_event(self):
+        """ Test that matches of log_events are ignored by default """
+        class Parser(LogMixin):
+            log_events = {r'(.*) joined': EventType.USER_JOIN}
+
+            def join_event(self, *args, **kwargs):
+                raise AssertionError('No event expected')
+
+        Parser().parse('player joined')
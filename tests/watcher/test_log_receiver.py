@@ -0,0 +1,107 @@
+import asyncio
+import socket
+
+import pytest
+
+from lamon.watcher.log_receiver import LogReceiver
+
+from .. import loop
+
+
+class LineCollector():
+    """ Stands in for a watcher """
+
+    def __init__(self):
+        self.batches = []
+
+    async def run_blocking(self, func, *args):
+        return func(*args)
+
+    def parse_lines(self, lines):
+        self.batches.append(lines)
+
+
+@pytest.fixture
+def sender():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(('127.0.0.1', 0))
+    yield sock
+    sock.close()
+
+
+def _packet(line, secret=None):
+    if secret is None:
+        return b'\xff\xff\xff\xffR' + line.encode() + b'\n\x00'
+    return b'\xff\xff\xff\xffS' + secret.encode() + line.encode() + b'\n\x00'
+
+
+class TestLogReceiver():
+    def test_decode(self):
+        assert LogReceiver._decode(_packet('L line'), None) == 'L line'
+        assert LogReceiver._decode(_packet('L line', 's3'), 's3') == 'L line'
+        assert LogReceiver._decode(_packet('L line', 'xx'), 's3') is None
+        assert LogReceiver._decode(_packet('L line'), 's3') is None
+        assert LogReceiver._decode(b'garbage', None) is None
+
+    def test_receive(self, loop, sender):
+        """ Test demultiplexing by source address and batching """
+        receiver = LogReceiver(host='127.0.0.1')
+        watcher, other = LineCollector(), LineCollector()
+
+        async def receive():
+            await receiver.register(watcher, sender.getsockname())
+            await receiver.register(other, ('127.0.0.1', 1))
+            addr = receiver.transport.get_extra_info('sockname')
+
+            for i in range(3):
+                sender.sendto(_packet(f'L {i}'), addr)
+
+            while sum(len(b) for b in watcher.batches) < 3:
+                await asyncio.sleep(0.01)
+
+        try:
+            loop.run_until_complete(asyncio.wait_for(receive(), 5))
+        finally:
+            receiver.close()
+
+        assert [line for batch in watcher.batches for line in batch] == \
+            ['L 0', 'L 1', 'L 2']
+        assert other.batches == []
+
+    def test_queue_size(self, loop):
+        """ Test that the oldest lines are dropped when parsing lags """
+        receiver = LogReceiver(queue_size=2)
+        watcher = LineCollector()
+
+        async def receive():
+            await receiver.register(watcher, ('127.0.0.1', 27015))
+            for i in range(4):
+                receiver.datagram_received(_packet(f'L {i}'),
+                                           ('127.0.0.1', 27015))
+            await asyncio.sleep(0)
+
+        try:
+            loop.run_until_complete(receive())
+        finally:
+            receiver.close()
+
+        assert receiver.dropped == 2
+        assert watcher.batches == [['L 2', 'L 3']]
+
+    def test_unregister(self, loop):
+        receiver = LogReceiver()
+        watcher = LineCollector()
+
+        async def receive():
+            await receiver.register(watcher, ('127.0.0.1', 27015))
+            receiver.unregister(watcher)
+            receiver.datagram_received(_packet('L line'),
+                                       ('127.0.0.1', 27015))
+            await asyncio.sleep(0)
+
+        try:
+            loop.run_until_complete(receive())
+        finally:
+            receiver.close()
+
+        assert watcher.batches == []
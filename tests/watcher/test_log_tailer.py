@@ -0,0 +1,180 @@
+import asyncio
+import os
+
+from types import SimpleNamespace
+
+from lamon.models import WatcherConfig
+from lamon.watcher import log_tailer
+from lamon.watcher.log_tailer import LogTailer, follow, load_position, \
+    save_position, OFFSET_KEY
+
+from .. import session, flask, watcher_model, loop
+
+
+def _append(path, data):
+    with open(path, 'a') as log:
+        log.write(data)
+
+
+class TestLogTailer():
+    """ Test reading appended lines """
+
+    def test_append(self, tmpdir):
+        path = str(tmpdir.join('log'))
+        _append(path, 'old\n')
+
+        tailer = LogTailer(path, chunk_size=4)
+        assert tailer.read() == []  # Starts at the end
+
+        _append(path, 'first\nsec')
+        assert tailer.read() == ['first']
+        assert tailer.read() == []
+
+        _append(path, 'ond\n')
+        assert tailer.read() == ['second']
+        assert tailer.position == (os.stat(path).st_ino, 17)
+
+    def test_resume(self, tmpdir):
+        path = str(tmpdir.join('log'))
+        _append(path, 'a\nb\nc\n')
+        inode = os.stat(path).st_ino
+
+        assert LogTailer(path, inode, 2).read() == ['b', 'c']
+        assert LogTailer(path, inode + 1, 2).read() == ['a', 'b', 'c']
+        assert LogTailer(path, inode, 100).read() == ['a', 'b', 'c']
+        assert LogTailer(path).read() == []
+
+    def test_line_breaks(self, tmpdir):
+        """ Test that lines are only split at newlines """
+        path = str(tmpdir.join('log'))
+        _append(path, '')
+        tailer = LogTailer(path)
+
+        with open(path, 'ab') as log:
+            log.write(b'a\x0bb\r\nc\x1cd\n\n')
+        assert tailer.read() == ['a\x0bb', 'c\x1cd', '']
+
+    def test_rotation(self, tmpdir):
+        """ Test that the old file is read to its end first """
+        path = str(tmpdir.join('log'))
+        _append(path, '')
+        tailer = LogTailer(path)
+
+        _append(path, 'a\n')
+        os.rename(path, path + '.1')
+        assert tailer.read() == ['a']
+        _append(path, 'b\n')
+
+        assert tailer.read() == ['b']
+        assert tailer.read() == []
+
+    def test_truncation(self, tmpdir):
+        path = str(tmpdir.join('log'))
+        _append(path, 'a\nb\n')
+        tailer = LogTailer(path)
+
+        open(path, 'w').write('c\n')
+        assert tailer.read() == ['c']
+
+    def test_missing(self, tmpdir):
+        path = str(tmpdir.join('log'))
+        tailer = LogTailer(path)
+        assert tailer.read() == []
+
+        _append(path, 'a\n')
+        assert tailer.read() == ['a']
+
+
+class TestPosition():
+    def test_save_load(self, session, watcher_model):
+        assert load_position(session, watcher_model.id) == (None, None)
+
+        save_position(session, watcher_model.id, (1, 10))
+        save_position(session, watcher_model.id, (1, 20))
+
+        assert load_position(session, watcher_model.id) == (1, 20)
+        assert session.query(WatcherConfig).\
+            filter(WatcherConfig.key == OFFSET_KEY).count() == 1
+
+
+class LineCollector():
+    """ Stands in for a watcher """
+
+    def __init__(self, session, model_id):
+        self._session = session
+        self._model_id = model_id
+        self._writer = self
+        self.lines = []
+
+    async def run_blocking(self, func, *args):
+        return func(*args)
+
+    def parse_lines(self, lines):
+        self.lines += lines
+
+    def flush(self):
+        pass
+
+
+class TestFollow():
+    def test_follow(self, tmpdir, loop, session, watcher_model):
+        """ Test that following continues at the saved position """
+        path = str(tmpdir.join('log'))
+        _append(path, 'old\n')
+        watcher = LineCollector(session, watcher_model.id)
+
+        async def run(appended):
+            task = asyncio.ensure_future(follow(watcher, path, 0.01))
+            await asyncio.sleep(0.05)
+            _append(path, appended)
+            while not watcher.lines[-1:] == [appended.strip()]:
+                await asyncio.sleep(0.01)
+
+            task.cancel()
+            await asyncio.wait([task])
+
+        loop.run_until_complete(asyncio.wait_for(run('a\n'), 5))
+        _append(path, 'while stopped\n')
+        loop.run_until_complete(asyncio.wait_for(run('b\n'), 5))
+
+        assert watcher.lines == ['a', 'while stopped', 'b']
+
+    def test_inotify(self, tmpdir, loop, monkeypatch):
+        """ Test that inotify events of the directory wake up following """
+        watches = []
+        closed = []
+        read_fd, write_fd = os.pipe()
+
+        class INotify():
+            def add_watch(self, path, mask):
+                watches.append((path, mask))
+
+            def fileno(self):
+                return read_fd
+
+            def read(self, timeout=None):
+                os.read(read_fd, 1024)
+
+            def close(self):
+                closed.append(True)
+
+        monkeypatch.setattr(log_tailer, 'INotify', INotify)
+        monkeypatch.setattr(log_tailer, 'flags', SimpleNamespace(
+            MODIFY=2, CREATE=256, MOVED_TO=128), raising=False)
+
+        async def run():
+            changed, unwatch = log_tailer._watch(str(tmpdir.join('log')))
+            assert not changed.is_set()
+
+            os.write(write_fd, b'event')
+            await asyncio.wait_for(changed.wait(), 5)
+            unwatch()
+
+        try:
+            loop.run_until_complete(run())
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+        assert watches == [(str(tmpdir), 2 | 256 | 128)]
+        assert closed == [True]
@@ -1,10 +1,16 @@
+import asyncio
+import logging
+
 import pytest
 
 from sqlalchemy.orm.exc import NoResultFound
 
 from lamon import db
-from . import FakeWatcher
-from tests import flask, watcher_model, session, fake_watcher
+from lamon.watcher import WatcherConnectionError
+from lamon.watcher.log_mixin import LogMixin
+from lamon.watcher.manager import PollScheduler
+from . import FakeWatcher, FakeAsyncWatcher
+from tests import flask, watcher_model, session, fake_watcher, loop
 
 @pytest.fixture
 def watcher_model_(watcher_model, flask):
@@ -15,6 +21,10 @@ def watcher_model_(watcher_model, flask):
     except ValueError:
         pass
 
+class FakeLogWatcher(FakeAsyncWatcher, LogMixin):
+    """ Parses logs, but doesn't receive them """
+
+
 class TestManager():
     """ Test Watcher management """
 
@@ -53,6 +63,14 @@ class TestManagerStart():
         with pytest.raises(NoResultFound):
             flask.watcher_manager.start(id=watcher_model_.id+1)
 
+    def test_log_watcher(self, watcher_model_, flask, session):
+        """ Test that only watchers receiving logs get the log receiver """
+        watcher_model_.threadClass = 'tests.watcher.test_manager.FakeLogWatcher'
+        session.commit()
+
+        flask.watcher_manager.start(model=watcher_model_)
+        assert flask.watcher_manager.is_running(model=watcher_model_)
+
 
 class TestManagerStop():
     """ Test Watcher shutdown """
@@ -72,3 +90,133 @@ class TestManagerStop():
         """ Test stopping watcher no present in the database """
         with pytest.raises(NoResultFound):
             flask.watcher_manager.stop(id=watcher_model_.id+1)
+
+
+class TestManagerRefresh():
+    """ Test signalling model changes """
+
+    def test_refresh(self, watcher_model_, flask, session):
+        """ Test that a running watcher sees changes after refresh """
+        flask.watcher_manager.start(id=watcher_model_.id)
+        watcher = flask.watcher_manager._watchers[watcher_model_.id]
+
+        watcher_model_.info = 'changed'
+        session.commit()
+        flask.watcher_manager.refresh(id=watcher_model_.id)
+
+        assert watcher._model.info == 'changed'
+
+    def test_config_changed(self, watcher_model_, flask, session):
+        """ Test that a watcher is restarted when its config changed """
+        flask.watcher_manager.start(id=watcher_model_.id)
+        watcher = flask.watcher_manager._watchers[watcher_model_.id]
+
+        flask.watcher_manager.refresh(id=watcher_model_.id)
+        assert flask.watcher_manager._watchers[watcher_model_.id] is watcher
+
+        watcher_model_.config[0].value = 'changed'
+        session.commit()
+        flask.watcher_manager.refresh(id=watcher_model_.id)
+
+        restarted = flask.watcher_manager._watchers[watcher_model_.id]
+        assert restarted is not watcher
+        assert restarted.config['key1'] == 'changed'
+
+    def test_not_running(self, watcher_model_, flask):
+        """ Test refreshing a not running watcher """
+        with pytest.raises(ValueError):
+            flask.watcher_manager.refresh(id=watcher_model_.id)
+
+
+class StubWatcher():
+    """ Just enough of an AsyncWatcher for the scheduler """
+    poll_interval = 1
+
+    def __init__(self, results, poll_time=0):
+        self.config = {}
+        self.logger = logging.getLogger(__name__)
+        self.results = list(results)
+        self.poll_time = poll_time
+        self.delays = []
+        self.events = []
+
+    async def sleep(self, delay):
+        self.delays.append(delay)
+
+    async def run_blocking(self, func, *args):
+        return func(*args)
+
+    def connection_lost_event(self):
+        self.events.append('lost')
+
+    def connection_reaquired_event(self):
+        self.events.append('reaquired')
+
+    async def poll(self):
+        result = self.results.pop(0)
+        if not self.results:
+            self.shutdown = False
+
+        await asyncio.sleep(self.poll_time)
+        if result is not None:
+            raise result
+
+
+class TestPollScheduler():
+    """ Test poll timing """
+
+    def test_backoff(self, loop):
+        """ Test exponential backoff and connection events """
+        scheduler = PollScheduler(jitter=0, max_backoff=3)
+        watcher = StubWatcher([WatcherConnectionError()] * 3 + [None])
+
+        loop.run_until_complete(scheduler.run(watcher))
+
+        assert 0 <= watcher.delays[0] <= 1
+        assert watcher.delays[1:] == [2, 3, 3, 1]
+        assert watcher.events == ['lost', 'reaquired']
+
+    def test_long_outage(self):
+        """ Test that the backoff stays capped after many failures """
+        scheduler = PollScheduler(jitter=0, max_backoff=300)
+
+        assert scheduler.delay(3.0, 1100) == 300
+
+    def test_jitter(self):
+        """ Test randomized delays """
+        scheduler = PollScheduler(jitter=0.5)
+        delays = [scheduler.delay(10) for _ in range(100)]
+
+        assert all(5 <= d <= 15 for d in delays)
+        assert len(set(delays)) > 1
+
+    def test_max_in_flight(self, loop, monkeypatch):
+        """ Test the limit of concurrent polls """
+        scheduler = PollScheduler(max_in_flight=2)
+        watchers = [StubWatcher([None], poll_time=0.01) for _ in range(5)]
+
+        running = []
+        peak = []
+        poll = StubWatcher.poll
+
+        async def counting_poll(self):
+            running.append(self)
+            peak.append(len(running))
+            try:
+                await poll(self)
+            finally:
+                running.remove(self)
+
+        monkeypatch.setattr(StubWatcher, 'poll', counting_poll)
+        loop.run_until_complete(asyncio.gather(
+            *[scheduler.run(w) for w in watchers]))
+
+        assert max(peak) == 2
+
+    def test_unexpected_exception(self, loop):
+        """ Test that other exceptions stop polling """
+        scheduler = PollScheduler()
+        watcher = StubWatcher([ValueError(), None])
+
+        with pytest.raises(ValueError):
+            loop.run_until_complete(scheduler.run(watcher))
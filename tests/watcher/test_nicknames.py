@@ -0,0 +1,55 @@
+import pytest
+
+from lamon.models import User, Game, Nickname
+from lamon.watcher.nicknames import NicknameCache, nickname_cache
+
+from .. import session, flask
+
+
+@pytest.fixture
+def game(session):
+    game = Game(name='game')
+    user = User(username='user')
+    session.add(Nickname(nick='nick', user=user, game=game))
+    session.commit()
+
+    yield game
+
+    nickname_cache.invalidate()
+
+
+class TestNicknameCache():
+    """ Test nickname resolution """
+
+    def test_resolve(self, session, game):
+        """ Test resolving and caching a known nickname """
+        cache = NicknameCache()
+        user = session.query(User).filter(User.username == 'user').one()
+        user_id = cache.resolve(session, game.id, 'nick')
+        assert user_id == user.id
+
+        session.query(Nickname).delete()  # Not committed: no invalidation
+        assert cache.resolve(session, game.id, 'nick') == user_id
+        session.rollback()
+
+    def test_negative(self, session, game, monkeypatch):
+        """ Test that unknown nicknames are cached """
+        cache = NicknameCache()
+
+        with pytest.raises(ValueError):
+            cache.resolve(session, game.id, 'unknown')
+
+        monkeypatch.setattr(session, 'query', None)  # No more queries
+        with pytest.raises(ValueError):
+            cache.resolve(session, game.id, 'unknown')
+
+    def test_invalidate_on_commit(self, session, game):
+        """ Test that committing a nickname invalidates its game """
+        with pytest.raises(ValueError):
+            nickname_cache.resolve(session, game.id, 'new')
+
+        user = session.query(User).filter(User.username == 'user').one()
+        session.add(Nickname(nick='new', user=user, game=game))
+        session.commit()
+
+        assert nickname_cache.resolve(session, game.id, 'new') == user.id
@@ -0,0 +1,127 @@
+from datetime import datetime
+
+import pytest
+
+from lamon.models import User, Game, Nickname, Event, EventType
+from lamon.watcher.presence import PresenceIndex, presence
+
+from .. import fake_watcher, session, flask, watcher_model
+
+
+class TestPresenceIndex():
+    """ Test the in-memory presence index """
+
+    def test_join_leave(self):
+        """ Test lookups per watcher and game """
+        index = PresenceIndex()
+        assert index.join(1, 10, 100)
+        assert not index.join(1, 10, 100)
+        index.join(2, 10, 100)
+        index.join(2, 10, 101)
+        index.join(3, 20, 102)
+
+        assert index.users(watcher_id=2) == {100, 101}
+        assert index.count(game_id=10) == 2
+        assert index.count() == 3
+        assert index.count(watcher_id=3, game_id=10) == 0
+
+        index.leave(1, 100)
+        assert index.is_playing(100, game_id=10)  # Still in watcher 2
+
+        index.leave(2, 100)
+        assert not index.is_playing(100)
+        assert index.count(game_id=10) == 1
+
+    def test_sync(self):
+        """ Test replacing the players of a watcher """
+        index = PresenceIndex()
+        index.sync(1, 10, [100, 101])
+
+        joined, left = index.sync(1, 10, [101, 102])
+        assert joined == {102}
+        assert left == {100}
+        assert index.users(game_id=10) == {101, 102}
+
+    def test_game_change(self):
+        """ Test that players move with the game of their watcher """
+        index = PresenceIndex()
+        index.sync(1, 10, [100])
+        index.sync(1, 20, [100])
+
+        assert index.count(game_id=10) == 0
+        assert index.count(game_id=20) == 1
+
+    def test_clear(self):
+        index = PresenceIndex()
+        index.sync(1, 10, [100])
+        index.sync(2, 10, [101])
+        index.clear(1)
+
+        assert index.users() == {101}
+
+    def test_rebuild(self, session, watcher_model):
+        """ Test restoring the index from events """
+        users = [User(username=f'user{i}') for i in range(3)]
+        session.add_all(users)
+        session.commit()
+
+        def add(minute, type, user=None):
+            session.add(Event(type=type, time=datetime(2019, 1, 1, 12, minute),
+                              watcherID=watcher_model.id,
+                              userID=user and user.id))
+
+        add(0, EventType.USER_JOIN, users[0])
+        add(1, EventType.WATCHER_STOP)
+        add(2, EventType.WATCHER_START)
+        add(3, EventType.USER_JOIN, users[1])
+        add(4, EventType.USER_JOIN, users[2])
+        add(5, EventType.USER_LEAVE, users[2])
+        session.commit()
+
+        index = PresenceIndex()
+        index.rebuild(session)
+
+        assert index.users(watcher_id=watcher_model.id) == {users[1].id}
+
+
+class TestPlayersEvent():
+    """ Test presence tracking of watchers """
+
+    @pytest.fixture
+    def players(self, session, watcher_model):
+        game = Game(name='game')
+        watcher_model.game = game
+        for name in ['a', 'b']:
+            session.add(Nickname(nick=name, game=game,
+                                 user=User(username=name)))
+        session.commit()
+
+        yield {u.username: u.id for u in session.query(User)}
+
+        presence.clear()
+
+    def test_players_event(self, players, fake_watcher, monkeypatch):
+        """ Test that player lists emit join and leave events """
+        events = []
+        monkeypatch.setattr(fake_watcher, '_add_event', events.append)
+
+        fake_watcher.players_event(['a', 'unknown'])
+        fake_watcher.players_event(['a', 'b'])
+        fake_watcher.players_event(['b'])
+
+        assert [(e.type, e.userID) for e in events] == [
+            (EventType.USER_JOIN, players['a']),
+            (EventType.USER_JOIN, players['b']),
+            (EventType.USER_LEAVE, players['a'])]
+        assert presence.users(watcher_id=fake_watcher._model_id) == \
+            {players['b']}
+
+    def test_join_leave_event(self, players, fake_watcher, monkeypatch):
+        monkeypatch.setattr(fake_watcher, '_add_event', lambda e: None)
+
+        fake_watcher.join_event('a')
+        assert presence.is_playing(players['a'],
+                                   game_id=fake_watcher._model.gameID)
+
+        fake_watcher.leave_event('a')
+        assert presence.count() == 0
@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta
+
+from lamon.models import Event, EventType, ScoreBucket
+from lamon.watcher.retention import RetentionJob
+
+from .. import session, flask, watcher_model
+
+
+NOW = datetime(2019, 6, 1, 12)
+
+
+def _add_events(session, watcher_model):
+    for days in [1, 10, 40]:
+        session.add(Event(type=EventType.WATCHER_START,
+                          time=NOW - timedelta(days=days),
+                          watcherID=watcher_model.id))
+
+    for days, resolution in [(1, 60), (10, 60), (10, 3600)]:
+        session.add(ScoreBucket(resolution=resolution,
+                                start=NOW - timedelta(days=days),
+                                watcherID=watcher_model.id))
+    session.commit()
+
+
+class TestRetentionJob():
+    """ Test deletion of old data """
+
+    def test_run_once(self, session, watcher_model):
+        _add_events(session, watcher_model)
+        job = RetentionJob(session, raw_days=5, minute_bucket_days=5,
+                           batch_size=1)
+
+        assert job.run_once(now=NOW) == {'events': 2, 'buckets': 1}
+
+        assert [e.time for e in session.query(Event)] == \
+            [NOW - timedelta(days=1)]
+        assert sorted((b.resolution, b.start) for b in
+                      session.query(ScoreBucket)) == \
+            [(60, NOW - timedelta(days=1)), (3600, NOW - timedelta(days=10))]
+
+    def test_disabled(self, session, watcher_model):
+        """ Test that nothing is deleted by default """
+        _add_events(session, watcher_model)
+        job = RetentionJob(session)
+
+        assert not job.enabled
+        assert job.run_once(now=NOW) == {'events': 0, 'buckets': 0}
+
+    def test_thread(self, session):
+        """ Test that the job stops without waiting for the interval """
+        job = RetentionJob(session, raw_days=1, interval=600)
+        job.start()
+        job.stop()
+
+        assert not job.is_alive()
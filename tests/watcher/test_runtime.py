@@ -0,0 +1,27 @@
+import asyncio
+import threading
+
+from lamon.watcher.runtime import WatcherRuntime
+
+
+class TestWatcherRuntime():
+    """ Test the shared event loop """
+
+    def test_submit(self):
+        """ Test running coroutines and blocking functions on the loop """
+        runtime = WatcherRuntime(max_workers=1)
+        assert not runtime.is_running()
+
+        async def coro():
+            loop = asyncio.get_event_loop()
+            name = await loop.run_in_executor(
+                None, lambda: threading.current_thread().name)
+            return threading.current_thread().name, name
+
+        loop_thread, executor_thread = runtime.submit(coro()).result(5)
+
+        assert loop_thread == 'WatcherRuntime'
+        assert executor_thread.startswith('WatcherRuntime_')
+
+        runtime.stop()
+        assert not runtime.is_running()
@@ -3,6 +3,7 @@ import time
 
 import pytest
 
+from sqlalchemy import event
 from sqlalchemy.orm import scoped_session, sessionmaker
 from datetime import datetime
 
@@ -12,7 +13,7 @@ from lamon.models import Watcher as WatcherModel
 from lamon.models import Event, EventType
 
 from .. import fake_watcher, session, flask, watcher_model
-from . import FakeWatcher
+from . import FakeWatcher, FakeAsyncWatcher
 
 
 class TestCreateObject():
@@ -56,6 +57,7 @@ class TestWatcher():
 
         fake_watcher.start()
         time.sleep(1)  # Give watcher time to make db request
+        fake_watcher._writer.flush()
 
         after = len(query.all())
         assert after == before + 1
@@ -94,19 +96,103 @@ class TestWatcher():
                                        config_keys={'missing': {'required': True, 'type': str}})
 
 
+    def test_snapshot(self, fake_watcher, watcher_model, session):
+        """ Test that the model is only reloaded after refresh """
+        watcher_model.info = 'changed'
+        session.commit()
+
+        assert fake_watcher._model.info is None
+
+        fake_watcher.refresh()
+        assert fake_watcher._model.info == 'changed'
+        assert fake_watcher._model.config['key1'] == 'value1'
+
+    def test_releases_connection(self, fake_watcher, session):
+        """ Test that the watcher returns its connection to the pool after
+        each query """
+        session.commit()  # Shared with the fixtures
+        checked_out = []
+        pool = session.get_bind().pool
+        event.listen(pool, 'checkout', lambda *args: checked_out.append(1))
+        event.listen(pool, 'checkin', lambda *args: checked_out.pop())
+
+        fake_watcher.refresh()
+        fake_watcher._model
+        with pytest.raises(ValueError):
+            fake_watcher._get_user_id('unknown')
+
+        assert checked_out == []
+
+
+@pytest.fixture
+def async_watcher(session, watcher_model):
+    watcher_model.threadClass = 'tests.watcher.FakeAsyncWatcher'
+    session.commit()
+
+    watcher = FakeAsyncWatcher(session=session, model_id=watcher_model.id)
+
+    yield watcher
+
+    try:
+        watcher.stop()
+    except RuntimeError:
+        pass
+
+
+class TestAsyncWatcher():
+    """ Test watchers running on the event loop """
+
+    def _events(self, session, watcher, type):
+        return session.query(Event).\
+            filter(Event.watcherID == watcher._model_id).\
+            filter(Event.type == int(type)).count()
+
+    def test_start_stop(self, async_watcher, session):
+        """ Test that the watcher runs without its own thread """
+        async_watcher.start()
+        time.sleep(0.5)
+        async_watcher._writer.flush()
+
+        assert async_watcher.is_alive()
+        assert self._events(session, async_watcher,
+                            EventType.WATCHER_START) == 1
+        assert async_watcher.name not in \
+            [t.name for t in threading.enumerate()]
+
+        async_watcher.stop()  # Must not wait for the sleep in runner
+        assert not async_watcher.is_alive()
+        assert self._events(session, async_watcher,
+                            EventType.WATCHER_STOP) == 1
+
+    def test_exception(self, async_watcher, session, monkeypatch):
+        """ Test that exceptions in the runner are saved """
+        async def runner():
+            raise Exception('test')
+
+        monkeypatch.setattr(async_watcher, 'runner', runner)
+        async_watcher.start()
+        async_watcher.join(5)
+        async_watcher._writer.flush()
+
+        assert self._events(session, async_watcher,
+                            EventType.WATCHER_EXCEPTION) == 1
+
+
 class TestWatcherEvents():
     def test_add_event(self, fake_watcher, session):
         """ Test event adding """
         e = Event(type=EventType.WATCHER_START,
                   time=datetime.now(), info='TEST')
         fake_watcher._add_event(e)
+        fake_watcher._writer.flush()
 
         query = session.query(Event).\
-            filter(Event.id == e.id)
+            filter(Event.watcherID == fake_watcher._model_id).\
+            filter(Event.info == 'TEST')
         res = query.one()
 
-        assert e.id == res.id
         assert e.time == res.time
+        assert e.type == res.type
 
     def test_connection_events(self, monkeypatch, fake_watcher, session):
         # Patch _add_event
@@ -131,3 +217,33 @@ class TestWatcherEvents():
         # Calling again
         fake_watcher.connection_reaquired_event()
         assert len(mock_events) == 2
+
+    def test_score_changes(self, monkeypatch, fake_watcher):
+        """ Test that only changed scores are saved """
+        mock_events = []
+        monkeypatch.setattr(fake_watcher, '_add_event', mock_events.append)
+        monkeypatch.setattr(fake_watcher, '_get_user_id', lambda nick: 1)
+
+        fake_watcher.score_event('nick', 1)
+        fake_watcher.score_event('nick', '1')
+        assert len(mock_events) == 1
+
+        fake_watcher.score_event('nick', 2)
+        fake_watcher.score_event('other', 2)
+        assert len(mock_events) == 3
+
+        # Rejoining players get their score saved again
+        fake_watcher.leave_event('nick')
+        fake_watcher.score_event('nick', 2)
+        assert len(mock_events) == 5
+
+    def test_score_heartbeat(self, monkeypatch, fake_watcher):
+        """ Test that unchanged scores are saved after the heartbeat """
+        mock_events = []
+        monkeypatch.setattr(fake_watcher, '_add_event', mock_events.append)
+        monkeypatch.setattr(fake_watcher, '_get_user_id', lambda nick: 1)
+        fake_watcher.config['score_heartbeat'] = 0
+
+        fake_watcher.score_event('nick', 1)
+        fake_watcher.score_event('nick', 1)
+        assert len(mock_events) == 2
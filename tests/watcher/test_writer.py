@@ -0,0 +1,172 @@
+from queue import Full
+from datetime import datetime
+from threading import Thread, Event as Flag
+from time import sleep
+
+import pytest
+
+from lamon.cache import stats_cache
+from lamon.watcher.writer import EventWriter
+from lamon.models import User, Event, EventType, ScoreRollup
+
+from .. import session, flask, watcher_model
+
+
+def _event(watcher_model, info):
+    return Event(type=EventType.WATCHER_START, time=datetime.now(),
+                 watcherID=watcher_model.id, info=info)
+
+
+class TestEventWriter():
+    """ Test batched event writing """
+
+    def test_flush(self, session, watcher_model):
+        """ Test that flush writes all queued events """
+        writer = EventWriter(session, batch_size=1000, flush_interval=60)
+
+        for i in range(10):
+            writer.put(_event(watcher_model, str(i)))
+        writer.flush()
+
+        query = session.query(Event).\
+            filter(Event.watcherID == watcher_model.id)
+        assert query.count() == 10
+
+        writer.stop()
+
+    def test_flush_busy(self, session, watcher_model, monkeypatch):
+        """ Test that flush returns while other threads keep queueing """
+        writer = EventWriter(session, batch_size=1000, flush_interval=0.01)
+        write = writer._write
+
+        def slow_write(batch):
+            sleep(0.05)
+            write(batch)
+
+        monkeypatch.setattr(writer, '_write', slow_write)
+        writer.put(_event(watcher_model, 'before'))
+
+        stop = Flag()
+        def produce():
+            while not stop.is_set():
+                writer.put(_event(watcher_model, 'busy'))
+                sleep(0.005)
+
+        producer = Thread(target=produce)
+        producer.start()
+        try:
+            flusher = Thread(target=writer.flush)
+            flusher.start()
+            flusher.join(timeout=5)
+
+            assert not flusher.is_alive()
+            assert session.query(Event).filter(Event.info == 'before').\
+                count() == 1
+        finally:
+            stop.set()
+            producer.join()
+            writer.stop()
+
+    def test_batch_size(self, session, watcher_model, monkeypatch):
+        """ Test that a full batch is written with a single insert """
+        writer = EventWriter(session, batch_size=5, flush_interval=60)
+        batches = []
+
+        write = writer._write
+        def mock_write(batch):
+            batches.append(len(batch))
+            write(batch)
+
+        monkeypatch.setattr(writer, '_write', mock_write)
+
+        for i in range(12):
+            writer.put(_event(watcher_model, str(i)))
+        writer.stop()
+
+        assert [b for b in batches if b] == [5, 5, 2]
+
+    def test_stop(self, session, watcher_model):
+        """ Test that stopping writes pending events and refuses new ones """
+        writer = EventWriter(session, flush_interval=60)
+        writer.put(_event(watcher_model, 'pending'))
+        writer.stop()
+
+        query = session.query(Event).filter(Event.info == 'pending')
+        assert query.count() == 1
+
+        with pytest.raises(RuntimeError):
+            writer.put(_event(watcher_model, 'late'))
+
+    def test_backpressure(self, session, watcher_model, monkeypatch):
+        """ Test that put blocks when the queue is full """
+        writer = EventWriter(session, queue_size=1, flush_interval=60)
+        monkeypatch.setattr(writer, '_ensure_started', lambda: None)
+
+        writer.put(_event(watcher_model, '1'))
+        with pytest.raises(Full):
+            writer.put(_event(watcher_model, '2'), timeout=0.1)
+
+    def test_rollups(self, session, watcher_model):
+        """ Test that written score events update the score rollups """
+        user = User(username='player')
+        session.add(user)
+        session.commit()
+
+        writer = EventWriter(session, flush_interval=60)
+        for score in [3, 8, 5]:
+            writer.put(Event(type=EventType.USER_SCORE, time=datetime.now(),
+                             watcherID=watcher_model.id, userID=user.id,
+                             score=score))
+        writer.stop()
+
+        rollup = session.query(ScoreRollup).one()
+        assert (rollup.score, rollup.max_score) == (5, 8)
+
+    def test_invalidates_stats(self, session, watcher_model, monkeypatch):
+        """ Test that written events invalidate cached statistics """
+        invalidated = []
+        monkeypatch.setattr(stats_cache, 'invalidate_events',
+                            invalidated.extend)
+
+        writer = EventWriter(session, flush_interval=60)
+        writer.put(_event(watcher_model, 'x'))
+        writer.stop()
+
+        assert [e['watcherID'] for e in invalidated] == [watcher_model.id]
+
+    def test_retry(self, session, watcher_model, monkeypatch):
+        """ Test that a batch failing once is written on the retry """
+        writer = EventWriter(session, flush_interval=60)
+        insert = writer._insert
+        attempts = []
+
+        def flaky_insert(batch):
+            attempts.append(len(batch))
+            if len(attempts) == 1:
+                return Exception('connection lost')
+            return insert(batch)
+
+        monkeypatch.setattr(writer, '_insert', flaky_insert)
+        for i in range(4):
+            writer.put(_event(watcher_model, str(i)))
+        writer.stop()
+
+        assert attempts == [4, 4]
+        assert session.query(Event).count() == 4
+
+    def test_drop_bad_events(self, session, watcher_model, monkeypatch):
+        """ Test that only the events failing to insert are dropped """
+        writer = EventWriter(session, flush_interval=60)
+        errors = []
+        monkeypatch.setattr(writer.logger, 'error', errors.append)
+
+        for i in range(5):
+            writer.put(_event(watcher_model, str(i)))
+        writer.put({'type': EventType.WATCHER_START, 'time': datetime.now(),
+                    'watcherID': watcher_model.id, 'info': 'bad',
+                    'score': 'not a number'})
+        writer.stop()
+
+        assert sorted(e.info for e in session.query(Event)) == \
+            ['0', '1', '2', '3', '4']
+        assert errors[-1] == 'Dropped 1 of 6 events'